@@ -1,13 +1,47 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from django.utils.html import format_html
-from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry
+from django.views.decorators.csrf import csrf_exempt
+from .models import (
+    Elder, Volunteer, Donation, Testimonial, ContactInquiry, Job, Notification, ImportRun, ImportRejectedRow,
+)
+from .cache import bump_generation
+from .images import rendition_url
+from .transitions import transition
+from .idcards import card_sheet_name
+from .exports import export_response
+from .jobs import enqueue
+from .uploads import ImportUploadHandler
+
+
+def export_csv(modeladmin, request, queryset):
+    return export_response(queryset, 'csv')
+export_csv.short_description = "Export selected rows as CSV"
+
+
+def export_xlsx(modeladmin, request, queryset):
+    return export_response(queryset, 'xlsx')
+export_xlsx.short_description = "Export selected rows as Excel (XLSX)"
+
+
+def queue_card_sheets(modeladmin, request, kind, queryset, filename):
+    """Have run_jobs render the ID card sheets and point the admin at the download"""
+    pks = list(queryset.filter(status='approved').values_list('pk', flat=True))
+    name = card_sheet_name(filename)
+    enqueue('idcards.print_sheets', {'kind': kind, 'pks': pks, 'name': name})
+    modeladmin.message_user(request, format_html(
+        'Rendering ID cards for {} approved records; <a href="{}">download the PDF</a> in a minute.',
+        len(pks), reverse('protected_media', args=[name]),
+    ))
 
 @admin.register(Elder)
 class ElderAdmin(admin.ModelAdmin):
-    list_display = ['registration_id', 'full_name', 'age', 'status', 'guardian_name', 'created_at']
+    list_display = ['registration_id', 'full_name', 'age', 'status', 'guardian_name', 'created_at', 'photo_preview']
     list_filter = ['status', 'created_at', 'age']
     search_fields = ['registration_id', 'full_name', 'guardian_name', 'phone_number']
-    readonly_fields = ['registration_id', 'created_at', 'updated_at']
+    readonly_fields = ['registration_id', 'created_at', 'updated_at', 'photo_preview']
     list_per_page = 25
     
     fieldsets = (
@@ -15,10 +49,10 @@ class ElderAdmin(admin.ModelAdmin):
             'fields': ('registration_id', 'status', 'rejection_reason')
         }),
         ('Personal Information', {
-            'fields': ('full_name', 'photo', 'age', 'address', 'phone_number', 'id_proof')
+            'fields': ('full_name', 'photo', 'photo_preview', 'age', 'address', 'phone_number', 'id_proof')
         }),
         ('Guardian Information', {
-            'fields': ('guardian_name', 'guardian_contact', 'guardian_relationship')
+            'fields': ('guardian_name', 'guardian_contact', 'guardian_email', 'guardian_relationship')
         }),
         ('Health Information', {
             'fields': ('health_conditions', 'special_requirements')
@@ -33,26 +67,37 @@ class ElderAdmin(admin.ModelAdmin):
         }),
     )
     
+    def photo_preview(self, obj):
+        if obj.photo:
+            return format_html('<img src="{}" style="max-height: 100px; max-width: 100px;" />', rendition_url(obj.photo, 'thumb'))
+        return "No photo"
+    photo_preview.short_description = 'Photo Preview'
+    
     def get_readonly_fields(self, request, obj=None):
         readonly = list(self.readonly_fields)
         if obj:  # Editing existing object
             readonly.extend(['photo', 'id_proof'])  # Admin cannot change uploaded files
         return readonly
     
-    actions = ['approve_elders', 'reject_elders']
+    actions = ['approve_elders', 'reject_elders', 'print_id_cards', export_csv, export_xlsx]
     
     def approve_elders(self, request, queryset):
-        updated = queryset.update(status='approved')
+        updated = transition(queryset, 'approve', request.user)
         self.message_user(request, f'{updated} elders approved successfully.')
     approve_elders.short_description = "Approve selected elders"
     
     def reject_elders(self, request, queryset):
-        updated = queryset.update(status='rejected')
+        updated = transition(queryset, 'reject', request.user)
         self.message_user(request, f'{updated} elders rejected.')
     reject_elders.short_description = "Reject selected elders"
+    
+    def print_id_cards(self, request, queryset):
+        queue_card_sheets(self, request, 'elder', queryset, 'elder_id_cards.pdf')
+    print_id_cards.short_description = "Print ID cards for selected approved elders"
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry
+from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry, Job
 
 @admin.register(Volunteer)
 class VolunteerAdmin(admin.ModelAdmin):
@@ -84,21 +129,25 @@ class VolunteerAdmin(admin.ModelAdmin):
     
     def profile_photo_preview(self, obj):
         if obj.profile_photo:
-            return format_html('<img src="{}" style="max-height: 100px; max-width: 100px;" />', obj.profile_photo.url)
+            return format_html('<img src="{}" style="max-height: 100px; max-width: 100px;" />', rendition_url(obj.profile_photo, 'thumb'))
         return "No photo"
     profile_photo_preview.short_description = 'Profile Photo Preview'
     
-    actions = ['approve_volunteers', 'reject_volunteers']
+    actions = ['approve_volunteers', 'reject_volunteers', 'print_id_cards', export_csv, export_xlsx]
     
     def approve_volunteers(self, request, queryset):
-        updated = queryset.update(status='approved')
+        updated = transition(queryset, 'approve', request.user)
         self.message_user(request, f'{updated} volunteers approved successfully.')
     approve_volunteers.short_description = "Approve selected volunteers"
     
     def reject_volunteers(self, request, queryset):
-        updated = queryset.update(status='rejected')
+        updated = transition(queryset, 'reject', request.user)
         self.message_user(request, f'{updated} volunteers rejected.')
     reject_volunteers.short_description = "Reject selected volunteers"
+    
+    def print_id_cards(self, request, queryset):
+        queue_card_sheets(self, request, 'volunteer', queryset, 'volunteer_id_cards.pdf')
+    print_id_cards.short_description = "Print ID cards for selected approved volunteers"
 
 @admin.register(Donation)
 class DonationAdmin(admin.ModelAdmin):
@@ -124,15 +173,15 @@ class DonationAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_fulfilled', 'mark_pending']
+    actions = ['mark_fulfilled', 'mark_pending', export_csv, export_xlsx]
     
     def mark_fulfilled(self, request, queryset):
-        updated = queryset.update(status='fulfilled')
+        updated = transition(queryset, 'fulfil', request.user)
         self.message_user(request, f'{updated} donations marked as fulfilled.')
     mark_fulfilled.short_description = "Mark selected donations as fulfilled"
     
     def mark_pending(self, request, queryset):
-        updated = queryset.update(status='pending')
+        updated = transition(queryset, 'reopen', request.user)
         self.message_user(request, f'{updated} donations marked as pending.')
     mark_pending.short_description = "Mark selected donations as pending"
 
@@ -161,11 +210,13 @@ class TestimonialAdmin(admin.ModelAdmin):
     
     def activate_testimonials(self, request, queryset):
         updated = queryset.update(is_active=True)
+        bump_generation(self.model)
         self.message_user(request, f'{updated} testimonials activated.')
     activate_testimonials.short_description = "Activate selected testimonials"
     
     def deactivate_testimonials(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_generation(self.model)
         self.message_user(request, f'{updated} testimonials deactivated.')
     deactivate_testimonials.short_description = "Deactivate selected testimonials"
 
@@ -193,18 +244,83 @@ class ContactInquiryAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_resolved', 'mark_unresolved']
+    actions = ['mark_resolved', 'mark_unresolved', export_csv, export_xlsx]
     
     def mark_resolved(self, request, queryset):
         updated = queryset.update(is_resolved=True)
+        bump_generation(self.model)
         self.message_user(request, f'{updated} inquiries marked as resolved.')
     mark_resolved.short_description = "Mark selected inquiries as resolved"
     
     def mark_unresolved(self, request, queryset):
         updated = queryset.update(is_resolved=False)
+        bump_generation(self.model)
         self.message_user(request, f'{updated} inquiries marked as unresolved.')
     mark_unresolved.short_description = "Mark selected inquiries as unresolved"
 
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_at', 'finished_at', 'created_at']
+    list_filter = ['status', 'task']
+    readonly_fields = [field.name for field in Job._meta.fields]
+    list_per_page = 50
+    
+    actions = ['retry_jobs']
+    
+    def retry_jobs(self, request, queryset):
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'{updated} failed jobs queued again.')
+    retry_jobs.short_description = "Retry selected failed jobs"
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'recipient', 'status', 'attempts', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = [field.name for field in Notification._meta.fields]
+    list_per_page = 50
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'model_name', 'status', 'rows_processed', 'rows_imported', 'rows_rejected', 'created_by', 'created_at',
+        'finished_at',
+    ]
+    list_filter = ['status', 'model_name']
+    list_per_page = 50
+    
+    actions = ['download_rejected_rows']
+    
+    # The CSRF check would read the body with the default handlers; it runs
+    # in changeform_view instead, after the import handler is in place
+    @method_decorator(csrf_exempt)
+    def add_view(self, request, form_url='', extra_context=None):
+        request.upload_handlers = [ImportUploadHandler(request)]
+        return super().add_view(request, form_url, extra_context)
+    
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ['model_name', 'csv_file']
+        return [field.name for field in ImportRun._meta.fields if field.name != 'id']
+    
+    def get_readonly_fields(self, request, obj=None):
+        # A run cannot be edited once queued; upload a corrected file as a new run
+        return [] if obj is None else self.get_fields(request, obj)
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            # The admin saves in a transaction, so the worker sees the job only with the run
+            enqueue('imports.run', {'pk': obj.pk})
+    
+    def download_rejected_rows(self, request, queryset):
+        return export_response(ImportRejectedRow.objects.filter(run__in=queryset), 'csv')
+    download_rejected_rows.short_description = "Download rejected rows of selected imports (CSV)"
+
 # Customize admin site headers
 admin.site.site_header = "Vrudhashram Kamalbasant Admin"
 admin.site.site_title = "VK Admin Portal"
@@ -1,6 +1,16 @@
+import os
+
 from django.apps import AppConfig
 
 
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from django.conf import settings
+        from . import checks, signals, tasks  # noqa: F401
+
+        # Uploads stream here; it lives on the media volume, which may be empty
+        if settings.FILE_UPLOAD_TEMP_DIR:
+            os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
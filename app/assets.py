@@ -0,0 +1,275 @@
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+
+
+ASSETS_DIR = Path(settings.BASE_DIR) / 'assets'
+# Written into a STATICFILES_DIRS directory; collectstatic then hashes and
+# compresses the bundles like any other static file
+BUILD_DIR = Path(settings.BASE_DIR) / 'static' / 'app' / 'build'
+
+# Files whose words decide which classes are used; like Tailwind's content
+# scan, any word counts, so classes set from JavaScript strings are kept
+CONTENT_GLOBS = ['app/templates/**/*.html', 'app/forms.py']
+# Classes built at runtime from values the scan cannot see (Django message tags)
+SAFELIST = {'debug', 'info', 'success', 'warning', 'error'}
+
+# Bundle -> parts, in cascade order; 'utilities' and 'icons' are generated
+BUNDLES = {
+    'site.css': ['preflight', 'base', 'utilities', 'icons'],
+    # For standalone pages (ID card preview) that have their own styles
+    'icons.css': ['icons'],
+}
+
+WORD_RE = re.compile(r'[\w:/.\[\]-]+')
+TEMPLATE_TAG_RE = re.compile(r'{[{%].*?[%}]}', re.S)
+CLASS_RE = re.compile(r'\.(-?[_a-zA-Z][\w-]*(?:\\.[\w-]*)*)')
+COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+LICENSE_RE = re.compile(r'/\*!.*?\*/', re.S)
+
+
+def content_words():
+    """Every word in the content files, and the prefixes of template-built classes
+
+    `status-{{ elder.status }}` yields the prefix `status-`, which keeps
+    every .status-* rule.
+    """
+    words, prefixes = set(SAFELIST), set()
+    for pattern in CONTENT_GLOBS:
+        for path in Path(settings.BASE_DIR).glob(pattern):
+            text = path.read_text(encoding='utf-8')
+            prefixes.update(re.findall(r'([\w-]+-){{', text))
+            for word in WORD_RE.findall(TEMPLATE_TAG_RE.sub(' ', text)):
+                # Sentence punctuation and dotted names ("nav.active") as well as p-0.5
+                words.add(word)
+                words.update(word.split('.'))
+    return words, tuple(prefixes)
+
+
+# Tailwind (v3) utilities the templates may use. Unknown words are simply
+# not utilities; add a row here when a template needs one that is missing.
+SPACING = {
+    '0': '0px', 'px': '1px', '0.5': '0.125rem', '1': '0.25rem', '1.5': '0.375rem', '2': '0.5rem',
+    '2.5': '0.625rem', '3': '0.75rem', '4': '1rem', '5': '1.25rem', '6': '1.5rem', '8': '2rem',
+    '10': '2.5rem', '12': '3rem', '16': '4rem', '20': '5rem', '24': '6rem',
+}
+SIDES = {
+    '': [''], 'x': ['-left', '-right'], 'y': ['-top', '-bottom'],
+    't': ['-top'], 'r': ['-right'], 'b': ['-bottom'], 'l': ['-left'],
+}
+PALETTE = {
+    'gray': ['f9fafb', 'f3f4f6', 'e5e7eb', 'd1d5db', '9ca3af', '6b7280', '4b5563', '374151', '1f2937', '111827'],
+    'red': ['fef2f2', 'fee2e2', 'fecaca', 'fca5a5', 'f87171', 'ef4444', 'dc2626', 'b91c1c', '991b1b', '7f1d1d'],
+    'yellow': ['fefce8', 'fef9c3', 'fef08a', 'fde047', 'facc15', 'eab308', 'ca8a04', 'a16207', '854d0e', '713f12'],
+    'green': ['f0fdf4', 'dcfce7', 'bbf7d0', '86efac', '4ade80', '22c55e', '16a34a', '15803d', '166534', '14532d'],
+    'blue': ['eff6ff', 'dbeafe', 'bfdbfe', '93c5fd', '60a5fa', '3b82f6', '2563eb', '1d4ed8', '1e40af', '1e3a8a'],
+}
+SHADES = ['50', '100', '200', '300', '400', '500', '600', '700', '800', '900']
+COLOR_PROPERTIES = {
+    'text': ('--tw-text-opacity', 'color'),
+    'bg': ('--tw-bg-opacity', 'background-color'),
+    'border': ('--tw-border-opacity', 'border-color'),
+    'ring': ('--tw-ring-opacity', '--tw-ring-color'),
+}
+STATIC_UTILITIES = {
+    'block': 'display:block', 'inline-block': 'display:inline-block', 'inline': 'display:inline',
+    'flex': 'display:flex', 'grid': 'display:grid', 'hidden': 'display:none',
+    'items-center': 'align-items:center', 'justify-center': 'justify-content:center',
+    'justify-between': 'justify-content:space-between',
+    'w-full': 'width:100%', 'w-auto': 'width:auto', 'h-full': 'height:100%',
+    'text-left': 'text-align:left', 'text-center': 'text-align:center', 'text-right': 'text-align:right',
+    'text-xs': 'font-size:0.75rem;line-height:1rem', 'text-sm': 'font-size:0.875rem;line-height:1.25rem',
+    'text-base': 'font-size:1rem;line-height:1.5rem', 'text-lg': 'font-size:1.125rem;line-height:1.75rem',
+    'text-xl': 'font-size:1.25rem;line-height:1.75rem', 'text-2xl': 'font-size:1.5rem;line-height:2rem',
+    'font-normal': 'font-weight:400', 'font-medium': 'font-weight:500', 'font-semibold': 'font-weight:600',
+    'font-bold': 'font-weight:700',
+    'rounded-none': 'border-radius:0px', 'rounded-sm': 'border-radius:0.125rem', 'rounded': 'border-radius:0.25rem',
+    'rounded-md': 'border-radius:0.375rem', 'rounded-lg': 'border-radius:0.5rem', 'rounded-xl': 'border-radius:0.75rem',
+    'rounded-full': 'border-radius:9999px',
+    'border': 'border-width:1px', 'border-0': 'border-width:0px', 'border-2': 'border-width:2px',
+    'border-4': 'border-width:4px',
+    'text-white': 'color:#fff', 'bg-white': 'background-color:#fff', 'bg-transparent': 'background-color:transparent',
+    'outline-none': 'outline:2px solid transparent;outline-offset:2px',
+    'shadow': 'box-shadow:0 1px 3px 0 rgb(0 0 0 / 0.1),0 1px 2px -1px rgb(0 0 0 / 0.1)',
+}
+RING_WIDTHS = {'': '3px', '-0': '0px', '-1': '1px', '-2': '2px', '-4': '4px', '-8': '8px'}
+VARIANTS = {'hover': ':hover', 'focus': ':focus', 'disabled': ':disabled'}
+SCREENS = {'sm': '640px', 'md': '768px', 'lg': '1024px', 'xl': '1280px'}
+
+
+def _utility_declarations(name):
+    if name in STATIC_UTILITIES:
+        return STATIC_UTILITIES[name]
+    match = re.fullmatch(r'(p|m)([xytrbl]?)-(.+)', name)
+    if match and match[3] in SPACING:
+        prop = 'padding' if match[1] == 'p' else 'margin'
+        return ';'.join(f'{prop}{side}:{SPACING[match[3]]}' for side in SIDES[match[2]])
+    match = re.fullmatch(r'gap-(.+)', name)
+    if match and match[1] in SPACING:
+        return f'gap:{SPACING[match[1]]}'
+    match = re.fullmatch(r'(text|bg|border|ring)-([a-z]+)-(\d+)', name)
+    if match and match[2] in PALETTE and match[3] in SHADES:
+        opacity, prop = COLOR_PROPERTIES[match[1]]
+        red, green, blue = bytes.fromhex(PALETTE[match[2]][SHADES.index(match[3])])
+        return f'{opacity}:1;{prop}:rgb({red} {green} {blue} / var({opacity}))'
+    match = re.fullmatch(r'ring(-\d+)?', name)
+    if match and (match[1] or '') in RING_WIDTHS:
+        width = RING_WIDTHS[match[1] or '']
+        return (
+            '--tw-ring-offset-shadow:var(--tw-ring-inset) 0 0 0 var(--tw-ring-offset-width) var(--tw-ring-offset-color);'
+            f'--tw-ring-shadow:var(--tw-ring-inset) 0 0 0 calc({width} + var(--tw-ring-offset-width)) var(--tw-ring-color);'
+            'box-shadow:var(--tw-ring-offset-shadow),var(--tw-ring-shadow),var(--tw-shadow,0 0 #0000)'
+        )
+    return None
+
+
+def _escape_class(name):
+    return re.sub(r'([:/.\[\]])', r'\\\1', name)
+
+
+def utilities_css(words):
+    """CSS for the Tailwind utilities among `words`, plain before variants before breakpoints"""
+    plain, variants, screens = [], [], {screen: [] for screen in SCREENS}
+    for word in sorted(words):
+        *prefixes, name = word.split(':')
+        declarations = _utility_declarations(name)
+        if declarations is None or len(prefixes) > 2:
+            continue
+        pseudo, screen = '', None
+        for prefix in prefixes:
+            if prefix in VARIANTS and not pseudo:
+                pseudo = VARIANTS[prefix]
+            elif prefix in SCREENS and screen is None:
+                screen = prefix
+            else:
+                break
+        else:
+            rule = f'.{_escape_class(word)}{pseudo}{{{declarations}}}'
+            (screens[screen] if screen else variants if pseudo else plain).append(rule)
+    css = plain + variants
+    for screen, rules in screens.items():
+        if rules:
+            css.append(f'@media (min-width:{SCREENS[screen]}){{{"".join(rules)}}}')
+    return '\n'.join(css)
+
+
+ICON_STYLES = {'solid': 'fas', 'brands': 'fab'}
+ICON_ATTRIBUTION = (
+    '/*! Icons: Font Awesome Free 6.4.0 by @fontawesome - https://fontawesome.com '
+    'License - https://fontawesome.com/license/free (Icons: CC BY 4.0) Copyright 2023 Fonticons, Inc. */'
+)
+
+
+def icons_css():
+    """Icon classes drawn from the SVGs in assets/icons, as masks over currentColor
+
+    Keeps the Font Awesome markup (<i class="fas fa-home">) working with no
+    web font: each icon is a few hundred bytes of inline SVG, and purging
+    drops every icon no template names.
+    """
+    rules = [
+        ICON_ATTRIBUTION,
+        '.fas,.fab{display:inline-block;width:1em;height:1em;vertical-align:-0.125em;'
+        'background-color:currentColor;-webkit-mask:var(--fa-icon) center/contain no-repeat;'
+        'mask:var(--fa-icon) center/contain no-repeat}',
+    ]
+    for directory in ICON_STYLES:
+        for path in sorted((ASSETS_DIR / 'icons' / directory).glob('*.svg')):
+            svg = re.sub(r'<!--.*?-->', '', path.read_text(encoding='utf-8'), flags=re.S).strip()
+            view_box = re.search(r'viewBox="0 0 (\d+) (\d+)"', svg)
+            width = int(view_box[1]) / int(view_box[2])
+            data = quote(svg.replace('"', "'"), safe=" '=:/")
+            rules.append(f'.fa-{path.stem}{{width:{width:.4g}em;--fa-icon:url("data:image/svg+xml,{data}")}}')
+    return '\n'.join(rules)
+
+
+def parse_rules(css):
+    """Split a stylesheet into [(prelude, body)]; @media/@supports bodies are parsed too"""
+    rules, position = [], 0
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            return rules
+        depth, end = 1, start + 1
+        while depth:
+            depth += {'{': 1, '}': -1}.get(css[end], 0)
+            end += 1
+        prelude, body = ' '.join(css[position:start].split()), css[start + 1:end - 1]
+        if prelude.startswith(('@media', '@supports')):
+            body = parse_rules(body)
+        rules.append((prelude, body))
+        position = end
+
+
+def purge(rules, is_used):
+    """Drop selectors naming a class no content file uses, and rules left empty"""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            body = purge(body, is_used)
+            if body:
+                kept.append((prelude, body))
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [
+                selector for selector in re.split(r',(?![^(]*\))', prelude)
+                if all(is_used(name.replace('\\', '')) for name in CLASS_RE.findall(selector))
+            ]
+            if selectors:
+                kept.append((','.join(selectors), body))
+    return kept
+
+
+def minify(rules):
+    css = []
+    for prelude, body in rules:
+        prelude = re.sub(r'\s*([,>+~])\s*', r'\1', prelude.strip())
+        if isinstance(body, list):
+            body = minify(body)
+        else:
+            body = re.sub(r'\s*([;:{},])\s*', r'\1', ' '.join(body.split())).strip(';')
+            # An empty custom property needs its space (--tw-ring-inset: ;)
+            body = body.replace(':;', ': ;')
+        css.append(f'{prelude}{{{body}}}')
+    return ''.join(css)
+
+
+def build_css(parts, words, prefixes):
+    """One purged, minified stylesheet; license comments are kept at the top"""
+    def is_used(name):
+        return name in words or name.startswith(prefixes)
+
+    sources = []
+    for part in parts:
+        if part == 'utilities':
+            sources.append(utilities_css(words))
+        elif part == 'icons':
+            sources.append(icons_css())
+        else:
+            sources.append((ASSETS_DIR / 'css' / f'{part}.css').read_text(encoding='utf-8'))
+    css = COMMENT_RE.sub('', '\n'.join(sources))
+    licenses = LICENSE_RE.findall(css)
+    rules = purge(parse_rules(LICENSE_RE.sub('', css)), is_used)
+    return '\n'.join(licenses + [minify(rules)]) + '\n'
+
+
+def build_bundles():
+    """Write every bundle in BUNDLES to BUILD_DIR; returns {name: size in bytes}"""
+    words, prefixes = content_words()
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    sizes = {}
+    for name, parts in BUNDLES.items():
+        css = build_css(parts, words, prefixes)
+        (BUILD_DIR / name).write_text(css, encoding='utf-8')
+        sizes[name] = len(css.encode())
+    return sizes
+
+
+def missing_icons():
+    """fa-* words in the templates that have no SVG in assets/icons"""
+    words, _ = content_words()
+    available = {path.stem for path in ASSETS_DIR.glob('icons/*/*.svg')}
+    return sorted(word[3:] for word in words if word.startswith('fa-') and word[3:] not in available)
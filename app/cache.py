@@ -0,0 +1,173 @@
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+GENERATION_KEY = 'generation:{}'
+
+# Backends whose entries, and so generation bumps, stay inside one process
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias='default'):
+    """Whether every process (web workers, run_jobs) sees the same cache entries"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def _generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def _fresh_generation():
+    # Timestamp based so an evicted counter never reuses an old value
+    return int(time.time() * 1000)
+
+
+def get_generations(*models):
+    """Return the current generation number of each model"""
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        value = found.get(key)
+        if value is None:
+            cache.add(key, _fresh_generation(), None)
+            value = cache.get(key)
+        generations.append(value)
+    return generations
+
+
+def bump_generation(*models):
+    """Invalidate everything cached against these models"""
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_generation(), None)
+
+
+def versioned_key(name, models):
+    """Build a cache key that changes whenever one of the models changes"""
+    generations = '.'.join(str(value) for value in get_generations(*models))
+    return f'{name}:{generations}'
+
+
+def cached(name, models, compute, timeout=DEFAULT_TIMEOUT):
+    """Return a cached value for `name`, recomputing it after the models change
+
+    Entries also expire after the cache's TIMEOUT, which bounds how stale a
+    value can get when a bump is missed.
+    """
+    key = versioned_key(name, models)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+PAGE_CACHE_METRICS = ('hit', 'miss', 'bypass')
+
+# Names of the views wrapped by cache_public_page, for metrics reporting
+page_cache_views = []
+
+
+def _count(view_name, outcome):
+    key = f'page_cache:{outcome}:{view_name}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def page_cache_metrics(view_names):
+    """Hit/miss/bypass counters of the page cache for each view"""
+    keys = {
+        (name, outcome): f'page_cache:{outcome}:{name}'
+        for name in view_names for outcome in PAGE_CACHE_METRICS
+    }
+    found = cache.get_many(list(keys.values()))
+    metrics = {name: {outcome: 0 for outcome in PAGE_CACHE_METRICS} for name in view_names}
+    for (name, outcome), key in keys.items():
+        metrics[name][outcome] = found.get(key, 0)
+    return metrics
+
+
+def _has_messages(request):
+    return len(get_messages(request)) > 0
+
+
+def _cached_page(request, view_name, models):
+    """Return (key, cached response); the key is None when the request bypasses the cache"""
+    if request.method != 'GET' or request.user.is_authenticated or _has_messages(request):
+        _count(view_name, 'bypass')
+        return None, None
+    key = versioned_key(f'page:{request.get_full_path()}', models)
+    response = cache.get(key)
+    if response is not None:
+        _count(view_name, 'hit')
+        response['X-Page-Cache'] = 'HIT'
+    return key, response
+
+
+def _store_page(request, view_name, key, response, timeout):
+    if response.status_code == 200 and not response.cookies and not _has_messages(request):
+        _count(view_name, 'miss')
+        if settings.PAGE_MICROCACHE_SECONDS:
+            # Lets the nginx microcache keep this page briefly too
+            response['X-Accel-Expires'] = str(settings.PAGE_MICROCACHE_SECONDS)
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+        response['X-Page-Cache'] = 'MISS'
+    else:
+        _count(view_name, 'bypass')
+
+
+def cache_public_page(*models, timeout=None):
+    """Cache the rendered page for anonymous GET requests
+
+    The key covers the path and query string plus the generation of every
+    model the page depends on, so a change to one model only invalidates
+    the pages built from it; pages also expire after `timeout` seconds
+    (PAGE_CACHE_TIMEOUT by default). Requests carrying flash messages bypass the
+    cache in both directions. Cached pages also carry X-Accel-Expires, so
+    nginx may serve them for PAGE_MICROCACHE_SECONDS without asking Django.
+    Works on sync and async views; async views do the cache and session
+    work in a thread.
+    """
+    def decorator(view_func):
+        view_name = view_func.__name__
+        page_cache_views.append(view_name)
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                key, response = await sync_to_async(_cached_page)(request, view_name, models)
+                if response is not None:
+                    return response
+                response = await view_func(request, *args, **kwargs)
+                if key is not None:
+                    await sync_to_async(_store_page)(request, view_name, key, response, timeout)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key, response = _cached_page(request, view_name, models)
+            if response is not None:
+                return response
+            response = view_func(request, *args, **kwargs)
+            if key is not None:
+                _store_page(request, view_name, key, response, timeout)
+            return response
+        return wrapper
+    return decorator
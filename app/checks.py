@@ -0,0 +1,17 @@
+from django.core.checks import Error, Tags, register
+
+from .cache import cache_is_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Generation bumps must reach every web worker and the job worker"""
+    if cache_is_shared():
+        return []
+    return [Error(
+        'The default cache is local to each process, so a change saved by one '
+        'worker leaves the cached pages and counters of the others stale.',
+        hint='Point CACHE_BACKEND and CACHE_LOCATION at a shared cache, e.g. '
+             'django.core.cache.backends.redis.RedisCache and redis://redis:6379/1.',
+        id='app.E001',
+    )]
@@ -0,0 +1,266 @@
+import csv
+import datetime
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Elder, Volunteer, Donation, ContactInquiry, ImportRejectedRow
+from .search import icontains_filter
+
+
+# model -> [(field or lookup, column header)]; only these columns are read
+EXPORT_COLUMNS = {
+    Elder: [
+        ('registration_id', 'Registration ID'), ('full_name', 'Full name'), ('age', 'Age'),
+        ('phone_number', 'Phone'), ('address', 'Address'), ('guardian_name', 'Guardian'),
+        ('guardian_contact', 'Guardian contact'), ('guardian_email', 'Guardian email'),
+        ('guardian_relationship', 'Relationship'), ('status', 'Status'), ('created_at', 'Registered'),
+        ('approved_at', 'Approved'), ('approved_by__username', 'Approved by'),
+    ],
+    Volunteer: [
+        ('volunteer_id', 'Volunteer ID'), ('full_name', 'Full name'), ('email', 'Email'),
+        ('phone_number', 'Phone'), ('age', 'Age'), ('availability', 'Availability'), ('status', 'Status'),
+        ('created_at', 'Registered'), ('approved_at', 'Approved'), ('approved_by__username', 'Approved by'),
+    ],
+    Donation: [
+        ('id', 'ID'), ('donor_name', 'Donor'), ('donor_email', 'Email'), ('donor_phone', 'Phone'),
+        ('donation_type', 'Type'), ('description', 'Description'), ('status', 'Status'),
+        ('created_at', 'Offered'), ('fulfilled_at', 'Fulfilled'), ('fulfilled_by__username', 'Fulfilled by'),
+    ],
+    ContactInquiry: [
+        ('id', 'ID'), ('name', 'Name'), ('email', 'Email'), ('phone', 'Phone'), ('subject', 'Subject'),
+        ('message', 'Message'), ('is_resolved', 'Resolved'), ('created_at', 'Received'),
+    ],
+    # Error report of an import (see app.imports)
+    ImportRejectedRow: [
+        ('run_id', 'Import'), ('line', 'Line'), ('errors', 'Errors'), ('data', 'Row'),
+    ],
+}
+
+# Rows fetched per query
+EXPORT_CHUNK_SIZE = 2000
+
+
+def apply_list_filters(queryset, params):
+    """Apply the status/type/resolved filters of the admin list views"""
+    model = queryset.model
+    status = params.get('status', 'all')
+    if model in (Elder, Volunteer, Donation) and status != 'all':
+        queryset = queryset.filter(status=status)
+    if model is Donation and params.get('type', 'all') != 'all':
+        queryset = queryset.filter(donation_type=params['type'])
+    if model is ContactInquiry:
+        resolved = params.get('resolved', 'all')
+        if resolved == 'resolved':
+            queryset = queryset.filter(is_resolved=True)
+        elif resolved == 'unresolved':
+            queryset = queryset.filter(is_resolved=False)
+    return queryset
+
+
+def export_queryset(model, params):
+    """Everything the admin list shows for these GET params, unpaginated
+
+    A search exports every match rather than the top-ranked page.
+    """
+    queryset = apply_list_filters(model.objects.all(), params)
+    search_query = params.get('search', '').strip()
+    if search_query:
+        queryset = icontains_filter(queryset, search_query)
+    return queryset
+
+
+def iter_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield value tuples in pk order, one bounded query per chunk
+
+    Keyset chunks (pk > last seen) rather than a single iterator() query:
+    MySQLdb buffers a whole result set client-side, so only bounded queries
+    keep memory flat on large tables.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.values_list('pk', *fields)[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    return str(value)
+
+
+# Spreadsheet apps run a text cell starting with one of these as a formula
+# (e.g. =HYPERLINK(...) typed into a public form)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    """Cell text, with text that would be read as a formula quoted to stay text"""
+    text = _cell_text(value)
+    if isinstance(value, str) and text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+class _Echo:
+    """File-like object whose write() hands the value straight back"""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(headers, rows):
+    writer = csv.writer(_Echo())
+    yield '﻿' + writer.writerow(headers)  # BOM so Excel reads UTF-8
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([_csv_cell(value) for value in row]))
+        if len(buffer) >= 500:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+class _StreamBuffer:
+    """Write-only, unseekable sink that zipfile writes into; drained by the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+# Control characters XML 1.0 cannot represent at all, even escaped
+XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c><v>{value}</v></c>')
+        else:
+            text = escape(XML_ILLEGAL_RE.sub('', _cell_text(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+def xlsx_chunks(headers, rows):
+    """Stream a single-sheet XLSX workbook without holding it in memory
+
+    The sheet uses inline strings, so no shared-string table has to be built
+    up front, and zipfile writes to an unseekable buffer (sizes go in data
+    descriptors) that is drained after every few hundred rows.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(headers).encode())
+            pending = []
+            for row in rows:
+                pending.append(_xlsx_row(row))
+                if len(pending) >= 500:
+                    sheet.write(''.join(pending).encode())
+                    pending = []
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            sheet.write(''.join(pending).encode())
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv; charset=utf-8'),
+    'xlsx': (xlsx_chunks, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_response(queryset, export_format='csv'):
+    """Stream the export columns of `queryset` as a CSV or XLSX download"""
+    model = queryset.model
+    columns = EXPORT_COLUMNS[model]
+    fields = [field for field, _ in columns]
+    headers = [header for _, header in columns]
+    write_chunks, content_type = EXPORT_FORMATS[export_format]
+
+    response = StreamingHttpResponse(write_chunks(headers, iter_rows(queryset, fields)), content_type=content_type)
+    filename = f'{model._meta.verbose_name_plural.replace(" ", "_").lower()}_{timezone.localdate():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Keep nginx from buffering the whole download before sending it on
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,12 +1,13 @@
 from django import forms
 from .models import Elder, Volunteer, Donation, ContactInquiry, Testimonial
+from .idfilter import normalize_id
 
 class ElderRegistrationForm(forms.ModelForm):
     class Meta:
         model = Elder
         fields = [
             'full_name', 'photo', 'age', 'address', 'phone_number',
-            'id_proof', 'guardian_name', 'guardian_contact', 'guardian_relationship',
+            'id_proof', 'guardian_name', 'guardian_contact', 'guardian_email', 'guardian_relationship',
             'health_conditions', 'special_requirements'
         ]
         
@@ -45,6 +46,10 @@ class ElderRegistrationForm(forms.ModelForm):
                 'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500',
                 'placeholder': '+91XXXXXXXXXX'
             }),
+            'guardian_email': forms.EmailInput(attrs={
+                'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500',
+                'placeholder': 'guardian@example.com (optional)'
+            }),
             'guardian_relationship': forms.TextInput(attrs={
                 'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500',
                 'placeholder': 'Son/Daughter/Other'
@@ -230,6 +235,9 @@ class RegistrationStatusForm(forms.Form):
         label='Registration ID'
     )
 
+    def clean_registration_id(self):
+        return normalize_id(self.cleaned_data['registration_id'])
+
 class VolunteerStatusForm(forms.Form):
     volunteer_id = forms.CharField(
         max_length=20,
@@ -238,4 +246,7 @@ class VolunteerStatusForm(forms.Form):
             'placeholder': 'Enter Volunteer ID (e.g., VL2025-0001)'
         }),
         label='Volunteer ID'
-    )
\ No newline at end of file
+    )
+
+    def clean_volunteer_id(self):
+        return normalize_id(self.cleaned_data['volunteer_id'])
@@ -0,0 +1,331 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from io import BytesIO
+from itertools import islice
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image as PILImage, ImageOps
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+
+from .images import rendition_path
+from .models import Volunteer
+
+
+# Bump when the card layout changes so every card is re-rendered
+CARD_LAYOUT_VERSION = '1'
+
+CARD_DIRECTORY = 'idcards/volunteers'
+
+
+@lru_cache(maxsize=None)
+def card_styles():
+    """Stylesheet shared by every card render"""
+    styles = getSampleStyleSheet()
+    org_style = ParagraphStyle(
+        'OrgStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        alignment=1,
+        textColor=colors.darkblue,
+        spaceAfter=6,
+    )
+    return styles['Normal'], org_style
+
+
+def _photo_signature(volunteer):
+    if not volunteer.profile_photo:
+        return ''
+    try:
+        stat = os.stat(rendition_path(volunteer.profile_photo, 'card'))
+    except (OSError, ValueError, NotImplementedError):
+        return volunteer.profile_photo.name
+    return f'{volunteer.profile_photo.name}:{stat.st_size}:{int(stat.st_mtime)}'
+
+
+def card_fingerprint(volunteer):
+    """Hash of everything printed on the card; names the stored artifact"""
+    parts = [
+        CARD_LAYOUT_VERSION,
+        volunteer.full_name,
+        volunteer.volunteer_id,
+        volunteer.phone_number,
+        volunteer.approved_at.strftime('%Y') if volunteer.approved_at else '',
+        _photo_signature(volunteer),
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+def card_name(fingerprint):
+    return f'{CARD_DIRECTORY}/{fingerprint[:2]}/{fingerprint}.pdf'
+
+
+def render_volunteer_card(volunteer):
+    """Render the volunteer ID card PDF and return its bytes"""
+    normal_style, org_style = card_styles()
+
+    # Create PDF with ID card dimensions; invariant output keeps equal
+    # inputs byte-identical
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer,
+                            pagesize=(3.375*inch, 2.125*inch),
+                            leftMargin=0.2*inch,
+                            rightMargin=0.2*inch,
+                            topMargin=0.2*inch,
+                            bottomMargin=0.2*inch,
+                            invariant=1)
+
+    # Build content
+    content = []
+
+    # Organization header
+    content.append(Paragraph("VRUDHASHRAM KAMALBASANT", org_style))
+    content.append(Paragraph("VOLUNTEER ID CARD", org_style))
+    content.append(Spacer(1, 5))
+
+    # Create a table for the ID card
+    id_data = []
+
+    # Photo row
+    if volunteer.profile_photo:
+        try:
+            img = Image(rendition_path(volunteer.profile_photo, 'card'), width=0.8*inch, height=1*inch)
+            id_data.append([img])
+        except Exception:
+            id_data.append([Paragraph("Photo Not Available", normal_style)])
+    else:
+        id_data.append([Paragraph("Photo Not Available", normal_style)])
+
+    # Details rows
+    id_data.append([Paragraph(f"<b>{volunteer.full_name}</b>", normal_style)])
+    id_data.append([Paragraph(f"ID: {volunteer.volunteer_id}", normal_style)])
+    id_data.append([Paragraph(f"Phone: {volunteer.phone_number}", normal_style)])
+
+    if volunteer.approved_at:
+        id_data.append([Paragraph(f"Member Since: {volunteer.approved_at.strftime('%Y')}", normal_style)])
+
+    # Create ID card table
+    id_table = Table(id_data)
+    id_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+
+    content.append(id_table)
+    content.append(Spacer(1, 10))
+
+    # Footer
+    content.append(Paragraph("Authorized Signature", normal_style))
+    content.append(Paragraph("Valid until further notice", normal_style))
+
+    doc.build(content)
+    return buffer.getvalue()
+
+
+def refresh_volunteer_card(volunteer):
+    """Make sure the stored card matches the volunteer; render only if stale
+
+    Returns the storage name of the card, or None for unapproved volunteers.
+    """
+    if volunteer.status != 'approved':
+        return None
+    name = card_name(card_fingerprint(volunteer))
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, ContentFile(render_volunteer_card(volunteer)))
+        if saved != name:
+            # Another worker stored the same card first
+            default_storage.delete(saved)
+    if volunteer.id_card.name != name:
+        # update() rather than save() so the post_save hook is not re-entered
+        Volunteer.objects.filter(pk=volunteer.pk).update(id_card=name)
+        volunteer.id_card.name = name
+    return name
+
+
+# Batch printing: N-up card sheets on A4
+
+SHEET_COLUMNS = 2
+SHEET_ROWS = 5
+CARDS_PER_SHEET = SHEET_COLUMNS * SHEET_ROWS
+CARD_WIDTH = 3.375*inch
+CARD_HEIGHT = 2.125*inch
+PHOTO_WIDTH = 0.8*inch
+PHOTO_HEIGHT = 1*inch
+# Photo pixels at roughly 200 dpi, plenty for print at card size
+PHOTO_PIXELS = (160, 200)
+# Cards handed to the process pool at a time; bounds memory held in flight
+BATCH_SIZE = 200
+# Photo-decoding processes per render, whatever the worker's CPU count
+MAX_PROCESSES = 4
+# Rendered sheets are downloaded through protected media, then removed
+SHEET_DIRECTORY = 'idcards/sheets'
+SHEET_MAX_AGE = timedelta(days=1)
+
+
+def volunteer_card_data(volunteer):
+    """Plain, picklable description of a volunteer card for the render pool"""
+    lines = [f"ID: {volunteer.volunteer_id}", f"Phone: {volunteer.phone_number}"]
+    if volunteer.approved_at:
+        lines.append(f"Member Since: {volunteer.approved_at.strftime('%Y')}")
+    return {
+        'title': 'VOLUNTEER ID CARD',
+        'name': volunteer.full_name,
+        'lines': lines,
+        'photo': rendition_path(volunteer.profile_photo, 'card'),
+    }
+
+
+def elder_card_data(elder):
+    """Plain, picklable description of an elder card for the render pool"""
+    return {
+        'title': 'RESIDENT ID CARD',
+        'name': elder.full_name,
+        'lines': [
+            f"ID: {elder.registration_id}",
+            f"Age: {elder.age}",
+            f"Guardian: {elder.guardian_name}",
+            f"Contact: {elder.guardian_contact}",
+        ],
+        'photo': rendition_path(elder.photo, 'card'),
+    }
+
+
+def prepare_card(card):
+    """Decode, orient and shrink the card photo; runs in a pool process"""
+    path = card.pop('photo', None)
+    card['photo_bytes'] = None
+    if path:
+        try:
+            with PILImage.open(path) as image:
+                # Let JPEG decode at a reduced scale instead of full resolution
+                image.draft('RGB', (PHOTO_PIXELS[0] * 2, PHOTO_PIXELS[1] * 2))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail(PHOTO_PIXELS)
+                buffer = BytesIO()
+                image.convert('RGB').save(buffer, 'JPEG', quality=85)
+                card['photo_bytes'] = buffer.getvalue()
+        except (OSError, ValueError):
+            pass
+    return card
+
+
+def draw_card(pdf, x, y, card):
+    """Draw one card with its lower-left corner at (x, y)"""
+    pdf.setStrokeColor(colors.grey)
+    pdf.roundRect(x, y, CARD_WIDTH, CARD_HEIGHT, 6)
+
+    pdf.setFillColor(colors.darkblue)
+    pdf.setFont('Helvetica-Bold', 9)
+    pdf.drawCentredString(x + CARD_WIDTH / 2, y + CARD_HEIGHT - 0.22*inch, "VRUDHASHRAM KAMALBASANT")
+    pdf.setFont('Helvetica', 7)
+    pdf.drawCentredString(x + CARD_WIDTH / 2, y + CARD_HEIGHT - 0.36*inch, card['title'])
+
+    photo_x = x + 0.15*inch
+    photo_y = y + CARD_HEIGHT - 0.5*inch - PHOTO_HEIGHT
+    if card['photo_bytes']:
+        pdf.drawImage(ImageReader(BytesIO(card['photo_bytes'])), photo_x, photo_y,
+                      width=PHOTO_WIDTH, height=PHOTO_HEIGHT, preserveAspectRatio=True)
+    else:
+        pdf.rect(photo_x, photo_y, PHOTO_WIDTH, PHOTO_HEIGHT)
+        pdf.setFont('Helvetica', 6)
+        pdf.drawCentredString(photo_x + PHOTO_WIDTH / 2, photo_y + PHOTO_HEIGHT / 2, "Photo Not Available")
+
+    text_x = photo_x + PHOTO_WIDTH + 0.15*inch
+    text_y = y + CARD_HEIGHT - 0.65*inch
+    pdf.setFillColor(colors.black)
+    pdf.setFont('Helvetica-Bold', 8)
+    pdf.drawString(text_x, text_y, card['name'][:40])
+    pdf.setFont('Helvetica', 7)
+    for line in card['lines']:
+        text_y -= 0.17*inch
+        pdf.drawString(text_x, text_y, line[:48])
+
+    pdf.setFont('Helvetica-Oblique', 6)
+    pdf.drawString(x + 0.15*inch, y + 0.12*inch, "Authorized Signature")
+    pdf.drawRightString(x + CARD_WIDTH - 0.15*inch, y + 0.12*inch, "Valid until further notice")
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_card_sheets(cards, output, processes=None):
+    """Lay out cards N-up on A4 pages and write the PDF to `output`
+
+    Photo decoding and resizing, the expensive part, runs in a process pool;
+    only small JPEG thumbnails come back, a batch at a time. Runs in the
+    run_jobs worker (see save_card_sheets), never in a web worker.
+    """
+    page_width, page_height = A4
+    margin_x = (page_width - SHEET_COLUMNS * CARD_WIDTH) / 2
+    margin_y = (page_height - SHEET_ROWS * CARD_HEIGHT) / 2
+
+    pdf = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+    pdf.setTitle("ID Cards")
+    count = 0
+    with ProcessPoolExecutor(max_workers=processes or min(MAX_PROCESSES, os.cpu_count() or 1)) as pool:
+        for batch in _batches(cards, BATCH_SIZE):
+            for card in pool.map(prepare_card, batch, chunksize=20):
+                slot = count % CARDS_PER_SHEET
+                if count and slot == 0:
+                    pdf.showPage()
+                column, row = slot % SHEET_COLUMNS, slot // SHEET_COLUMNS
+                x = margin_x + column * CARD_WIDTH
+                y = page_height - margin_y - (row + 1) * CARD_HEIGHT
+                draw_card(pdf, x, y, card)
+                count += 1
+    if count == 0:
+        pdf.drawCentredString(page_width / 2, page_height / 2, "No approved records selected")
+    pdf.save()
+    return count
+
+
+def card_sheet_name(filename):
+    """A fresh storage name for a batch of card sheets"""
+    return f'{SHEET_DIRECTORY}/{uuid.uuid4().hex}/{filename}'
+
+
+def purge_card_sheets(max_age=SHEET_MAX_AGE):
+    """Delete card sheets rendered more than `max_age` ago"""
+    if not default_storage.exists(SHEET_DIRECTORY):
+        return
+    cutoff = timezone.now() - max_age
+    directories, _ = default_storage.listdir(SHEET_DIRECTORY)
+    for directory in directories:
+        path = f'{SHEET_DIRECTORY}/{directory}'
+        _, files = default_storage.listdir(path)
+        old = [name for name in (f'{path}/{filename}' for filename in files)
+               if default_storage.get_modified_time(name) < cutoff]
+        for name in old:
+            default_storage.delete(name)
+        if len(old) == len(files):
+            try:
+                os.rmdir(default_storage.path(path))
+            except OSError:
+                pass
+
+
+def save_card_sheets(cards, name):
+    """Render card sheets to a temporary file and store them under `name`"""
+    with tempfile.TemporaryFile() as output:
+        write_card_sheets(cards, output)
+        output.seek(0)
+        return default_storage.save(name, File(output))
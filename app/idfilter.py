@@ -0,0 +1,143 @@
+import hashlib
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .cache import get_generations
+from .models import Elder, Volunteer
+
+
+def normalize_id(value):
+    """Canonical form of a registration/volunteer ID as stored in the database"""
+    return (value or '').strip().upper()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(1024, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class IssuedIdFilter:
+    """Negative-lookup cache for one model's public ID column
+
+    Answers "definitely not issued" without a query for malformed IDs and
+    for well-formed IDs missing from the Bloom filter. The filter is rebuilt
+    when the model's cache generation shows another process changed it.
+    A bump can still be missed (evicted, or raced with the read), so once
+    the filter is older than ID_FILTER_MAX_AGE a fresh one is built in a
+    background thread; requests keep using the old one meanwhile.
+    """
+
+    def __init__(self, model, field, pattern):
+        self.model = model
+        self.field = field
+        self.pattern = re.compile(pattern)
+        self.bloom = None
+        self.generation = None
+        self.built_at = 0
+        self.refreshing = False
+        # IDs issued here while a refresh reads the table
+        self.issued_during_refresh = []
+        self.lock = threading.Lock()
+
+    def build(self):
+        ids = self.model.objects.order_by().values_list(self.field, flat=True)
+        bloom = BloomFilter(capacity=2 * ids.count() + 1000)
+        for value in ids.iterator(chunk_size=5000):
+            bloom.add(value)
+        return bloom
+
+    def rebuild(self):
+        self.bloom = self.build()
+        self.built_at = time.monotonic()
+
+    def refresh(self):
+        """Build a new filter without holding the lock, then swap it in"""
+        generation = get_generations(self.model)[0]
+        started = time.monotonic()
+        bloom = self.build()
+        with self.lock:
+            for value in self.issued_during_refresh:
+                bloom.add(value)
+            self.issued_during_refresh = []
+            # A bump during the build leaves the generation behind, so the
+            # next lookup rebuilds again
+            self.bloom = bloom
+            self.generation = generation
+            self.built_at = started
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self.lock:
+                self.refreshing = False
+            # The thread's own database connection
+            connection.close()
+
+    def refresh_later(self):
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def might_exist(self, value):
+        if not self.pattern.match(value):
+            return False
+        generation = get_generations(self.model)[0]
+        with self.lock:
+            if self.generation != generation:
+                self.rebuild()
+                self.generation = generation
+            if not self.refreshing and time.monotonic() - self.built_at >= settings.ID_FILTER_MAX_AGE:
+                self.refreshing = True
+                self.refresh_later()
+            return value in self.bloom
+
+    def add(self, value):
+        """Record an ID issued by this process"""
+        with self.lock:
+            if self.bloom is None or not value:
+                return
+            self.bloom.add(value)
+            if self.refreshing:
+                self.issued_during_refresh.append(value)
+            # Only our own bump happened since the last build: still complete
+            current = get_generations(self.model)[0]
+            if current == self.generation + 1:
+                self.generation = current
+
+
+ID_FILTERS = {
+    Elder: IssuedIdFilter(Elder, 'registration_id', r'^VK\d{4}-\d{4,}$'),
+    Volunteer: IssuedIdFilter(Volunteer, 'volunteer_id', r'^VL\d{4}-\d{4,}$'),
+}
+
+
+def might_exist(model, value):
+    """False only when the ID was certainly never issued"""
+    return ID_FILTERS[model].might_exist(value)
+
+
+def record_issued_id(instance):
+    id_filter = ID_FILTERS[type(instance)]
+    id_filter.add(getattr(instance, id_filter.field))
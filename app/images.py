@@ -0,0 +1,107 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .media import file_etag
+
+
+# Longest edge kept for the stored original; phone photos are shrunk to this
+MAX_ORIGINAL_EDGE = 2000
+
+# name: (bounding box, Pillow format, file extension)
+RENDITIONS = {
+    'thumb': ((200, 200), 'WEBP', 'webp'),
+    'card': ((320, 400), 'JPEG', 'jpg'),
+    'display': ((800, 800), 'WEBP', 'webp'),
+}
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+    'PNG': {'optimize': True},
+}
+
+def rendition_name(name, rendition):
+    """Storage name of a rendition, e.g. renditions/elders/photos/elder_X/thumb.webp"""
+    base, _ = os.path.splitext(name)
+    return f'renditions/{base}/{rendition}.{RENDITIONS[rendition][2]}'
+
+
+def rendition_url(fieldfile, rendition):
+    """URL of the rendition if it has been generated, else of the original
+
+    Rendition URLs carry a content version so protected_media can let
+    browsers cache them as immutable.
+    """
+    if not fieldfile:
+        return None
+    name = rendition_name(fieldfile.name, rendition)
+    try:
+        stat = os.stat(default_storage.path(name))
+    except FileNotFoundError:
+        return fieldfile.url
+    return f'{default_storage.url(name)}?v={file_etag(stat)}'
+
+
+def rendition_path(fieldfile, rendition):
+    """Filesystem path of the rendition if it exists, else of the original"""
+    if not fieldfile:
+        return None
+    name = rendition_name(fieldfile.name, rendition)
+    if default_storage.exists(name):
+        return default_storage.path(name)
+    return fieldfile.path
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    return buffer.getvalue()
+
+
+def _replace(name, data):
+    """Atomically overwrite a stored file, keeping its name"""
+    if hasattr(default_storage, 'replace'):
+        # ContentAddressedStorage: re-link the name to the new content's blob
+        default_storage.replace(name, ContentFile(data))
+        return
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+
+
+def process_image(name):
+    """Normalize an uploaded photo and write its renditions
+
+    The original is rotated upright, stripped of EXIF (GPS, device data) and
+    shrunk to MAX_ORIGINAL_EDGE. Renditions are derived from that.
+    """
+    with default_storage.open(name, 'rb') as handle:
+        with Image.open(handle) as source:
+            original_format = source.format or 'JPEG'
+            has_exif = bool(source.getexif())
+            source.draft('RGB', (MAX_ORIGINAL_EDGE, MAX_ORIGINAL_EDGE))
+            image = ImageOps.exif_transpose(source)
+            image.load()
+
+    if has_exif or max(image.size) > MAX_ORIGINAL_EDGE:
+        image.thumbnail((MAX_ORIGINAL_EDGE, MAX_ORIGINAL_EDGE))
+        _replace(name, _encode(image, original_format))
+
+    for rendition, (size, image_format, _) in RENDITIONS.items():
+        copy = image.copy()
+        copy.thumbnail(size)
+        _replace(rendition_name(name, rendition), _encode(copy, image_format))
+
+
+def needs_processing(fieldfile):
+    return bool(fieldfile) and not default_storage.exists(rendition_name(fieldfile.name, 'thumb'))
+
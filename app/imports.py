@@ -0,0 +1,224 @@
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .exports import EXPORT_COLUMNS, FORMULA_PREFIXES
+from .models import Elder, Volunteer, Donation, ImportRejectedRow, ImportRun, RegistrationSequence
+
+
+# Sent after each committed batch with sender=model and count (rows created);
+# bulk_create sends no post_save, so receivers in app.signals do the cache
+# bookkeeping. Per batch, so rows already committed are announced even when
+# the import dies half-way
+records_imported = Signal()
+
+# Rows validated and inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+IMPORT_MODELS = {'elder': Elder, 'volunteer': Volunteer, 'donation': Donation}
+
+# Columns an import fills; photos and ID proofs are not part of legacy
+# records, and public IDs, timestamps and audit fields are set here
+IMPORT_FIELDS = {
+    Elder: [
+        'full_name', 'age', 'address', 'phone_number', 'guardian_name', 'guardian_contact',
+        'guardian_relationship', 'guardian_email', 'health_conditions', 'special_requirements', 'status',
+    ],
+    Volunteer: [
+        'full_name', 'email', 'phone_number', 'address', 'age', 'skills', 'availability', 'experience', 'status',
+    ],
+    Donation: [
+        'donor_name', 'donor_email', 'donor_phone', 'donation_type', 'description', 'message', 'status',
+    ],
+}
+
+# model -> (ID field, RegistrationSequence prefix)
+SEQUENCE_IDS = {Elder: ('registration_id', 'VK'), Volunteer: ('volunteer_id', 'VL')}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be imported (bad header, not UTF-8 CSV)"""
+
+
+def _header_key(text):
+    return ' '.join((text or '').replace('_', ' ').lower().split())
+
+
+def map_columns(model, header):
+    """Map header cells to import fields: {column index: field name}
+
+    A column may be named by its field, its verbose name or its header in
+    the CSV export, so exported files can be imported again. Unknown columns
+    are ignored; a missing required column fails the whole file.
+    """
+    names = {}
+    export_headers = dict(EXPORT_COLUMNS.get(model, []))
+    for name in IMPORT_FIELDS[model]:
+        field = model._meta.get_field(name)
+        for alias in (name, field.verbose_name, export_headers.get(name)):
+            if alias:
+                names[_header_key(alias)] = name
+
+    columns = {}
+    for index, cell in enumerate(header):
+        name = names.get(_header_key(cell))
+        if name and name not in columns.values():
+            columns[index] = name
+
+    missing = [
+        name for name in IMPORT_FIELDS[model]
+        if name not in columns.values()
+        and not model._meta.get_field(name).blank and not model._meta.get_field(name).has_default()
+    ]
+    if missing:
+        raise ImportFormatError(f'Missing required columns: {", ".join(missing)}')
+    return columns
+
+
+def clean_row(model, columns, row):
+    """Validate one CSV row with the model fields' own checks
+
+    Returns (field values, errors), errors being "field: message" strings.
+    """
+    raw = {name: '' for name in IMPORT_FIELDS[model]}
+    for index, name in columns.items():
+        if index < len(row):
+            raw[name] = row[index].strip()
+            # Undo the quote CSV exports put before formula-like text
+            if raw[name][:1] == "'" and raw[name][1:2].startswith(FORMULA_PREFIXES):
+                raw[name] = raw[name][1:]
+
+    values, errors = {}, []
+    for name, value in raw.items():
+        field = model._meta.get_field(name)
+        if value == '' and field.has_default():
+            values[name] = field.get_default()
+            continue
+        if value == '' and not field.blank:
+            errors.append(f'{name}: This field is required.')
+            continue
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors.append(f'{name}: {" ".join(error.messages)}')
+    return values, errors
+
+
+def read_batches(reader, size, skip=0):
+    """Yield lists of (line number, row) from a csv.reader, skipping blank rows
+
+    The first `skip` data rows are passed over, so an interrupted import can
+    continue where it left off.
+    """
+    batch = []
+    line = reader.line_num + 1
+    for row in reader:
+        start, line = line, reader.line_num + 1
+        if not any(cell.strip() for cell in row):
+            continue
+        if skip:
+            skip -= 1
+            continue
+        batch.append((start, row))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_batch(model, columns, batch, on_commit=None):
+    """Validate a batch and insert its valid rows in one transaction
+
+    Public IDs come from one reserved block per batch, reserved before the
+    transaction so the sequence row is not locked while rows are inserted;
+    a rolled-back batch leaves a gap in the numbering. `on_commit(created,
+    rejected)` runs inside the transaction, so bookkeeping commits with the
+    rows; records_imported is sent once they are committed. Returns
+    (created count, [(line, errors, row)]).
+    """
+    instances, rejected = [], []
+    for line, row in batch:
+        values, errors = clean_row(model, columns, row)
+        if errors:
+            rejected.append((line, errors, row))
+        else:
+            instances.append(model(**values))
+
+    if model in SEQUENCE_IDS and instances:
+        field, prefix = SEQUENCE_IDS[model]
+        for instance, value in zip(instances, RegistrationSequence.objects.reserve_block(prefix, len(instances))):
+            setattr(instance, field, value)
+
+    with transaction.atomic():
+        model.objects.bulk_create(instances)
+        if on_commit is not None:
+            on_commit(len(instances), rejected)
+        if instances:
+            count = len(instances)
+            transaction.on_commit(lambda: records_imported.send(sender=model, count=count))
+    return len(instances), rejected
+
+
+def open_csv(binary_file):
+    return csv.reader(io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline=''))
+
+
+def import_csv(model, binary_file, batch_size=IMPORT_BATCH_SIZE, skip=0, on_commit=None):
+    """Import a CSV file of `model` records batch by batch
+
+    The file is read as a stream, so its size does not matter. Raises
+    ImportFormatError if the header or the encoding is unusable; batches
+    committed before that stay imported. Returns (created, rejected) counts.
+    """
+    reader = open_csv(binary_file)
+    created = rejected = 0
+    try:
+        columns = map_columns(model, next(reader, []))
+        for batch in read_batches(reader, batch_size, skip):
+            count, rows = import_batch(model, columns, batch, on_commit)
+            created += count
+            rejected += len(rows)
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise ImportFormatError(f'Line {reader.line_num + 1}: not a readable UTF-8 CSV file ({error})')
+    return created, rejected
+
+
+def encode_row(row):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue().rstrip('\r\n')
+
+
+def run_import(run, batch_size=IMPORT_BATCH_SIZE):
+    """Import an ImportRun's file, resuming after the rows already committed
+
+    Each batch's rejected rows and the run's counters are written in the
+    batch's own transaction, so a retried job neither repeats nor skips rows.
+    """
+    model = IMPORT_MODELS[run.model_name]
+    ImportRun.objects.filter(pk=run.pk).update(status='running')
+
+    def record(created, rejected):
+        ImportRejectedRow.objects.bulk_create([
+            ImportRejectedRow(run=run, line=line, errors='; '.join(errors), data=encode_row(row))
+            for line, errors, row in rejected
+        ])
+        ImportRun.objects.filter(pk=run.pk).update(
+            rows_processed=F('rows_processed') + created + len(rejected),
+            rows_imported=F('rows_imported') + created,
+            rows_rejected=F('rows_rejected') + len(rejected),
+        )
+
+    status, error = 'done', ''
+    try:
+        with run.csv_file.open('rb') as source:
+            import_csv(model, source, batch_size, skip=run.rows_processed, on_commit=record)
+    except ImportFormatError as format_error:
+        status, error = 'failed', str(format_error)
+    ImportRun.objects.filter(pk=run.pk).update(status=status, error=error, finished_at=timezone.now())
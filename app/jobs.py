@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# name -> {'func', 'priority', 'max_attempts', 'timeout'}; filled by @task
+TASKS = {}
+
+# Retry delays double from RETRY_BASE_SECONDS up to RETRY_MAX_SECONDS, with
+# jitter so jobs that failed together don't retry together
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+
+# Finished jobs are kept this long for inspection in the admin
+KEEP_FINISHED_DAYS = 7
+
+
+def task(name, priority=0, max_attempts=5, timeout=300):
+    """Register a function as a background task
+
+    The function is called with the job payload as keyword arguments. Jobs
+    can run more than once (a worker dying mid-job, a job outliving its
+    `timeout`), so tasks must be safe to repeat.
+    """
+    def register(func):
+        TASKS[name] = {'func': func, 'priority': priority, 'max_attempts': max_attempts, 'timeout': timeout}
+        return func
+    return register
+
+
+def _dedupe_key(name, payload):
+    encoded = json.dumps([name, payload], sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def enqueue(name, payload=None, priority=None, delay=None, unique=False):
+    """Queue a registered task
+
+    The job is an ordinary row, so it becomes visible to workers only when
+    the surrounding transaction commits. With `unique`, nothing is queued if
+    the same task and payload is already waiting.
+    """
+    spec = TASKS[name]
+    payload = payload or {}
+    key = _dedupe_key(name, payload) if unique else ''
+    if unique and Job.objects.filter(dedupe_key=key, status='queued').exists():
+        return None
+    return Job.objects.create(
+        task=name,
+        payload=payload,
+        priority=spec['priority'] if priority is None else priority,
+        max_attempts=spec['max_attempts'],
+        timeout=spec['timeout'],
+        run_at=timezone.now() + (delay or timedelta()),
+        dedupe_key=key,
+    )
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def claim_jobs(worker, limit=10):
+    """Lock up to `limit` due jobs for `worker`, highest priority first
+
+    Due means queued and past run_at, or running with an expired visibility
+    timeout (its worker died or hung). Each row is claimed with a
+    conditional UPDATE on its attempt count, so two workers can never both
+    win the same job, on any database.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(
+        Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+    ).order_by('-priority', 'run_at')[:limit]
+
+    claimed = []
+    for job in due:
+        if job.status == 'running' and job.attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk, attempts=job.attempts, status='running').update(
+                status='failed', finished_at=now, locked_until=None,
+                last_error=f'Timed out after {job.timeout}s on its last attempt'
+            )
+            continue
+        locked_until = now + timedelta(seconds=job.timeout)
+        won = Job.objects.filter(pk=job.pk, attempts=job.attempts, status=job.status).update(
+            status='running', attempts=F('attempts') + 1, locked_by=worker, locked_until=locked_until
+        )
+        if won:
+            job.status, job.attempts, job.locked_by, job.locked_until = 'running', job.attempts + 1, worker, locked_until
+            claimed.append(job)
+    return claimed
+
+
+def _owned(job):
+    # No longer ours if the visibility timeout ran out and another worker took it
+    return Job.objects.filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts, status='running')
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns True on success"""
+    spec = TASKS.get(job.task)
+    try:
+        if spec is None:
+            raise LookupError(f'Unknown task {job.task}')
+        spec['func'](**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            logger.error('Job %s (%s) failed for good:\n%s', job.pk, job.task, error)
+            _owned(job).update(status='failed', finished_at=now, locked_until=None, last_error=error)
+        else:
+            logger.warning('Job %s (%s) failed on attempt %s, will retry', job.pk, job.task, job.attempts)
+            _owned(job).update(
+                status='queued', run_at=now + retry_delay(job.attempts), locked_until=None, last_error=error
+            )
+        return False
+
+    _owned(job).update(status='done', finished_at=timezone.now(), locked_until=None, last_error='')
+    return True
+
+
+def release_job(job):
+    """Hand a claimed but unstarted job straight back to the queue"""
+    _owned(job).update(status='queued', attempts=F('attempts') - 1, locked_until=None)
+
+
+def purge_finished_jobs(days=KEEP_FINISHED_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,124 @@
+import http.client
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Mode -> gunicorn application and extra arguments
+SERVER_MODES = {
+    'sync': ['project.wsgi:application'],
+    'async': ['project.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Start gunicorn with sync (WSGI) and then uvicorn (ASGI) workers, hold connections open with '
+        'slow clients trickling their requests, and measure the latency of normal clients meanwhile'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=list(SERVER_MODES), default=list(SERVER_MODES))
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--port', type=int, default=8790)
+        parser.add_argument('--path', default='/check-registration/', help='Page the normal clients request')
+        parser.add_argument('--clients', type=int, default=10, help='Normal clients')
+        parser.add_argument('--slow-clients', type=int, default=6, help='Clients sending one request byte per second')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per mode')
+
+    def start_server(self, mode, options):
+        command = [
+            sys.executable, '-m', 'gunicorn', *SERVER_MODES[mode],
+            '--bind', f'127.0.0.1:{options["port"]}', '--workers', str(options['workers']),
+        ]
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with {server.returncode}: {" ".join(command)}')
+            try:
+                socket.create_connection(('127.0.0.1', options['port']), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError('gunicorn did not start listening within 30s')
+
+    def slow_client(self, options, deadline):
+        # Sends its request one byte per second, like a phone on a bad connection
+        request = f'GET {options["path"]} HTTP/1.1\r\nHost: 127.0.0.1\r\nUser-Agent: {"x" * 64}\r\n\r\n'.encode()
+        try:
+            with socket.create_connection(('127.0.0.1', options['port']), timeout=5) as sock:
+                for byte in request:
+                    if time.monotonic() >= deadline:
+                        break
+                    sock.sendall(bytes([byte]))
+                    time.sleep(1)
+        except OSError:
+            pass
+
+    def client(self, options, deadline, latencies, failures):
+        connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=options['duration'] + 5)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', options['path'])
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                failures.append(1)
+                connection.close()
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        connection.close()
+
+    def run_mode(self, mode, options):
+        server = self.start_server(mode, options)
+        try:
+            # Warm up caches and lazily imported modules in every worker
+            for _ in range(options['workers'] * 5):
+                connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=10)
+                connection.request('GET', options['path'])
+                connection.getresponse().read()
+                connection.close()
+
+            deadline = time.monotonic() + options['duration']
+            latencies, failures = [], []
+            slow = [threading.Thread(target=self.slow_client, args=(options, deadline)) for _ in range(options['slow_clients'])]
+            for thread in slow:
+                thread.start()
+            time.sleep(0.5)  # Let the slow clients take their connections first
+            clients = [
+                threading.Thread(target=self.client, args=(options, deadline, latencies, failures))
+                for _ in range(options['clients'])
+            ]
+            start = time.monotonic()
+            for thread in clients:
+                thread.start()
+            for thread in clients + slow:
+                thread.join()
+            elapsed = time.monotonic() - start
+        finally:
+            server.terminate()
+            server.wait()
+
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else float('nan')
+        median = statistics.median(latencies) if latencies else float('nan')
+        self.stdout.write(
+            f'{mode:6} {len(latencies) / elapsed:8.1f} req/s  median {median:8.1f} ms  p99 {p99:8.1f} ms  '
+            f'failed {len(failures)}'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{options["workers"]} workers, {options["clients"]} clients on {options["path"]}, '
+            f'{options["slow_clients"]} slow clients, {options["duration"]:.0f}s per mode'
+        )
+        for mode in options['modes']:
+            self.run_mode(mode, options)
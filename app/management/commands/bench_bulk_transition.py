@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app.models import Elder, Donation, Job, RegistrationSequence
+from app.transitions import transition
+
+
+BENCH_NAME = 'Bench transition'
+
+
+class Command(BaseCommand):
+    help = 'Time a bulk status transition against one save() per row, on throwaway rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--model', choices=['elder', 'donation'], default='elder')
+        parser.add_argument('--sample', type=int, default=300, help='Rows timed for the per-row save() baseline')
+
+    def create_rows(self, model, count):
+        if model is Donation:
+            rows = [Donation(donor_name=BENCH_NAME, donor_email='bench@example.com', donor_phone='9999999999',
+                             donation_type='food', description='bench') for _ in range(count)]
+        else:
+            ids = RegistrationSequence.objects.reserve_block('VK', count)
+            rows = [Elder(registration_id=registration_id, full_name=BENCH_NAME, age=70, address='bench',
+                          photo='bench.jpg', id_proof='bench.pdf', guardian_name='bench',
+                          guardian_contact='9999999999') for registration_id in ids]
+        model.objects.bulk_create(rows, batch_size=1000)
+        return model.objects.filter(**{'donor_name' if model is Donation else 'full_name': BENCH_NAME})
+
+    def handle(self, *args, **options):
+        model = Donation if options['model'] == 'donation' else Elder
+        action = 'fulfil' if model is Donation else 'approve'
+        target = 'fulfilled' if model is Donation else 'approved'
+        user = User.objects.filter(is_superuser=True).first()
+        last_job = Job.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        rows = self.create_rows(model, options['rows'])
+        try:
+            sample = list(rows[:options['sample']])
+            start = time.perf_counter()
+            for row in sample:
+                row.status = target
+                if model is Donation:
+                    row.fulfilled_at, row.fulfilled_by = timezone.now(), user
+                else:
+                    row.approved_at, row.approved_by = timezone.now(), user
+                row.save()
+            per_row = (time.perf_counter() - start) / len(sample)
+            model.objects.filter(pk__in=[row.pk for row in sample]).update(status='pending')
+
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                changed = transition(rows, action, user)
+                bulk = time.perf_counter() - start
+        finally:
+            rows.delete()
+            Job.objects.filter(pk__gt=last_job).delete()
+
+        self.stdout.write(
+            f'save() per row: {per_row * 1000:.2f} ms/row, ~{per_row * options["rows"]:.1f}s '
+            f'for {options["rows"]} rows'
+        )
+        self.stdout.write(
+            f'transition():   {bulk:.2f}s for {changed} rows in {len(queries)} queries'
+        )
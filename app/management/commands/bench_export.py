@@ -0,0 +1,80 @@
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+
+from app.cache import bump_generation
+from app.exports import EXPORT_COLUMNS, EXPORT_FORMATS, export_response
+from app.models import ContactInquiry
+
+
+BENCH_SUBJECT = 'Bench export'
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), falling back to the peak elsewhere"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Stream an export of many throwaway inquiries and report rows/s and worker RSS'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument(
+            '--mode', choices=['streaming', 'buffered'], default='streaming',
+            help='buffered: load every row and build the whole file before responding, as a plain HttpResponse would'
+        )
+
+    def seed(self, count):
+        batch = 5000
+        for start in range(0, count, batch):
+            ContactInquiry.objects.bulk_create([
+                ContactInquiry(name=f'Bench {i}', email=f'bench{i}@example.com', phone='9999999999',
+                               subject=BENCH_SUBJECT, message='Lorem ipsum dolor sit amet, ' * 4)
+                for i in range(start, min(start + batch, count))
+            ])
+
+    def handle(self, *args, **options):
+        self.seed(options['rows'])
+        rows = ContactInquiry.objects.filter(subject=BENCH_SUBJECT)
+        try:
+            reset_queries()
+            baseline = peak = current_rss_mb()
+            size = 0
+            start = time.perf_counter()
+            if options['mode'] == 'buffered':
+                write_chunks = EXPORT_FORMATS[options['format']][0]
+                columns = EXPORT_COLUMNS[ContactInquiry]
+                values = list(rows.order_by('pk').values_list(*[field for field, _ in columns]))
+                content = [chunk for chunk in write_chunks([header for _, header in columns], values)]
+                peak = current_rss_mb()
+                size = sum(len(chunk) for chunk in content)
+            else:
+                response = export_response(rows, options['format'])
+                for count, chunk in enumerate(response.streaming_content):
+                    size += len(chunk)
+                    if count % 50 == 0:
+                        peak = max(peak, current_rss_mb())
+                        reset_queries()
+            elapsed = time.perf_counter() - start
+        finally:
+            # Raw DELETE: rows.delete() would load every row to send post_delete
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(ContactInquiry._meta.db_table)} WHERE subject = %s',
+                    [BENCH_SUBJECT]
+                )
+            bump_generation(ContactInquiry)
+
+        self.stdout.write(
+            f'{options["mode"]} {options["format"]}: {options["rows"]} rows, {size / 2**20:.1f} MB '
+            f'in {elapsed:.2f}s ({options["rows"] / elapsed:,.0f} rows/s)'
+        )
+        self.stdout.write(f'RSS: {baseline:.0f} MB before, {peak:.0f} MB peak (+{peak - baseline:.0f} MB)')
@@ -0,0 +1,114 @@
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Variant -> gunicorn arguments; "-c /dev/null" keeps gunicorn.conf.py out of the baseline
+VARIANTS = {
+    'baseline': ['-c', '/dev/null', 'project.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+    'tuned': ['-c', 'gunicorn.conf.py'],
+}
+
+PATHS = ['/', '/about/', '/testimonials/', '/check-registration/', '/check-volunteer/', '/donate/']
+
+
+def memory(pid):
+    """RSS, PSS and private (USS) memory of a process in KB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+class Command(BaseCommand):
+    help = 'Compare startup time and memory per worker of a bare gunicorn and gunicorn.conf.py (preload, gc.freeze)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+        parser.add_argument('--workers', type=int, default=3)
+        parser.add_argument('--port', type=int, default=8790)
+        parser.add_argument('--requests', type=int, default=300, help='Requests sent before measuring memory')
+
+    def wait_for_workers(self, server, options):
+        """Wait until every worker is running and a page has been served"""
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with {server.returncode}')
+            if len(children(server.pid)) >= options['workers']:
+                try:
+                    connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=30)
+                    connection.request('GET', '/')
+                    if connection.getresponse().status == 200:
+                        return
+                except (OSError, http.client.HTTPException):
+                    pass
+                finally:
+                    connection.close()
+            time.sleep(0.05)
+        raise CommandError('gunicorn did not serve a page within 60s')
+
+    def run_variant(self, variant, options):
+        command = [
+            sys.executable, '-m', 'gunicorn', *VARIANTS[variant],
+            '--bind', f'127.0.0.1:{options["port"]}', '--workers', str(options['workers']),
+        ]
+        # gunicorn.conf.py refuses several workers on a per-process cache;
+        # a file cache is shared and needs no server
+        env = {
+            **os.environ,
+            'CACHE_BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'CACHE_LOCATION': tempfile.mkdtemp(prefix='bench-cache-'),
+        }
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_workers(server, options)
+            startup = time.perf_counter() - start
+
+            # Each connection lands on some worker; enough of them reach every
+            # worker so all have imported and warmed the same code
+            for number in range(options['requests']):
+                connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=30)
+                connection.request('GET', PATHS[number % len(PATHS)])
+                connection.getresponse().read()
+                connection.close()
+
+            master = memory(server.pid)
+            workers = [memory(pid) for pid in children(server.pid)]
+        finally:
+            server.terminate()
+            server.wait()
+
+        count = len(workers)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{variant} ({count} workers, first page after {startup:.2f}s)'))
+        self.stdout.write(f'  master          RSS {master[0] / 1024:7.1f} MB  PSS {master[1] / 1024:7.1f} MB  private {master[2] / 1024:7.1f} MB')
+        self.stdout.write(
+            f'  per worker      RSS {sum(w[0] for w in workers) / count / 1024:7.1f} MB  '
+            f'PSS {sum(w[1] for w in workers) / count / 1024:7.1f} MB  '
+            f'private {sum(w[2] for w in workers) / count / 1024:7.1f} MB'
+        )
+        total_pss = master[1] + sum(w[1] for w in workers)
+        self.stdout.write(f'  total PSS {total_pss / 1024:.1f} MB')
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Needs Linux /proc/<pid>/smaps_rollup')
+        for variant in options['variants']:
+            self.run_variant(variant, options)
@@ -0,0 +1,83 @@
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test public pages over HTTP, e.g. through nginx and straight to gunicorn: '
+        'bench_http http://localhost/ http://localhost:8000/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+', help='Base URLs to compare')
+        parser.add_argument('--paths', nargs='+', default=['/', '/about/', '/testimonials/'])
+        parser.add_argument('--concurrency', type=int, default=20, help='Clients, each on a keep-alive connection')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per target')
+        parser.add_argument('--cookie', default='', help='Cookie header to send, e.g. "sessionid=..." to bypass the microcache')
+
+    def run_client(self, target, paths, cookie, deadline, results):
+        url = urlsplit(target)
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(url.hostname, url.port, timeout=30)
+        headers = {'Accept-Encoding': 'gzip, br'}
+        if cookie:
+            headers['Cookie'] = cookie
+        prefix = url.path.rstrip('/')
+        latencies, statuses, cache_states = [], Counter(), Counter()
+        count = 0
+        while time.monotonic() < deadline:
+            path = paths[count % len(paths)]
+            count += 1
+            start = time.perf_counter()
+            try:
+                connection.request('GET', prefix + path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                statuses['error'] += 1
+                connection.close()
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status] += 1
+            cache_states[response.getheader('X-Microcache') or response.getheader('X-Page-Cache') or '-'] += 1
+        connection.close()
+        results.append((latencies, statuses, cache_states))
+
+    def handle(self, *args, **options):
+        for target in options['targets']:
+            results = []
+            deadline = time.monotonic() + options['duration']
+            threads = [
+                threading.Thread(target=self.run_client,
+                                 args=(target, options['paths'], options['cookie'], deadline, results))
+                for _ in range(options['concurrency'])
+            ]
+            start = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - start
+
+            latencies = [latency for result in results for latency in result[0]]
+            statuses = sum((result[1] for result in results), Counter())
+            cache_states = sum((result[2] for result in results), Counter())
+            self.stdout.write(
+                f'{target}: {len(latencies) / elapsed:,.0f} req/s, '
+                f'p50 {percentile(latencies, 0.5) * 1000:.1f} ms, '
+                f'p95 {percentile(latencies, 0.95) * 1000:.1f} ms, '
+                f'p99 {percentile(latencies, 0.99) * 1000:.1f} ms'
+            )
+            self.stdout.write(f'  status: {dict(statuses)}  cache: {dict(cache_states)}')
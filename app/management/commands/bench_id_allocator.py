@@ -0,0 +1,54 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app.models import RegistrationSequence
+
+
+class Command(BaseCommand):
+    help = 'Benchmark registration ID allocation throughput under concurrent writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Number of concurrent writer threads')
+        parser.add_argument('--ids', type=int, default=200, help='IDs allocated by each writer')
+        parser.add_argument('--block', type=int, default=1, help='IDs reserved per allocation call')
+        parser.add_argument('--prefix', default='ZZ', help='Scratch prefix used for the benchmark')
+
+    def handle(self, *args, **options):
+        writers, per_writer = options['writers'], options['ids']
+        block, prefix = options['block'], options['prefix']
+        issued = [[] for _ in range(writers)]
+        errors = []
+
+        def worker(index):
+            try:
+                remaining = per_writer
+                while remaining > 0:
+                    count = min(block, remaining)
+                    issued[index].extend(RegistrationSequence.objects.reserve_block(prefix, count))
+                    remaining -= count
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        RegistrationSequence.objects.filter(prefix=prefix).delete()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(writers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        RegistrationSequence.objects.filter(prefix=prefix).delete()
+
+        all_ids = [value for chunk in issued for value in chunk]
+        duplicates = len(all_ids) - len(set(all_ids))
+        self.stdout.write(f'writers={writers} block={block} ids={len(all_ids)} elapsed={elapsed:.3f}s')
+        self.stdout.write(f'throughput={len(all_ids) / elapsed:.0f} ids/sec duplicates={duplicates} errors={len(errors)}')
+        if duplicates or errors:
+            self.stderr.write(self.style.ERROR('Allocator produced duplicates or errors'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All IDs unique'))
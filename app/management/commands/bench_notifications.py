@@ -0,0 +1,68 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from app.models import Notification
+from app.notifications import send_pending
+from app.smtpsink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = 'Send outbox notifications to a local SMTP stand-in and compare with one connection per message'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--batch', type=int, default=50, help='Messages per SMTP connection')
+        parser.add_argument('--reject-every', type=int, default=0,
+                            help='Make every Nth recipient refused to exercise retries')
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        sink = SMTPSink(port=0, reject='refused')
+        port = sink.start()
+        smtp = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+
+        def recipient(i):
+            every = options['reject_every']
+            return f'refused{i}@example.com' if every and i % every == 0 else f'volunteer{i}@example.com'
+
+        with override_settings(**smtp):
+            # Baseline: what send_mail() in a loop does, a connection per message
+            start = time.perf_counter()
+            for i in range(count):
+                connection = get_connection()
+                try:
+                    EmailMessage('Bench', 'Hello', 'bench@localhost', [recipient(i)], connection=connection).send()
+                except Exception:
+                    pass
+            naive = time.perf_counter() - start
+            naive_connections = sink.connections
+
+            Notification.objects.bulk_create([
+                Notification(kind='bench', recipient=recipient(i), subject='Bench', body='Hello')
+                for i in range(count)
+            ])
+            sink.connections = 0
+            start = time.perf_counter()
+            sent, failed = send_pending(batch_size=options['batch'], per_minute=0)
+            pooled = time.perf_counter() - start
+            pooled_connections = sink.connections
+
+        retrying = Notification.objects.filter(kind='bench', status='pending').count()
+        Notification.objects.filter(kind='bench').delete()
+        sink.shutdown()
+
+        self.stdout.write(f'One connection per message: {naive:.2f}s, {naive_connections} connections')
+        self.stdout.write(
+            f'Outbox, {options["batch"]} per connection: {pooled:.2f}s, {pooled_connections} connections, '
+            f'{sent} sent, {failed} refused ({retrying} queued for retry)'
+        )
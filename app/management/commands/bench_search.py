@@ -0,0 +1,51 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.search import SEARCH_FIELDS, icontains_filter, search
+
+
+MODELS = {model._meta.model_name: model for model in SEARCH_FIELDS}
+
+
+class Command(BaseCommand):
+    help = 'Compare the ranked search subsystem against the old icontains admin search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='+', help='Search strings to time')
+        parser.add_argument('--model', default='elder', choices=sorted(MODELS), help='Model to search')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query and method')
+
+    def time_runs(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return result, timings
+
+    def handle(self, *args, **options):
+        model = MODELS.get(options['model'])
+        if model is None:
+            raise CommandError(f"Unknown model {options['model']}")
+        queryset = model.objects.all()
+        repeat = options['repeat']
+
+        # Warm up the trigram index so its one-off build is not counted
+        search(queryset, 'warmup')
+
+        for query in options['queries']:
+            old, old_times = self.time_runs(
+                lambda: list(icontains_filter(queryset, query).order_by('-created_at')[:100]), repeat
+            )
+            new, new_times = self.time_runs(lambda: search(queryset, query), repeat)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{model.__name__} "{query}"'))
+            self.stdout.write(
+                f'  icontains: {len(old):4d} rows  median {statistics.median(old_times):8.2f} ms  '
+                f'max {max(old_times):8.2f} ms'
+            )
+            self.stdout.write(
+                f'  search:    {len(new):4d} rows  median {statistics.median(new_times):8.2f} ms  '
+                f'max {max(new_times):8.2f} ms'
+            )
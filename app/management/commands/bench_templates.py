@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import Engine, RequestContext, engines
+from django.test import RequestFactory, override_settings
+
+from app.forms import (
+    ContactForm, DonationForm, ElderRegistrationForm, RegistrationStatusForm,
+    VolunteerRegistrationForm, VolunteerStatusForm,
+)
+from app.models import Donation, Elder, Testimonial, Volunteer
+from app.stats import dashboard_stats, home_stats
+
+
+# Template -> context its view renders it with
+TEMPLATE_CONTEXTS = {
+    'app/home.html': lambda: dict(home_stats(), testimonials=lambda: list(Testimonial.objects.filter(is_active=True)[:6])),
+    'app/about.html': dict,
+    'app/testimonials.html': lambda: {
+        'testimonials': Paginator(Testimonial.objects.filter(is_active=True).order_by('-created_at'), 12).get_page(1)
+    },
+    'app/donate.html': lambda: {'form': DonationForm()},
+    'app/contact.html': lambda: {'form': ContactForm()},
+    'app/elder_register.html': lambda: {'form': ElderRegistrationForm()},
+    'app/volunteer_register.html': lambda: {'form': VolunteerRegistrationForm()},
+    'app/check_status.html': lambda: {'form': RegistrationStatusForm(), 'elder': None},
+    'app/check_volunteer_status.html': lambda: {'form': VolunteerStatusForm(), 'volunteer': None},
+    'app/dashboard.html': lambda: {
+        'stats': dashboard_stats(),
+        'recent_elders': Elder.objects.filter(status='pending')[:5],
+        'recent_volunteers': Volunteer.objects.filter(status='pending')[:5],
+        'recent_donations': Donation.objects.filter(status='pending')[:5],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Time template rendering without the cached loader, with it, and with warm fragment caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('templates', nargs='*', help=f'Templates to time (default: all of {", ".join(TEMPLATE_CONTEXTS)})')
+        parser.add_argument('--repeat', type=int, default=50, help='Renders per template and mode')
+
+    def time_renders(self, engine, name, context, request, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            engine.get_template(name).render(RequestContext(request, context()))
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        names = options['templates'] or list(TEMPLATE_CONTEXTS)
+        unknown = set(names) - set(TEMPLATE_CONTEXTS)
+        if unknown:
+            raise CommandError(f'No context for {", ".join(sorted(unknown))}')
+
+        cached_engine = engines['django'].engine
+        # Same configuration, but every get_template() reads and compiles the file again
+        uncached_engine = Engine(
+            dirs=cached_engine.dirs,
+            loaders=['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader'],
+            context_processors=cached_engine.context_processors,
+            libraries=cached_engine.libraries,
+        )
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        repeat = options['repeat']
+
+        self.stdout.write(f'{"template":34} {"no cached loader":>17} {"cached loader":>14} {"+ fragments":>12}  (median ms)')
+        for name in names:
+            context = TEMPLATE_CONTEXTS[name]
+            with override_settings(FRAGMENT_CACHE_TIMEOUT=0):
+                uncached = self.time_renders(uncached_engine, name, context, request, repeat)
+                cached = self.time_renders(cached_engine, name, context, request, repeat)
+            # First render fills the fragment caches
+            fragments = self.time_renders(cached_engine, name, context, request, repeat + 1)[1:]
+            self.stdout.write(
+                f'{name:34} {statistics.median(uncached):17.2f} {statistics.median(cached):14.2f} '
+                f'{statistics.median(fragments):12.2f}'
+            )
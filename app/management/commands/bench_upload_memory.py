@@ -0,0 +1,106 @@
+import resource
+import tempfile
+import threading
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+BOUNDARY = 'BenchBoundary'
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Measure worker RSS while parsing many concurrent multipart uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=50, help='Concurrent uploads held open')
+        parser.add_argument('--size-mb', type=float, default=4, help='Size of each uploaded file')
+        parser.add_argument(
+            '--mode', choices=['streaming', 'memory'], default='streaming',
+            help='streaming: current handler; memory: the old 10MB in-memory buffering'
+        )
+
+    def write_body(self, handle, size):
+        """Write a multipart body with one `size`-byte JPEG-looking file"""
+        handle.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="full_name"\r\n\r\nBench\r\n'
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="photo"; filename="photo.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n'.encode()
+        )
+        handle.write(b'\xff\xd8\xff\xe0')
+        chunk = b'\x00' * (1024 * 1024)
+        remaining = size - 4
+        while remaining > 0:
+            handle.write(chunk[:remaining])
+            remaining -= len(chunk)
+        handle.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+        return handle.tell()
+
+    def handle(self, *args, **options):
+        uploads, mode = options['uploads'], options['mode']
+        size = int(options['size_mb'] * 1024 * 1024)
+        overrides = {}
+        if mode == 'memory':
+            overrides = {
+                'FILE_UPLOAD_HANDLERS': [
+                    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+                    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+                ],
+                'FILE_UPLOAD_MAX_MEMORY_SIZE': 10 * 1024 * 1024,
+            }
+
+        # Each request body lives in its own temp file, as a socket would
+        bodies = []
+        for _ in range(uploads):
+            handle = tempfile.TemporaryFile()
+            length = self.write_body(handle, size)
+            handle.seek(0)
+            bodies.append(handle)
+
+        baseline = peak_rss_mb()
+        barrier = threading.Barrier(uploads + 1)
+        release = threading.Event()
+        errors = []
+
+        def parse(body):
+            try:
+                environ = {
+                    'REQUEST_METHOD': 'POST',
+                    'PATH_INFO': '/elder-register/',
+                    'SERVER_NAME': 'bench', 'SERVER_PORT': '80',
+                    'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+                    'CONTENT_LENGTH': str(length),
+                    'wsgi.input': body,
+                }
+                request = WSGIRequest(environ)
+                files = request.FILES
+                if 'photo' not in files:
+                    errors.append(getattr(request, 'upload_errors', {}))
+                barrier.wait()
+                release.wait()
+                for uploaded in files.values():
+                    uploaded.close()
+            except Exception as exc:
+                errors.append(exc)
+                barrier.abort()
+
+        with override_settings(**overrides):
+            threads = [threading.Thread(target=parse, args=(body,)) for body in bodies]
+            for thread in threads:
+                thread.start()
+            barrier.wait()
+            peak = peak_rss_mb()
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(
+            f'mode={mode} uploads={uploads} file={options["size_mb"]}MB '
+            f'baseline_rss={baseline:.0f}MB peak_rss={peak:.0f}MB '
+            f'per_upload={(peak - baseline) / uploads:.2f}MB errors={len(errors)}'
+        )
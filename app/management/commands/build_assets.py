@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.assets import BUILD_DIR, build_bundles, missing_icons
+
+
+class Command(BaseCommand):
+    help = 'Build the purged, minified CSS bundles in static/app/build from assets/ and the templates'
+
+    def handle(self, *args, **options):
+        missing = missing_icons()
+        if missing:
+            raise CommandError(
+                f'No SVG in assets/icons for: {", ".join(missing)}. Copy them from Font Awesome Free 6 '
+                f'(svgs/solid or svgs/brands), named after the class without "fa-".'
+            )
+        for name, size in build_bundles().items():
+            self.stdout.write(f'{BUILD_DIR / name}: {size / 1024:.1f} KB')
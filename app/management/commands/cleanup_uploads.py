@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.resumable import cleanup_uploads
+
+
+class Command(BaseCommand):
+    help = 'Remove resumable uploads that were abandoned or never claimed by a registration'
+
+    def handle(self, *args, **options):
+        count = cleanup_uploads()
+        self.stdout.write(self.style.SUCCESS(f'Removed {count} expired uploads'))
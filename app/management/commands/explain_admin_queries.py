@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from app.models import Elder, Volunteer, Donation, Testimonial, ContactInquiry
+
+
+class Command(BaseCommand):
+    help = 'Print query plans for the admin list, dashboard and home page queries'
+
+    def get_querysets(self):
+        return {
+            'admin_elders status=pending': Elder.objects.filter(status='pending').order_by('-created_at')[:20],
+            'admin_elders all': Elder.objects.order_by('-created_at')[:20],
+            'admin_volunteers status=approved': Volunteer.objects.filter(status='approved').order_by('-created_at')[:20],
+            'admin_donations status=pending': Donation.objects.filter(status='pending').order_by('-created_at')[:20],
+            'admin_donations type=food': Donation.objects.filter(donation_type='food').order_by('-created_at')[:20],
+            'admin_donations status+type': Donation.objects.filter(
+                status='pending', donation_type='food'
+            ).order_by('-created_at')[:20],
+            'admin_inquiries unresolved': ContactInquiry.objects.filter(is_resolved=False).order_by('-created_at')[:20],
+            'home testimonials': Testimonial.objects.filter(is_active=True)[:6],
+            'dashboard pending elders': Elder.objects.filter(status='pending')[:5],
+        }
+
+    def get_counts(self):
+        return {
+            'count elders approved': Elder.objects.filter(status='approved'),
+            'count volunteers approved': Volunteer.objects.filter(status='approved'),
+            'count inquiries unresolved': ContactInquiry.objects.filter(is_resolved=False),
+        }
+
+    def handle(self, *args, **options):
+        for label, queryset in self.get_querysets().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain())
+        for label, queryset in self.get_counts().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.values('pk').explain())
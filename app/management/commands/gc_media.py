@@ -0,0 +1,81 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.template.defaultfilters import filesizeformat
+
+from app.images import RENDITIONS, rendition_name
+from app.storage import GC_GRACE_SECONDS, ContentAddressedStorage
+
+# Directories holding files that belong to model rows
+MODEL_MEDIA_DIRECTORIES = ['elders', 'volunteers', 'idcards', 'renditions', 'imports']
+
+
+def referenced_media_names():
+    """Every file name a model row points at, plus the renditions of its images"""
+    names = set()
+    for model in apps.get_app_config('app').get_models():
+        for field in model._meta.get_fields():
+            if not isinstance(field, models.FileField):
+                continue
+            for name in model.objects.exclude(**{field.name: ''}).values_list(field.name, flat=True).iterator():
+                names.add(name)
+                if isinstance(field, models.ImageField):
+                    names.update(rendition_name(name, rendition) for rendition in RENDITIONS)
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Garbage-collect deduplicated media blobs that no file name links to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--adopt', action='store_true',
+                            help='Move files stored before deduplication into the blob store first')
+        parser.add_argument('--orphans', action='store_true',
+                            help='Also delete uploads and renditions no database row refers to')
+        parser.add_argument('--grace', type=int, default=GC_GRACE_SECONDS,
+                            help='Leave files younger than this many seconds alone')
+        parser.add_argument('--dry-run', action='store_true', help='Report without deleting')
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not app.storage.ContentAddressedStorage')
+
+        if options['adopt']:
+            adopted = 0
+            for name in self._stored_names(MODEL_MEDIA_DIRECTORIES):
+                if not options['dry_run']:
+                    default_storage.adopt(name)
+                adopted += 1
+            self.stdout.write(f'Adopted {adopted} files')
+
+        if options['orphans']:
+            referenced = referenced_media_names()
+            cutoff = time.time() - options['grace']
+            orphans = 0
+            for name in self._stored_names(MODEL_MEDIA_DIRECTORIES):
+                if name in referenced or os.path.getmtime(default_storage.path(name)) > cutoff:
+                    continue
+                orphans += 1
+                if not options['dry_run']:
+                    default_storage.delete(name)
+            self.stdout.write(f'Removed {orphans} orphaned files')
+
+        removed = default_storage.collect_garbage(grace=options['grace'], dry_run=options['dry_run'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed['references']} stale references, {removed['blobs']} blobs "
+            f"({filesizeformat(removed['bytes'])}) and {removed['temp_files']} temporary files"
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
+
+    def _stored_names(self, directories):
+        root = default_storage.path('')
+        for top in directories:
+            for directory, _, files in os.walk(os.path.join(root, top)):
+                for filename in files:
+                    if filename.endswith('.tmp'):
+                        continue
+                    yield os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
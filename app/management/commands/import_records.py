@@ -0,0 +1,40 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.imports import IMPORT_BATCH_SIZE, IMPORT_MODELS, ImportFormatError, encode_row, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import legacy elder, volunteer or donation records from a UTF-8 CSV file with a header row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(IMPORT_MODELS))
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--errors', help='Write rejected rows here (default: <path>.rejected.csv)')
+
+    def handle(self, *args, **options):
+        errors_path = options['errors'] or f'{options["path"]}.rejected.csv'
+        with open(options['path'], 'rb') as source, open(errors_path, 'w', newline='', encoding='utf-8') as report:
+            writer = csv.writer(report)
+            writer.writerow(['Line', 'Errors', 'Row'])
+
+            def record(created, rejected):
+                writer.writerows([line, '; '.join(errors), encode_row(row)] for line, errors, row in rejected)
+
+            start = time.perf_counter()
+            try:
+                created, rejected = import_csv(
+                    IMPORT_MODELS[options['model']], source, options['batch_size'], on_commit=record
+                )
+            except ImportFormatError as error:
+                raise CommandError(str(error))
+            elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} rows in {elapsed:.1f}s ({(created + rejected) / max(elapsed, 1e-9):,.0f} rows/s)'
+        ))
+        if rejected:
+            self.stdout.write(self.style.WARNING(f'Rejected {rejected} rows, see {errors_path}'))
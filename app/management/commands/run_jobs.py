@@ -0,0 +1,62 @@
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app.cache import cache_is_shared
+from app.jobs import claim_jobs, purge_finished_jobs, release_job, run_job
+from app.resumable import cleanup_uploads
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails, image renditions, ID cards, stats)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due instead of polling')
+        parser.add_argument('--batch', type=int, default=10, help='Jobs claimed per round')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        # Finish the current job on SIGTERM (e.g. a deploy) instead of dying mid-way
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        self.stdout.write(f'Worker {worker} started')
+        if not cache_is_shared():
+            # Imports and status changes bump generations in this process only
+            self.stderr.write(self.style.WARNING(
+                'The cache is local to this process: web workers will not see the cache '
+                'invalidations of jobs (imports, stats). Set CACHE_BACKEND to a shared cache.'
+            ))
+        succeeded = failed = 0
+        last_purge = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_purge > 3600:
+                purge_finished_jobs()
+                cleanup_uploads()
+                last_purge = time.monotonic()
+
+            jobs = claim_jobs(worker, options['batch'])
+            for job in jobs:
+                if self.stopping:
+                    release_job(job)
+                    continue
+                if run_job(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker} stopped: {succeeded} jobs done, {failed} failed'))
+
+    def _stop(self, signum, frame):
+        self.stopping = True
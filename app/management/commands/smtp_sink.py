@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.smtpsink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP stand-in that records mail instead of delivering it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--reject', default=None, help='Refuse recipients containing this text')
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(port=options['port'], reject=options['reject'])
+        sink.start()
+        self.stdout.write(
+            f'Listening on 127.0.0.1:{options["port"]}; run the worker with '
+            f'EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend EMAIL_HOST=127.0.0.1 '
+            f'EMAIL_PORT={options["port"]}'
+        )
+        seen = 0
+        try:
+            while True:
+                time.sleep(1)
+                with sink.lock:
+                    new = sink.messages[seen:]
+                    connections = sink.connections
+                for sender, recipients, _ in new:
+                    self.stdout.write(f'{sender} -> {", ".join(recipients)}')
+                if new:
+                    seen += len(new)
+                    self.stdout.write(f'{seen} messages over {connections} connections')
+        except KeyboardInterrupt:
+            sink.shutdown()
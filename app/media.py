@@ -0,0 +1,109 @@
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import quote_etag
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Uploaded files that staff may fetch through protected_media; everything else
+# under MEDIA_ROOT (blobs, temp files, partial uploads) is never served
+PROTECTED_MEDIA_DIRECTORIES = ('elders/', 'volunteers/', 'idcards/', 'renditions/', 'imports/')
+
+
+def file_etag(stat):
+    """Validator for a stored file
+
+    Names are hard links to content-addressed blobs, so the inode changes
+    exactly when the content does; mtime is left out because re-storing an
+    existing blob touches it.
+    """
+    return f'{stat.st_ino:x}-{stat.st_size:x}'
+
+
+def is_servable_media(name):
+    """True for a clean relative name inside PROTECTED_MEDIA_DIRECTORIES"""
+    return posixpath.normpath(name) == name and name.startswith(PROTECTED_MEDIA_DIRECTORIES)
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single-range header, or None if unusable"""
+    match = RANGE_RE.match(header or '')
+    if not match or size == 0:
+        return None
+    start, end = match.groups()
+    if start == '':
+        # A suffix range of zero bytes ("bytes=-0") selects nothing
+        if end == '' or int(end) == 0:
+            return None
+        length = min(int(end), size)
+        return size - length, size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def etag_matches(request, etag):
+    candidates = request.headers.get('If-None-Match', '')
+    return candidates.strip() == '*' or etag in [value.strip() for value in candidates.split(',')]
+
+
+def serve_media_file(request, name, content_type, filename=None, etag=None, immutable=False):
+    """Serve a file under MEDIA_ROOT with ETag and byte-range support
+
+    With MEDIA_ACCEL_REDIRECT_PREFIX set, the bytes are handed to nginx via
+    X-Accel-Redirect and the Django worker only sends headers.
+    """
+    etag = quote_etag(etag) if etag else None
+    if etag and etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + name
+    else:
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        size = os.path.getsize(path)
+        byte_range = parse_range(request.headers.get('Range'), size)
+        if request.headers.get('Range') and byte_range is None:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        handle = open(path, 'rb')
+        if byte_range:
+            start, end = byte_range
+            handle.seek(start)
+            response = FileResponse(_read_slice(handle, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(handle, content_type=content_type)
+            response['Content-Length'] = str(size)
+        response['Accept-Ranges'] = 'bytes'
+
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if etag:
+        response['ETag'] = etag
+    if immutable:
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+def _read_slice(handle, length, chunk_size=64 * 1024):
+    try:
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
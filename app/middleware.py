@@ -0,0 +1,37 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+
+async def _iterate_in_thread(chunks):
+    """Yield from a sync iterator, producing each chunk in a worker thread"""
+    done = object()
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, done)) is not done:
+        yield chunk
+
+
+class AsyncStreamingMiddleware:
+    """Keep sync streaming responses (exports, FileResponse) streaming under ASGI
+
+    Django's ASGI handler reads a sync iterator into a list before sending
+    it, which would hold a whole export or media file in memory. Under
+    ASGI the iterator is pulled one chunk at a time from a thread instead;
+    under WSGI responses pass through untouched.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if response.streaming and not response.is_async:
+            response.streaming_content = _iterate_in_thread(iter(response.streaming_content))
+        return response
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:26
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each prefix/year counter after the highest ID already issued"""
+    RegistrationSequence = apps.get_model('app', 'RegistrationSequence')
+    sources = [
+        ('VK', apps.get_model('app', 'Elder'), 'registration_id'),
+        ('VL', apps.get_model('app', 'Volunteer'), 'volunteer_id'),
+    ]
+    for prefix, model, field in sources:
+        highest = {}
+        for value in model.objects.filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True):
+            try:
+                year, number = value[len(prefix):].split('-', 1)
+                year, number = int(year), int(number)
+            except ValueError:
+                continue
+            highest[year] = max(highest.get(year, 0), number)
+        for year, last_value in highest.items():
+            RegistrationSequence.objects.update_or_create(
+                prefix=prefix, year=year, defaults={'last_value': last_value}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_alter_volunteer_profile_photo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=10)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('prefix', 'year')},
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
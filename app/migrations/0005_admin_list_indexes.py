@@ -0,0 +1,59 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_registrationsequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactinquiry',
+            index=models.Index(fields=['is_resolved', 'created_at'], name='inquiry_resolved_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactinquiry',
+            index=models.Index(fields=['created_at'], name='inquiry_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['donation_type', 'created_at'], name='donation_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['status', 'donation_type', 'created_at'], name='donation_status_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['created_at'], name='donation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='elder',
+            index=models.Index(fields=['status', 'created_at'], name='elder_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='elder',
+            index=models.Index(fields=['created_at'], name='elder_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testimonial',
+            index=models.Index(fields=['is_active', 'created_at'], name='testimonial_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['status', 'created_at'], name='volunteer_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='volunteer',
+            index=models.Index(fields=['created_at'], name='volunteer_created_idx'),
+        ),
+    ]
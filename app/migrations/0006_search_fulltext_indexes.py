@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# Table, index name and columns; kept in step with app.search.SEARCH_FIELDS
+FULLTEXT_INDEXES = [
+    ('app_elder', 'elder_search_ft', ['registration_id', 'full_name', 'guardian_name']),
+    ('app_volunteer', 'volunteer_search_ft', ['volunteer_id', 'full_name', 'email']),
+    ('app_donation', 'donation_search_ft', ['donor_name', 'donor_email', 'description']),
+    ('app_contactinquiry', 'inquiry_search_ft', ['name', 'email', 'subject']),
+]
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    """FULLTEXT indexes only exist on MySQL; other backends use the trigram index"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f'ALTER TABLE {quote(table)} ADD FULLTEXT INDEX {quote(name)} '
+            f'({", ".join(quote(column) for column in columns)})'
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    quote = schema_editor.quote_name
+    for table, name, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f'ALTER TABLE {quote(table)} DROP INDEX {quote(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_search_fulltext_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='volunteer',
+            name='id_card',
+            field=models.FileField(blank=True, editable=False, upload_to='idcards/volunteers/'),
+        ),
+    ]
@@ -1,9 +1,60 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 import uuid
 from datetime import datetime
 import os
+from django.utils import timezone
+
+class RegistrationSequenceManager(models.Manager):
+    def reserve(self, prefix, count=1, year=None):
+        """Atomically reserve `count` consecutive numbers for a prefix/year"""
+        if year is None:
+            year = datetime.now().year
+        with transaction.atomic():
+            # The UPDATE takes a row lock, so concurrent workers queue here
+            # instead of racing on a COUNT(*) of the target table.
+            updated = self.filter(prefix=prefix, year=year).update(last_value=F('last_value') + count)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        self.create(prefix=prefix, year=year, last_value=count)
+                except IntegrityError:
+                    # Another worker created the row first
+                    self.filter(prefix=prefix, year=year).update(last_value=F('last_value') + count)
+            last = self.filter(prefix=prefix, year=year).values_list('last_value', flat=True).get()
+        return year, range(last - count + 1, last + 1)
+
+    def next_id(self, prefix):
+        """Allocate a single formatted ID, e.g. VK2025-0001"""
+        return self.reserve_block(prefix, 1)[0]
+
+    def reserve_block(self, prefix, count, year=None):
+        """Allocate a block of formatted IDs for bulk imports"""
+        year, numbers = self.reserve(prefix, count, year)
+        return [format_sequence_id(prefix, year, n) for n in numbers]
+
+
+def format_sequence_id(prefix, year, number):
+    """Format a sequence number as PREFIXYEAR-NNNN"""
+    return f'{prefix}{year}-{number:04d}'
+
+
+class RegistrationSequence(models.Model):
+    """Per-prefix, per-year counter backing registration and volunteer IDs"""
+    prefix = models.CharField(max_length=10)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    objects = RegistrationSequenceManager()
+
+    def __str__(self):
+        return f"{self.prefix}{self.year} ({self.last_value})"
+
+    class Meta:
+        unique_together = [('prefix', 'year')]
+
 
 def elder_photo_path(instance, filename):
     """Generate file path for elder photos"""
@@ -44,6 +95,7 @@ class Elder(models.Model):
     guardian_name = models.CharField(max_length=200)
     guardian_contact = models.CharField(validators=[phone_regex], max_length=17)
     guardian_relationship = models.CharField(max_length=100, default="Son/Daughter")
+    guardian_email = models.EmailField(blank=True, help_text="Receives updates about the registration")
     
     # Health Information
     health_conditions = models.TextField(blank=True, help_text="Describe any health conditions or medical history")
@@ -62,9 +114,9 @@ class Elder(models.Model):
     def save(self, *args, **kwargs):
         if not self.registration_id:
             # Generate registration ID: VK2025-0001 format
-            year = datetime.now().year
-            count = Elder.objects.filter(registration_id__startswith=f'VK{year}').count() + 1
-            self.registration_id = f'VK{year}-{count:04d}'
+            self.registration_id = RegistrationSequence.objects.next_id('VK')
+        # Store IDs in canonical form so status lookups are exact matches
+        self.registration_id = self.registration_id.strip().upper()
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -72,6 +124,10 @@ class Elder(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='elder_status_created_idx'),
+            models.Index(fields=['created_at'], name='elder_created_idx'),
+        ]
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
@@ -113,6 +169,9 @@ class Volunteer(models.Model):
         help_text="Upload a profile picture for ID card"
     )
 
+    # Pre-rendered ID card PDF, named by its fingerprint (see app.idcards)
+    id_card = models.FileField(upload_to='idcards/volunteers/', blank=True, editable=False)
+
     # Volunteer Information
     skills = models.TextField(help_text="Describe your skills and how you can help")
     availability = models.CharField(max_length=200, help_text="When are you available? (e.g., weekends, evenings)")
@@ -131,9 +190,9 @@ class Volunteer(models.Model):
     def save(self, *args, **kwargs):
         if not self.volunteer_id:
             # Generate volunteer ID: VL2025-0001 format
-            year = datetime.now().year
-            count = Volunteer.objects.filter(volunteer_id__startswith=f'VL{year}').count() + 1
-            self.volunteer_id = f'VL{year}-{count:04d}'
+            self.volunteer_id = RegistrationSequence.objects.next_id('VL')
+        # Store IDs in canonical form so status lookups are exact matches
+        self.volunteer_id = self.volunteer_id.strip().upper()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -141,6 +200,10 @@ class Volunteer(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='volunteer_status_created_idx'),
+            models.Index(fields=['created_at'], name='volunteer_created_idx'),
+        ]
         
     @property
     def profile_photo_url(self):
@@ -187,6 +250,12 @@ class Donation(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='donation_status_created_idx'),
+            models.Index(fields=['donation_type', 'created_at'], name='donation_type_created_idx'),
+            models.Index(fields=['status', 'donation_type', 'created_at'], name='donation_status_type_idx'),
+            models.Index(fields=['created_at'], name='donation_created_idx'),
+        ]
 
 class Testimonial(models.Model):
     name = models.CharField(max_length=200)
@@ -201,6 +270,9 @@ class Testimonial(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'created_at'], name='testimonial_active_created_idx'),
+        ]
 
 class ContactInquiry(models.Model):
     name = models.CharField(max_length=200)
@@ -216,4 +288,155 @@ class ContactInquiry(models.Model):
     
     class Meta:
         ordering = ['-created_at']
-        verbose_name_plural = "Contact Inquiries"
\ No newline at end of file
+        verbose_name_plural = "Contact Inquiries"
+        indexes = [
+            models.Index(fields=['is_resolved', 'created_at'], name='inquiry_resolved_created_idx'),
+            models.Index(fields=['created_at'], name='inquiry_created_idx'),
+        ]
+
+class ResumableUpload(models.Model):
+    """A file being uploaded in chunks; the bytes live under MEDIA_ROOT/uploads/partial"""
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    field_name = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    length = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.offset == self.length
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.length})"
+
+class MediaBlob(models.Model):
+    """One stored file content, kept once under MEDIA_ROOT/blobs by its SHA-256"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes)"
+
+class MediaReference(models.Model):
+    """A media file name (e.g. elders/photos/elder_VK2025-0001.jpg) and the blob it links to"""
+    name = models.CharField(max_length=255, unique=True)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.PROTECT, related_name='references')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} -> {self.blob_id[:12]}"
+
+class Job(models.Model):
+    """A unit of background work, run by the run_jobs worker (see app.jobs)"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    timeout = models.PositiveIntegerField(default=300, help_text="Seconds before a running job is handed to another worker")
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    dedupe_key = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_status_locked_idx'),
+            models.Index(fields=['dedupe_key', 'status'], name='job_dedupe_idx'),
+        ]
+
+class Notification(models.Model):
+    """An outgoing email in the outbox; sent in batches by app.notifications"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.UUIDField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+            models.Index(fields=['claim'], name='notification_claim_idx'),
+        ]
+
+class ImportRun(models.Model):
+    """A CSV of legacy records uploaded in the admin and imported by a background job (see app.imports)"""
+    MODEL_CHOICES = [
+        ('elder', 'Elders'),
+        ('volunteer', 'Volunteers'),
+        ('donation', 'Donations'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    model_name = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name="Import into")
+    csv_file = models.FileField(upload_to='imports/', help_text="UTF-8 CSV with a header row")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    rows_processed = models.PositiveIntegerField(default=0, help_text="Data rows committed so far, imported or rejected")
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_rejected = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, help_text="Why the file could not be read, if it could not")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_model_name_display()} import #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
+class ImportRejectedRow(models.Model):
+    """A CSV row an import could not accept, with the reasons and the row as uploaded"""
+    run = models.ForeignKey(ImportRun, on_delete=models.CASCADE, related_name='rejected_rows')
+    line = models.PositiveIntegerField()
+    errors = models.TextField()
+    data = models.TextField(help_text="The original row, CSV encoded")
+
+    def __str__(self):
+        return f"Line {self.line}: {self.errors}"
+
+    class Meta:
+        ordering = ['run', 'line']
@@ -0,0 +1,191 @@
+import logging
+import smtplib
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .jobs import enqueue, retry_delay
+from .models import Notification
+
+
+logger = logging.getLogger(__name__)
+
+# kind -> (recipient field, subject, body template)
+NOTIFICATIONS = {
+    'volunteer_registered': ('email', 'Your volunteer application has been received',
+                             'app/emails/volunteer_registered.txt'),
+    'volunteer_approved': ('email', 'Your volunteer application has been approved',
+                           'app/emails/volunteer_approved.txt'),
+    'volunteer_rejected': ('email', 'Update on your volunteer application',
+                           'app/emails/volunteer_rejected.txt'),
+    'elder_approved': ('guardian_email', 'Registration approved',
+                       'app/emails/elder_approved.txt'),
+    'elder_rejected': ('guardian_email', 'Update on your registration',
+                       'app/emails/elder_rejected.txt'),
+    'donation_received': ('donor_email', 'Thank you for your donation offer',
+                          'app/emails/donation_received.txt'),
+    'inquiry_received': ('email', 'We have received your message',
+                         'app/emails/inquiry_received.txt'),
+}
+
+# Errors that mean the connection is unusable, as opposed to one message
+# being refused; the rest of the batch waits for the next flush
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+# A flush claims rows for this long; rows of a crashed flush are retried after
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def build_notification(kind, instance):
+    """Render a notification for `instance`, or None if it has no recipient"""
+    field, subject, template = NOTIFICATIONS[kind]
+    recipient = getattr(instance, field, '')
+    if not recipient:
+        return None
+    return Notification(
+        kind=kind,
+        recipient=recipient,
+        subject=subject,
+        body=render_to_string(template, {'object': instance}),
+    )
+
+
+def notify(kind, instances):
+    """Put notifications for `instances` in the outbox and schedule a flush
+
+    Messages are rendered now, so they describe the records as they are at
+    this moment. The flush is delayed a little so a bulk action's messages
+    go out together over one connection.
+    """
+    notifications = [n for n in (build_notification(kind, instance) for instance in instances) if n]
+    if notifications:
+        Notification.objects.bulk_create(notifications, batch_size=500)
+        schedule_flush()
+    return len(notifications)
+
+
+def schedule_flush(delay=None):
+    if delay is None:
+        delay = timedelta(seconds=settings.NOTIFICATION_FLUSH_DELAY)
+    enqueue('notifications.flush', delay=delay, unique=True)
+
+
+def _due():
+    now = timezone.now()
+    return Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', locked_until__lt=now)
+
+
+def claim_batch(size):
+    """Mark up to `size` due notifications as ours; returns them oldest first"""
+    ids = list(Notification.objects.filter(_due()).order_by('id').values_list('id', flat=True)[:size])
+    if not ids:
+        return []
+    claim = uuid.uuid4()
+    # Re-checking the due condition in the UPDATE keeps concurrent flushes apart
+    Notification.objects.filter(_due(), id__in=ids).update(
+        status='sending', claim=claim, locked_until=timezone.now() + CLAIM_TIMEOUT
+    )
+    return list(Notification.objects.filter(claim=claim, status='sending').order_by('id'))
+
+
+class RateLimiter:
+    """Spaces calls so no more than `per_minute` happen in any minute"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self.next_at = 0.0
+
+    def wait(self):
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def _failed(notification, error):
+    notification.attempts += 1
+    notification.last_error = error
+    notification.claim = None
+    notification.locked_until = None
+    if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+        notification.status = 'failed'
+        logger.error('Giving up on notification %s to %s: %s', notification.pk, notification.recipient, error)
+    else:
+        notification.status = 'pending'
+        notification.next_attempt_at = timezone.now() + retry_delay(notification.attempts)
+    notification.save(update_fields=['attempts', 'last_error', 'claim', 'locked_until', 'status', 'next_attempt_at'])
+
+
+def send_pending(batch_size=None, per_minute=None, limit=None):
+    """Send due notifications, one SMTP connection per batch
+
+    A connection is opened once per batch of `batch_size` messages and
+    reused for all of them; messages are spaced to `per_minute`. A refused
+    message is retried later with backoff; a connection failure ends the run
+    and returns the rest of the batch to the outbox. Returns (sent, failed).
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    limiter = RateLimiter(settings.NOTIFICATION_RATE_PER_MINUTE if per_minute is None else per_minute)
+    sent = failed = 0
+
+    while limit is None or sent + failed < limit:
+        batch = claim_batch(batch_size if limit is None else min(batch_size, limit - sent - failed))
+        if not batch:
+            break
+        delivered = []
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for notification in batch:
+                limiter.wait()
+                message = EmailMessage(
+                    notification.subject, notification.body, settings.DEFAULT_FROM_EMAIL,
+                    [notification.recipient], connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except CONNECTION_ERRORS:
+                    raise
+                except (smtplib.SMTPException, ValueError) as error:
+                    _failed(notification, str(error))
+                    failed += 1
+                else:
+                    delivered.append(notification.pk)
+                    notification.status = 'sent'
+        except (OSError, smtplib.SMTPException) as error:
+            logger.warning('SMTP connection failed, %s notifications put back: %s', len(batch) - len(delivered), error)
+            # Messages not yet attempted go back without using up an attempt
+            _release([n.pk for n in batch if n.status == 'sending'], retry_delay(1))
+            break
+        finally:
+            if delivered:
+                Notification.objects.filter(pk__in=delivered).update(
+                    status='sent', sent_at=timezone.now(), claim=None, locked_until=None, last_error=''
+                )
+                sent += len(delivered)
+            connection.close()
+
+    return sent, failed
+
+
+def _release(ids, delay):
+    Notification.objects.filter(pk__in=ids, status='sending').update(
+        status='pending', claim=None, locked_until=None, next_attempt_at=timezone.now() + delay
+    )
+
+
+def flush_outbox():
+    """Send what is due; schedule another flush for retries and leftovers"""
+    sent, failed = send_pending(limit=settings.NOTIFICATION_FLUSH_LIMIT)
+    waiting = Notification.objects.filter(status__in=['pending', 'sending']).order_by('next_attempt_at').first()
+    if waiting is not None:
+        delay = max(waiting.next_attempt_at - timezone.now(), timedelta(seconds=settings.NOTIFICATION_FLUSH_DELAY))
+        schedule_flush(delay)
+    return sent, failed
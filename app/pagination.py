@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+
+CURSOR_SALT = 'app.pagination.cursor'
+
+
+def encode_cursor(obj, direction):
+    """Opaque token pointing just past `obj` in the given direction"""
+    return signing.dumps(
+        {'c': obj.created_at.isoformat(), 'i': obj.pk, 'd': direction},
+        salt=CURSOR_SALT, compress=True
+    )
+
+
+def decode_cursor(token):
+    """Return (created_at, pk, direction) or None for a missing/invalid token"""
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+        return datetime.fromisoformat(data['c']), int(data['i']), data['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def estimate_count(queryset):
+    """Cheap row estimate from the MySQL optimizer; None on other backends
+
+    Other backends have no estimate short of a COUNT(*), which would scan
+    as many rows as OFFSET did.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}', params)
+        columns = [column[0] for column in cursor.description]
+        row = cursor.fetchone()
+    return int(row[columns.index('rows')] or 0) if row else 0
+
+
+class CursorPage:
+    """One page of a keyset-paginated queryset ordered by (-created_at, -id)"""
+
+    def __init__(self, object_list, has_next, has_previous, query_params, cursor_param):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+        self.query_params = query_params
+        self.cursor_param = cursor_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page:
+            return encode_cursor(self.object_list[-1], 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page:
+            return encode_cursor(self.object_list[0], 'prev')
+        return None
+
+    def _query_for(self, cursor):
+        params = self.query_params.copy()
+        params[self.cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        """Query string for the next page, keeping the current filters"""
+        cursor = self.next_cursor
+        return self._query_for(cursor) if cursor else None
+
+    @property
+    def previous_query(self):
+        """Query string for the previous page, keeping the current filters"""
+        cursor = self.previous_cursor
+        return self._query_for(cursor) if cursor else None
+
+
+class CursorPaginator:
+    """Keyset pagination on (created_at, id), newest first
+
+    Each page is a single indexed range scan, so the cost does not grow with
+    the page depth the way OFFSET does.
+    """
+
+    def __init__(self, queryset, per_page, cursor_param='cursor'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.cursor_param = cursor_param
+
+    def get_page(self, query_params):
+        cursor = decode_cursor(query_params.get(self.cursor_param))
+        queryset = self.queryset
+        params = query_params.copy()
+        params.pop('page', None)
+
+        if cursor is None:
+            rows = list(queryset.order_by('-created_at', '-pk')[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], len(rows) > self.per_page, False, params, self.cursor_param)
+
+        created_at, pk, direction = cursor
+        if direction == 'prev':
+            rows = list(
+                queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+                .order_by('created_at', 'pk')[:self.per_page + 1]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return CursorPage(rows, True, has_previous, params, self.cursor_param)
+
+        rows = list(
+            queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            .order_by('-created_at', '-pk')[:self.per_page + 1]
+        )
+        return CursorPage(rows[:self.per_page], len(rows) > self.per_page, True, params, self.cursor_param)
+
+
+def paginate_by_cursor(request, queryset, per_page=20):
+    """Return the requested cursor page and an estimated total for the queryset"""
+    page = CursorPaginator(queryset, per_page).get_page(request.GET)
+    return page, estimate_count(queryset)
@@ -0,0 +1,212 @@
+import base64
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+from .models import ResumableUpload
+from .uploads import UPLOAD_FIELD_TYPES
+
+
+TUS_VERSION = '1.0.0'
+CHECKSUM_ALGORITHMS = {'sha1': hashlib.sha1, 'sha256': hashlib.sha256, 'md5': hashlib.md5}
+READ_CHUNK_SIZE = 64 * 1024
+
+# Incomplete or unclaimed uploads older than this are removed by run_jobs'
+# hourly housekeeping (or the cleanup_uploads command)
+UPLOAD_EXPIRY = timedelta(hours=24)
+
+
+class UploadError(Exception):
+    """Request problem reported to the client with the given HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial', str(upload.token))
+
+
+def parse_metadata(header):
+    """Decode a tus Upload-Metadata header: 'key base64value,key2 base64value'"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        key, _, value = pair.partition(' ')
+        try:
+            metadata[key] = base64.b64decode(value).decode() if value else ''
+        except (ValueError, UnicodeDecodeError):
+            raise UploadError(400, f'Invalid metadata value for {key}')
+    return metadata
+
+
+def create_upload(length_header, metadata_header):
+    """Validate the announced file and reserve an empty partial file for it"""
+    try:
+        length = int(length_header)
+    except (TypeError, ValueError):
+        raise UploadError(400, 'Upload-Length is required')
+    if length <= 0 or length > settings.UPLOAD_MAX_FILE_SIZE:
+        raise UploadError(413, f'Files must be at most {settings.UPLOAD_MAX_FILE_SIZE} bytes')
+
+    metadata = parse_metadata(metadata_header)
+    field_name = metadata.get('field', '')
+    filename = os.path.basename(metadata.get('filename', ''))
+    allowed = UPLOAD_FIELD_TYPES.get(field_name)
+    if allowed is None:
+        raise UploadError(400, 'Unknown upload field')
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension not in allowed:
+        raise UploadError(415, f'Allowed file types: {", ".join(sorted(allowed))}')
+
+    upload = ResumableUpload.objects.create(
+        field_name=field_name, filename=filename,
+        content_type=metadata.get('filetype', '')[:100], length=length
+    )
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def _expected_checksum(header):
+    if not header:
+        return None, None
+    algorithm, _, value = header.partition(' ')
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f'Unsupported checksum algorithm {algorithm}')
+    try:
+        return CHECKSUM_ALGORITHMS[algorithm](), base64.b64decode(value)
+    except ValueError:
+        raise UploadError(400, 'Invalid Upload-Checksum')
+
+
+def append_chunk(upload, request):
+    """Append the PATCH body at Upload-Offset and return the new offset
+
+    The partial file is locked for the duration so parallel PATCHes of one
+    upload can't interleave; its size is the authoritative offset. A chunk
+    that fails its checksum is discarded.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset'))
+    except (TypeError, ValueError):
+        raise UploadError(400, 'Upload-Offset is required')
+    hasher, expected = _expected_checksum(request.headers.get('Upload-Checksum'))
+
+    path = partial_path(upload)
+    if not os.path.exists(path):
+        raise UploadError(404, 'Upload expired')
+    with open(path, 'r+b') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError(423, 'Another chunk of this upload is in progress')
+        current = os.fstat(handle.fileno()).st_size
+        if offset != current:
+            raise UploadError(409, f'Offset mismatch; the upload is at {current}')
+
+        handle.seek(offset)
+        written = 0
+        remaining = upload.length - offset
+        magic = UPLOAD_FIELD_TYPES[upload.field_name][os.path.splitext(upload.filename)[1].lower().lstrip('.')]
+        try:
+            while True:
+                chunk = request.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if offset == 0 and written == 0 and not chunk.startswith(magic):
+                    raise UploadError(415, 'The file content does not match its extension')
+                written += len(chunk)
+                if written > remaining:
+                    raise UploadError(413, 'Chunk runs past Upload-Length')
+                if hasher is not None:
+                    hasher.update(chunk)
+                handle.write(chunk)
+            if hasher is not None and hasher.digest() != expected:
+                raise UploadError(460, 'Checksum mismatch')
+        except UploadError:
+            handle.truncate(offset)
+            raise
+        handle.flush()
+
+    upload.offset = offset + written
+    upload.save(update_fields=['offset', 'updated_at'])
+    return upload.offset
+
+
+class ResumableUploadedFile(UploadedFile):
+    """A completed resumable upload presented to forms as an uploaded file
+
+    temporary_file_path() lets FileSystemStorage move the file into place
+    instead of copying it.
+    """
+
+    def __init__(self, upload):
+        path = partial_path(upload)
+        super().__init__(open(path, 'rb'), upload.filename, upload.content_type or None, upload.length)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def attach_completed_uploads(request, field_names):
+    """request.FILES plus completed uploads referenced by `<field>_upload` tokens"""
+    files = MultiValueDict(request.FILES.copy())
+    claimed = []
+    for field in field_names:
+        token = request.POST.get(f'{field}_upload')
+        if not token or field in files:
+            continue
+        try:
+            upload = ResumableUpload.objects.get(token=token, field_name=field)
+        except (ResumableUpload.DoesNotExist, ValidationError, ValueError):
+            continue
+        if upload.is_complete and os.path.exists(partial_path(upload)):
+            files[field] = ResumableUploadedFile(upload)
+            claimed.append(upload)
+    return files, claimed
+
+
+@contextmanager
+def completed_uploads(request, field_names):
+    """attach_completed_uploads(), closing the opened files on the way out"""
+    files, claimed = attach_completed_uploads(request, field_names)
+    try:
+        yield files, claimed
+    finally:
+        for uploaded in files.values():
+            if isinstance(uploaded, ResumableUploadedFile):
+                uploaded.close()
+
+
+def release_uploads(uploads):
+    """Forget uploads once their files were saved (or moved) into place"""
+    for upload in uploads:
+        path = partial_path(upload)
+        if os.path.exists(path):
+            os.remove(path)
+        upload.delete()
+
+
+def expired_uploads():
+    return ResumableUpload.objects.filter(updated_at__lt=timezone.now() - UPLOAD_EXPIRY)
+
+
+def cleanup_uploads():
+    """Remove abandoned or unclaimed uploads; returns how many"""
+    uploads = list(expired_uploads())
+    release_uploads(uploads)
+    return len(uploads)
@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Elder, Volunteer, Donation, ContactInquiry
+
+
+# Columns covered by the admin search box of each model. The same columns
+# make up the FULLTEXT index created for MySQL in migration 0006.
+SEARCH_FIELDS = {
+    Elder: ['registration_id', 'full_name', 'guardian_name'],
+    Volunteer: ['volunteer_id', 'full_name', 'email'],
+    Donation: ['donor_name', 'donor_email', 'description'],
+    ContactInquiry: ['name', 'email', 'subject'],
+}
+
+SEARCH_RESULT_LIMIT = 100
+
+# Shorter queries cannot be answered from trigrams or InnoDB's default
+# full-text token size, so they use the plain icontains filter.
+MIN_INDEXED_QUERY = 3
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def icontains_filter(queryset, query):
+    """The original admin search: OR of icontains over the search fields"""
+    condition = Q()
+    for field in SEARCH_FIELDS[queryset.model]:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+def normalize(text):
+    return ' '.join(TOKEN_RE.findall((text or '').lower()))
+
+
+def trigrams(text):
+    text = normalize(text)
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Committed changes to the search columns, logged in the shared cache so
+# every process can apply them to its index instead of rebuilding it. Each
+# change takes the next number of the model's sequence; a number without an
+# entry (expired, or a bulk change such as an import) is a gap and means a
+# full rebuild.
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+# Past this many pending changes a rebuild is cheaper than catching up
+MAX_CATCH_UP = 1000
+
+
+def _sequence_key(model):
+    return f'search-seq:{model._meta.label_lower}'
+
+
+def _change_key(model, sequence):
+    return f'search-change:{model._meta.label_lower}:{sequence}'
+
+
+def current_sequence(model):
+    # Timestamp based like the cache generations, so a lost counter never
+    # reuses an old number
+    return cache.get_or_set(_sequence_key(model), lambda: int(time.time() * 1000), None)
+
+
+def record_search_change(model, pk=None):
+    """Log a committed change to one row, or to an unknown set of rows when pk is None"""
+    current_sequence(model)
+    try:
+        sequence = cache.incr(_sequence_key(model))
+    except ValueError:
+        return
+    if pk is not None:
+        cache.set(_change_key(model, sequence), pk, CHANGE_LOG_TIMEOUT)
+
+
+class TrigramIndex:
+    """In-process trigram inverted index for one model
+
+    Built lazily from the search columns, then kept current from the change
+    log: before each search the rows changed since the last one are re-read
+    by pk. The index is rebuilt only when the log has a gap.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = SEARCH_FIELDS[model]
+        self.postings = defaultdict(set)
+        self.documents = {}
+        self.sequence = None
+        self.lock = threading.Lock()
+
+    def _document(self, values):
+        return ' '.join(str(value) for value in values if value)
+
+    def _add(self, pk, text):
+        grams = trigrams(text)
+        self.documents[pk] = (normalize(text), grams)
+        for gram in grams:
+            self.postings[gram].add(pk)
+
+    def _remove(self, pk):
+        document = self.documents.pop(pk, None)
+        if document is None:
+            return
+        for gram in document[1]:
+            postings = self.postings.get(gram)
+            if postings is not None:
+                postings.discard(pk)
+                if not postings:
+                    del self.postings[gram]
+
+    def rebuild(self):
+        self.postings = defaultdict(set)
+        self.documents = {}
+        rows = self.model.objects.order_by().values_list('pk', *self.fields)
+        for row in rows.iterator(chunk_size=2000):
+            self._add(row[0], self._document(row[1:]))
+
+    def apply(self, pks):
+        """Re-read the given rows; those no longer in the table are dropped"""
+        for pk in pks:
+            self._remove(pk)
+        for row in self.model.objects.order_by().filter(pk__in=pks).values_list('pk', *self.fields):
+            self._add(row[0], self._document(row[1:]))
+
+    def _pending_changes(self, sequence):
+        # The logged pks after self.sequence, or None on a gap
+        if self.sequence is None or not self.sequence < sequence <= self.sequence + MAX_CATCH_UP:
+            return None
+        keys = [_change_key(self.model, number) for number in range(self.sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return None
+        return set(changes.values())
+
+    def ensure_current(self):
+        # Read before the rows, so a change committed meanwhile is applied again
+        sequence = current_sequence(self.model)
+        with self.lock:
+            if self.sequence == sequence:
+                return
+            pks = self._pending_changes(sequence)
+            if pks is None:
+                self.rebuild()
+            else:
+                self.apply(pks)
+            self.sequence = sequence
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        """Return [(pk, score)] ranked by trigram overlap with the query"""
+        self.ensure_current()
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        needle = normalize(query)
+        with self.lock:
+            hits = defaultdict(int)
+            for gram in query_grams:
+                for pk in self.postings.get(gram, ()):
+                    hits[pk] += 1
+            threshold = max(1, int(len(query_grams) * 0.6))
+            scored = []
+            for pk, count in hits.items():
+                if count < threshold:
+                    continue
+                score = count / len(query_grams)
+                if needle in self.documents[pk][0]:
+                    score += 1
+                scored.append((pk, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(model):
+    with _indexes_lock:
+        if model not in _indexes:
+            _indexes[model] = TrigramIndex(model)
+        return _indexes[model]
+
+
+def fulltext_boolean_query(query):
+    # Every word must match, each as a prefix, for search-as-you-type
+    return ' '.join(f'+{word}*' for word in normalize(query).split())
+
+
+def _fulltext_search(queryset, query, limit):
+    model = queryset.model
+    table = model._meta.db_table
+    connection = connections[queryset.db]
+    columns = ', '.join(
+        f'{connection.ops.quote_name(table)}.{connection.ops.quote_name(model._meta.get_field(field).column)}'
+        for field in SEARCH_FIELDS[model]
+    )
+    rank = RawSQL(f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)', [fulltext_boolean_query(query)])
+    return list(
+        queryset.annotate(search_rank=rank)
+        .filter(search_rank__gt=0)
+        .order_by('-search_rank', '-created_at')[:limit]
+    )
+
+
+def _trigram_search(queryset, query, limit):
+    # Over-fetch candidates so the queryset's own filters can still fill a page
+    ranked = get_trigram_index(queryset.model).search(query, limit=limit * 5)
+    if not ranked:
+        return []
+    found = {obj.pk: obj for obj in queryset.order_by().filter(pk__in=[pk for pk, _ in ranked])}
+    return [found[pk] for pk, _ in ranked if pk in found][:limit]
+
+
+def search(queryset, query, limit=SEARCH_RESULT_LIMIT):
+    """Ranked search over the model's search fields, best match first
+
+    Uses the MySQL FULLTEXT index when available and the in-process trigram
+    index otherwise. The queryset's own filters (status, type, ...) apply.
+    """
+    query = query.strip()
+    if len(normalize(query).replace(' ', '')) < MIN_INDEXED_QUERY:
+        return list(icontains_filter(queryset, query).order_by('-created_at')[:limit])
+    if connections[queryset.db].vendor == 'mysql':
+        return _fulltext_search(queryset, query, limit)
+    return _trigram_search(queryset, query, limit)
@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_generation, cache_is_shared
+from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry
+from .search import SEARCH_FIELDS, record_search_change
+from .idfilter import ID_FILTERS, record_issued_id
+from .images import needs_processing
+from .jobs import enqueue
+from .transitions import status_changed
+from .imports import records_imported
+
+
+CACHED_MODELS = [Elder, Volunteer, Donation, Testimonial, ContactInquiry]
+# Models counted by home_stats
+STATS_MODELS = [Elder, Volunteer, Donation]
+
+# Notification sent for each row a bulk transition changes
+TRANSITION_NOTIFICATIONS = {
+    (Elder, 'approve'): 'elder_approved',
+    (Elder, 'reject'): 'elder_rejected',
+    (Volunteer, 'approve'): 'volunteer_approved',
+    (Volunteer, 'reject'): 'volunteer_rejected',
+}
+# Follow-up jobs carry at most this many pks each
+FOLLOW_UP_CHUNK = 500
+
+
+def refresh_stats_later():
+    # run_jobs can only warm the counters for the web workers through a
+    # shared cache; otherwise the next visitor recomputes them
+    if cache_is_shared():
+        enqueue('stats.refresh', unique=True)
+
+
+@receiver([post_save, post_delete])
+def invalidate_model_cache(sender, **kwargs):
+    """Bump the cache generation of a model whenever one of its rows changes"""
+    if sender in CACHED_MODELS:
+        # Only once committed: bumped earlier, another worker could cache the
+        # old rows again under the new generation
+        transaction.on_commit(lambda: bump_generation(sender))
+    if sender in SEARCH_FIELDS:
+        # Captured now: a deleted instance has lost its pk by commit time
+        pk = kwargs['instance'].pk
+        transaction.on_commit(lambda: record_search_change(sender, pk))
+    if sender in ID_FILTERS and kwargs.get('created'):
+        # After the bump above, so the filter sees only its own change
+        transaction.on_commit(lambda: record_issued_id(kwargs['instance']))
+    if sender in STATS_MODELS:
+        refresh_stats_later()
+
+
+@receiver(status_changed)
+def after_status_change(sender, action, pks, **kwargs):
+    """Handle a transition batch at once: one cache bump, follow-up work in a few jobs"""
+    if sender in CACHED_MODELS:
+        transaction.on_commit(lambda: bump_generation(sender))
+    if sender in STATS_MODELS:
+        refresh_stats_later()
+    kind = TRANSITION_NOTIFICATIONS.get((sender, action))
+    for start in range(0, len(pks), FOLLOW_UP_CHUNK):
+        chunk = pks[start:start + FOLLOW_UP_CHUNK]
+        if kind:
+            enqueue('notifications.notify', {'kind': kind, 'model': sender._meta.model_name, 'pks': chunk})
+        if sender is Volunteer and action == 'approve':
+            enqueue('idcards.refresh_volunteers', {'pks': chunk})
+
+
+@receiver(records_imported)
+def after_import(sender, count, **kwargs):
+    """Bulk-created rows skip post_save: invalidate caches, ID filters and search per batch
+
+    Imports run in run_jobs; the bump and the search change log reach the web
+    workers through the shared cache, and their ID filters and search indexes
+    rebuild on them.
+    """
+    if sender in CACHED_MODELS:
+        transaction.on_commit(lambda: bump_generation(sender))
+    if sender in SEARCH_FIELDS:
+        transaction.on_commit(lambda: record_search_change(sender))
+    if sender in STATS_MODELS:
+        refresh_stats_later()
+
+
+@receiver(post_save, sender=Volunteer)
+def render_id_card(sender, instance, **kwargs):
+    """Queue a card render when a volunteer is approved or their details change"""
+    if instance.status == 'approved':
+        enqueue('idcards.refresh_volunteers', {'pks': [instance.pk]}, unique=True)
+
+
+@receiver(post_save, sender=Elder)
+def process_elder_photo(sender, instance, **kwargs):
+    """Queue normalization of the elder photo and its renditions"""
+    if needs_processing(instance.photo):
+        enqueue('images.process_photo', {'kind': 'elder', 'pk': instance.pk}, unique=True)
+
+
+@receiver(post_save, sender=Volunteer)
+def process_volunteer_photo(sender, instance, **kwargs):
+    """Queue normalization of the profile photo; the card is re-rendered after it"""
+    if needs_processing(instance.profile_photo):
+        enqueue('images.process_photo', {'kind': 'volunteer', 'pk': instance.pk}, unique=True)
@@ -0,0 +1,75 @@
+import socketserver
+import threading
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply('220 smtp-sink ready')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250-smtp-sink')
+                self.reply('250 8BITMIME')
+            elif verb == 'MAIL':
+                sender, recipients = command[10:].split(' ')[0].strip('<>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                address = command[8:].strip().strip('<>')
+                if server.reject and server.reject in address:
+                    self.reply('550 Mailbox unavailable')
+                else:
+                    recipients.append(address)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                for data in iter(self.rfile.readline, b''):
+                    if data in (b'.\r\n', b'.\n'):
+                        break
+                    lines.append(data[1:] if data.startswith(b'..') else data)
+                with server.lock:
+                    server.messages.append((sender, recipients, b''.join(lines)))
+                self.reply('250 OK queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP stand-in that accepts and records mail instead of delivering it
+
+    Counts connections so tests can check that messages share them, and
+    refuses recipients containing `reject` to exercise per-message failures.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=1025, reject=None):
+        super().__init__((host, port), _SMTPHandler)
+        self.reject = reject
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+
+    def start(self):
+        """Serve from a background thread; returns the bound port"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address[1]
@@ -0,0 +1,73 @@
+from django.db.models import Count, Q
+from .models import Elder, Volunteer, Donation, ContactInquiry
+
+
+def status_counts(model, field, values):
+    """Count rows per value of `field` plus the total in a single query"""
+    aggregates = {'total': Count('pk')}
+    for value in values:
+        aggregates[str(value).lower()] = Count('pk', filter=Q(**{field: value}))
+    return model.objects.aggregate(**aggregates)
+
+
+def elder_counts():
+    """Total and per-status counts for elder registrations"""
+    return status_counts(Elder, 'status', [key for key, _ in Elder.APPROVAL_STATUS])
+
+
+def volunteer_counts():
+    """Total and per-status counts for volunteer registrations"""
+    return status_counts(Volunteer, 'status', [key for key, _ in Volunteer.APPROVAL_STATUS])
+
+
+def donation_counts():
+    """Total and per-status counts for donations"""
+    return status_counts(Donation, 'status', [key for key, _ in Donation.STATUS_CHOICES])
+
+
+def inquiry_counts():
+    """Total and resolved/unresolved counts for contact inquiries"""
+    counts = status_counts(ContactInquiry, 'is_resolved', [True, False])
+    return {
+        'total': counts['total'],
+        'resolved': counts['true'],
+        'unresolved': counts['false'],
+    }
+
+
+def home_stats():
+    """Public home page counters"""
+    elders = elder_counts()
+    return {
+        'total_elders': elders['total'],
+        'approved_elders': elders['approved'],
+        'active_volunteers': volunteer_counts()['approved'],
+        'total_donations': donation_counts()['total'],
+    }
+
+
+def dashboard_stats():
+    """Admin dashboard counters, one query per model"""
+    elders = elder_counts()
+    volunteers = volunteer_counts()
+    donations = donation_counts()
+    inquiries = inquiry_counts()
+    return {
+        'total_elders': elders['total'],
+        'pending_elders': elders['pending'],
+        'approved_elders': elders['approved'],
+        'rejected_elders': elders['rejected'],
+
+        'total_volunteers': volunteers['total'],
+        'pending_volunteers': volunteers['pending'],
+        'approved_volunteers': volunteers['approved'],
+        'rejected_volunteers': volunteers['rejected'],
+
+        'total_donations': donations['total'],
+        'pending_donations': donations['pending'],
+        'fulfilled_donations': donations['fulfilled'],
+        'cancelled_donations': donations['cancelled'],
+
+        'total_inquiries': inquiries['total'],
+        'unresolved_inquiries': inquiries['unresolved'],
+    }
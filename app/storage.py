@@ -0,0 +1,249 @@
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+import brotli
+import zopfli.gzip
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+
+BLOB_DIRECTORY = 'blobs'
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Static files worth precompressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map')
+
+# Unreferenced blobs younger than this are left alone by garbage collection;
+# covers the gap between a blob being written and its reference being saved
+GC_GRACE_SECONDS = 60 * 60
+
+
+def blob_name(digest):
+    """Storage name of a blob, sharded two levels deep: blobs/ab/cd/abcd..."""
+    return f'{BLOB_DIRECTORY}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def _link_or_copy(source, destination):
+    """Hard link `destination` to `source`; copy where links aren't possible
+
+    Raises FileExistsError if `destination` exists.
+    """
+    try:
+        os.link(source, destination)
+    except OSError as error:
+        if error.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        with open(source, 'rb') as src, open(destination, 'xb') as dst:
+            shutil.copyfileobj(src, dst)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that keeps each distinct file content once
+
+    Content is hashed while it is written to a temporary file and stored as
+    blobs/ab/cd/<sha256>. The name the model asked for (elders/photos/...)
+    becomes a hard link to that blob, so names, paths, URLs and nginx serving
+    are unchanged while identical uploads share one copy on disk.
+    MediaReference rows record which names point at which blob so orphaned
+    blobs can be garbage collected (see the gc_media command).
+    """
+
+    def _blob_temp_dir(self):
+        path = self.path(f'{BLOB_DIRECTORY}/tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _write_blob(self, content):
+        """Hash `content` into a temporary file; return (digest, size, temp path)"""
+        hasher = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk (streamed or resumable upload): hash it, then move it
+            source = content.temporary_file_path()
+            with open(source, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    size += len(chunk)
+            handle, temp_path = tempfile.mkstemp(dir=self._blob_temp_dir())
+            os.close(handle)
+            file_move_safe(source, temp_path, allow_overwrite=True)
+        else:
+            handle, temp_path = tempfile.mkstemp(dir=self._blob_temp_dir())
+            with os.fdopen(handle, 'wb') as output:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(HASH_CHUNK_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    output.write(chunk)
+        return hasher.hexdigest(), size, temp_path
+
+    def _commit_blob(self, digest, temp_path):
+        """Move the temporary file into place as a blob, unless it's already stored"""
+        path = self.path(blob_name(digest))
+        if os.path.exists(path):
+            os.remove(temp_path)
+            # Fresh mtime keeps garbage collection off it until it's referenced
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, path)
+        return path
+
+    def _record(self, name, digest, size):
+        from .models import MediaBlob, MediaReference
+
+        MediaBlob.objects.get_or_create(digest=digest, defaults={'size': size})
+        MediaReference.objects.update_or_create(name=name, defaults={'blob_id': digest})
+
+    def _save(self, name, content):
+        digest, size, temp_path = self._write_blob(content)
+        blob_path = self._commit_blob(digest, temp_path)
+
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        while True:
+            try:
+                _link_or_copy(blob_path, self.path(name))
+                break
+            except FileExistsError:
+                # Another request took the name after get_available_name()
+                name = self.get_available_name(name)
+
+        name = str(name).replace('\\', '/')
+        self._record(name, digest, size)
+        return name
+
+    def replace(self, name, content):
+        """Atomically point an existing name at new content"""
+        digest, size, temp_path = self._write_blob(content)
+        blob_path = self._commit_blob(digest, temp_path)
+
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        link_path = f'{path}.{os.getpid()}.tmp'
+        if os.path.exists(link_path):
+            os.remove(link_path)
+        _link_or_copy(blob_path, link_path)
+        os.replace(link_path, path)
+        self._record(name, digest, size)
+        return name
+
+    def delete(self, name):
+        from .models import MediaReference
+
+        super().delete(name)
+        # The blob itself goes once garbage collection finds it unreferenced
+        MediaReference.objects.filter(name=name).delete()
+
+    def adopt(self, name):
+        """Bring a file written before this storage existed into the blob store"""
+        from django.core.files import File
+
+        path = self.path(name)
+        with open(path, 'rb') as handle:
+            digest, size, temp_path = self._write_blob(File(handle))
+        blob_path = self._commit_blob(digest, temp_path)
+        if not os.path.samefile(path, blob_path):
+            link_path = f'{path}.{os.getpid()}.tmp'
+            _link_or_copy(blob_path, link_path)
+            os.replace(link_path, path)
+        self._record(name, digest, size)
+        return digest
+
+    def collect_garbage(self, grace=GC_GRACE_SECONDS, dry_run=False):
+        """Drop stale references and delete blobs nothing links to
+
+        A reference is stale when its name no longer exists or no longer
+        shares the blob's inode (overwritten outside the storage). A blob is
+        removed once it has no references, no other hard links and is older
+        than `grace`. Returns counts of what was (or would be) removed.
+        """
+        from .models import MediaBlob, MediaReference
+
+        cutoff = time.time() - grace
+        removed = {'references': 0, 'blobs': 0, 'bytes': 0, 'temp_files': 0}
+
+        for reference in MediaReference.objects.iterator(chunk_size=500):
+            path = self.path(reference.name)
+            blob_path = self.path(blob_name(reference.blob_id))
+            try:
+                current = os.path.samefile(path, blob_path)
+            except OSError:
+                current = False
+            if not current:
+                removed['references'] += 1
+                if not dry_run:
+                    reference.delete()
+
+        referenced = set(MediaReference.objects.values_list('blob_id', flat=True).distinct())
+        blob_root = self.path(BLOB_DIRECTORY)
+        temp_root = os.path.join(blob_root, 'tmp')
+        on_disk = set()
+        for directory, _, files in os.walk(blob_root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if directory != temp_root:
+                    on_disk.add(filename)
+                if stat.st_mtime > cutoff:
+                    continue
+                if directory == temp_root:
+                    # Left behind by an interrupted save
+                    removed['temp_files'] += 1
+                    if not dry_run:
+                        os.remove(path)
+                    continue
+                if filename in referenced or stat.st_nlink > 1:
+                    continue
+                removed['blobs'] += 1
+                removed['bytes'] += stat.st_size
+                if not dry_run:
+                    os.remove(path)
+                    on_disk.discard(filename)
+
+        if not dry_run:
+            unreferenced = MediaBlob.objects.filter(references__isnull=True).values_list('digest', flat=True)
+            missing = [digest for digest in unreferenced.iterator() if digest not in on_disk]
+            for start in range(0, len(missing), 500):
+                MediaBlob.objects.filter(digest__in=missing[start:start + 500]).delete()
+        return removed
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files, each text file with .gz (zopfli) and .br siblings
+
+    The hashed names are safe to cache forever; nginx serves the
+    precompressed siblings (gzip_static/brotli_static) without compressing
+    per request. A sibling is only written when it is smaller.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        for original, processed, was_processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and isinstance(processed, str) and processed.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._precompress(processed)
+            yield original, processed, was_processed
+
+    def _precompress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for extension, compress in (('.gz', zopfli.gzip.compress), ('.br', lambda data: brotli.compress(data, quality=11))):
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                with open(path + extension, 'wb') as target:
+                    target.write(compressed)
+            elif os.path.exists(path + extension):
+                os.remove(path + extension)
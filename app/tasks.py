@@ -0,0 +1,80 @@
+from django.apps import apps
+
+from .cache import cached
+from .idcards import (
+    elder_card_data, purge_card_sheets, refresh_volunteer_card, save_card_sheets, volunteer_card_data,
+)
+from .images import process_image
+from .imports import run_import
+from .jobs import enqueue, task
+from .models import Elder, Volunteer, Donation, ImportRun
+from .notifications import flush_outbox, notify
+from .stats import home_stats
+
+
+PHOTO_FIELDS = {'elder': (Elder, 'photo'), 'volunteer': (Volunteer, 'profile_photo')}
+
+# kind -> (model, ID field the sheets are ordered by, card description)
+CARD_SHEETS = {
+    'elder': (Elder, 'registration_id', elder_card_data),
+    'volunteer': (Volunteer, 'volunteer_id', volunteer_card_data),
+}
+
+
+@task('notifications.flush', priority=0, max_attempts=3, timeout=600)
+def flush_notifications():
+    """Send the notification outbox over a reused SMTP connection"""
+    flush_outbox()
+
+
+@task('images.process_photo', priority=10, timeout=120)
+def process_photo(kind, pk):
+    """Normalize an uploaded photo, build its renditions and re-render what embeds it"""
+    model, field = PHOTO_FIELDS[kind]
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not getattr(instance, field):
+        return
+    process_image(getattr(instance, field).name)
+    if kind == 'volunteer' and instance.status == 'approved':
+        enqueue('idcards.refresh_volunteers', {'pks': [pk]}, unique=True)
+
+
+@task('idcards.refresh_volunteers', priority=5, timeout=600)
+def refresh_cards(pks):
+    """Render the ID cards of these volunteers where what they show has changed"""
+    for volunteer in Volunteer.objects.filter(pk__in=pks, status='approved').iterator(chunk_size=100):
+        refresh_volunteer_card(volunteer)
+
+
+@task('idcards.print_sheets', priority=5, max_attempts=2, timeout=1800)
+def print_card_sheets(kind, pks, name):
+    """Render printable ID card sheets for an admin action into protected media"""
+    purge_card_sheets()
+    model, order, card_data = CARD_SHEETS[kind]
+    rows = model.objects.filter(pk__in=pks, status='approved').order_by(order)
+    save_card_sheets((card_data(row) for row in rows.iterator(chunk_size=500)), name)
+
+
+@task('imports.run', priority=-10, max_attempts=3, timeout=3600)
+def import_records(pk):
+    """Import an uploaded CSV of legacy records; a retry resumes after the committed rows"""
+    run = ImportRun.objects.filter(pk=pk).exclude(status='done').first()
+    if run is not None:
+        run_import(run)
+
+
+@task('notifications.notify', priority=0, timeout=300)
+def notify_rows(kind, model, pks):
+    """Put notifications for rows changed by a bulk transition in the outbox"""
+    notify(kind, apps.get_model('app', model).objects.filter(pk__in=pks).iterator(chunk_size=500))
+
+
+@task('stats.refresh', priority=-5, max_attempts=2, timeout=60)
+def refresh_stats():
+    """Recompute the home page counters so no visitor waits for them
+
+    Only queued when the cache is shared with the web workers (see
+    refresh_stats_later in app.signals).
+    """
+    cached('home_stats', [Elder, Volunteer, Donation], home_stats)
+
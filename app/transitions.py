@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Elder, Volunteer, Donation
+
+
+# Sent once per batch of a transition() call, inside the batch's transaction,
+# with sender=model, action, pks (the rows of the batch that actually changed)
+# and user; receivers are in app.signals
+status_changed = Signal()
+
+# Rows updated per statement; keeps each UPDATE's pk list and locks small
+BATCH_SIZE = 1000
+
+
+def _approve(user, now, **extra):
+    return {'approved_at': now, 'approved_by': user, 'rejection_reason': ''}
+
+
+def _reject(user, now, reason=None):
+    values = {'approved_at': None, 'approved_by': None}
+    if reason is not None:
+        values['rejection_reason'] = reason
+    return values
+
+
+def _fulfil(user, now, **extra):
+    return {'fulfilled_at': now, 'fulfilled_by': user}
+
+
+def _reopen(user, now, **extra):
+    return {'fulfilled_at': None, 'fulfilled_by': None}
+
+
+def _no_audit(user, now, **extra):
+    return {}
+
+
+# (model, action) -> (target status, audit field values for the action)
+TRANSITIONS = {
+    (Elder, 'approve'): ('approved', _approve),
+    (Elder, 'reject'): ('rejected', _reject),
+    (Volunteer, 'approve'): ('approved', _approve),
+    (Volunteer, 'reject'): ('rejected', _reject),
+    (Donation, 'fulfil'): ('fulfilled', _fulfil),
+    (Donation, 'cancel'): ('cancelled', _no_audit),
+    (Donation, 'reopen'): ('pending', _reopen),
+}
+
+
+def transition(queryset, action, user=None, **options):
+    """Move the selected rows to the action's status with its audit fields
+
+    Rows already in the target status are left alone, so their audit fields
+    keep their original values. Each batch is one locking SELECT of pks and
+    one UPDATE; post_save does not fire. Instead status_changed is sent with
+    the batch's changed pks before it commits, so the follow-up jobs commit
+    (or roll back) with the rows they are about. Returns the number of rows
+    changed.
+    """
+    model = queryset.model
+    target, audit = TRANSITIONS[(model, action)]
+    now = timezone.now()
+    values = {'status': target, 'updated_at': now, **audit(user, now, **options)}
+
+    candidates = list(queryset.exclude(status=target).order_by().values_list('pk', flat=True))
+    changed = 0
+    for start in range(0, len(candidates), BATCH_SIZE):
+        batch = candidates[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            # Re-read under lock: another admin may have moved some rows meanwhile
+            pks = list(
+                model.objects.select_for_update().filter(pk__in=batch).exclude(status=target)
+                .values_list('pk', flat=True)
+            )
+            model.objects.filter(pk__in=pks).update(**values)
+            if pks:
+                status_changed.send(sender=model, action=action, pks=pks, user=user)
+        changed += len(pks)
+    return changed
@@ -0,0 +1,113 @@
+import os
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, StopUpload, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+
+IMAGE_TYPES = {
+    'jpg': b'\xff\xd8\xff',
+    'jpeg': b'\xff\xd8\xff',
+    'png': b'\x89PNG\r\n\x1a\n',
+    'gif': b'GIF8',
+    'webp': b'RIFF',
+}
+DOCUMENT_TYPES = {
+    'pdf': b'%PDF',
+}
+
+# Allowed extensions (mapped to their leading magic bytes) for each upload field
+UPLOAD_FIELD_TYPES = {
+    'photo': IMAGE_TYPES,
+    'profile_photo': IMAGE_TYPES,
+    'id_proof': {**IMAGE_TYPES, **DOCUMENT_TYPES},
+}
+DEFAULT_FIELD_TYPES = {**IMAGE_TYPES, **DOCUMENT_TYPES}
+
+
+class StreamingUploadHandler(TemporaryFileUploadHandler):
+    """Stream every uploaded file straight to FILE_UPLOAD_TEMP_DIR
+
+    Limits are enforced while the body is read: a request whose declared
+    length exceeds UPLOAD_MAX_REQUEST_SIZE is abandoned before its files are
+    read, and a file is dropped as soon as it passes UPLOAD_MAX_FILE_SIZE or
+    its first bytes don't match its extension. Errors are collected on
+    `request.upload_errors` for the form to report.
+
+    Under ASGI the body has already been read into a temp file by the time
+    this handler runs, so only the per-file checks still matter there; the
+    request size is bounded by nginx (client_max_body_size).
+
+    The types and size limit are chosen by the view, never by the field
+    name the client sends: views that take other files install a subclass
+    (see ImportUploadHandler).
+    """
+
+    field_types = UPLOAD_FIELD_TYPES
+    max_size_setting = 'UPLOAD_MAX_FILE_SIZE'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        # Not content_length: FileUploadHandler.new_file sets that to each
+        # file's own (usually unknown) length
+        self.request_length = 0
+        if request is not None:
+            request.upload_errors = {}
+
+    def _record_error(self, message):
+        if self.request is not None:
+            self.request.upload_errors.setdefault(self.field_name, message)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.request_length = content_length
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.field_name = field_name
+        self.max_size = getattr(settings, self.max_size_setting)
+        request_limit = max(settings.UPLOAD_MAX_REQUEST_SIZE, self.max_size + settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+        if self.request_length > request_limit:
+            self._record_error(
+                f'The upload is too large. Files must total less than '
+                f'{filesizeformat(request_limit)}.'
+            )
+            # Stop reading the body; the connection is closed after the response
+            raise StopUpload(connection_reset=True)
+
+        extension = os.path.splitext(file_name or '')[1].lower().lstrip('.')
+        self.allowed_types = self.field_types.get(field_name, DEFAULT_FIELD_TYPES)
+        if extension not in self.allowed_types:
+            self._record_error(f'Unsupported file type. Allowed: {", ".join(sorted(self.allowed_types))}.')
+            raise SkipFile()
+        self.expected_magic = self.allowed_types[extension]
+        self.received = 0
+
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not raw_data.startswith(self.expected_magic):
+            self.file.close()
+            self._record_error('The file content does not match its extension.')
+            raise SkipFile()
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            self._record_error(f'File too large. Maximum size is {filesizeformat(self.max_size)}.')
+            raise SkipFile()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class ImportUploadHandler(StreamingUploadHandler):
+    """Upload handler of the staff-only bulk import view (ImportRunAdmin)"""
+
+    # CSV has no magic bytes
+    field_types = {'csv_file': {'csv': b''}}
+    max_size_setting = 'IMPORT_MAX_FILE_SIZE'
+
+
+def add_upload_errors(request, form):
+    """Report files rejected by StreamingUploadHandler as form field errors"""
+    for field, message in getattr(request, 'upload_errors', {}).items():
+        if field in form.fields:
+            # Replaces the generic "required" error the missing file caused
+            form.errors[field] = form.error_class([message])
+            form.cleaned_data.pop(field, None)
@@ -11,13 +11,22 @@ urlpatterns = [
     path('elder-register/', views.elder_register, name='elder_register'),
     path('contact/', views.contact, name='contact'),
     
+    # Resumable uploads for registration files
+    path('uploads/', views.upload_create, name='upload_create'),
+    path('uploads/<uuid:token>/', views.upload_detail, name='upload_detail'),
+    
     # Status Check URLs
     path('check-registration/', views.check_registration_status, name='check_registration_status'),
     path('check-volunteer/', views.check_volunteer_status, name='check_volunteer_status'),
     path('volunteer-id-card/<str:volunteer_id>/', views.volunteer_id_card, name='volunteer_id_card'),
     
+    # Uploaded files (elder photos, ID proofs, ...) are served to staff only
+    path('media/<path:name>', views.protected_media, name='protected_media'),
+    
     # Admin URLs
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-cache-metrics/', views.admin_cache_metrics, name='admin_cache_metrics'),
+    path('admin-export/<str:model_name>/', views.admin_export, name='admin_export'),
     
     # Elder Management
     path('admin/elders/', views.admin_elders, name='admin_elders'),
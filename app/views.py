@@ -1,73 +1,84 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.http import HttpResponse, Http404
-from django.db.models import Count, Q
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.template.loader import get_template
 from django.core.paginator import Paginator
-from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry
+from django.core.files.storage import default_storage
+from .models import Elder, Volunteer, Donation, Testimonial, ContactInquiry, ResumableUpload
+from .stats import home_stats, dashboard_stats
+from .pagination import CursorPage, paginate_by_cursor
+from .search import search
+from .idfilter import might_exist
+from .idcards import refresh_volunteer_card
+from .media import file_etag, is_servable_media, serve_media_file
+from .uploads import add_upload_errors
+from .notifications import notify
+from .exports import EXPORT_FORMATS, export_queryset, export_response
+from .resumable import (
+    TUS_VERSION, UploadError, append_chunk, completed_uploads, create_upload, release_uploads
+)
+from .cache import cached, cache_public_page, page_cache_metrics, page_cache_views
 from .forms import (
     ElderRegistrationForm, VolunteerRegistrationForm, DonationForm,
     ContactForm, RegistrationStatusForm, VolunteerStatusForm
 )
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from io import BytesIO
+import mimetypes
 import os
 
+from asgiref.sync import sync_to_async
+
 from django.http import JsonResponse
 from .models import Volunteer
 
 
-def home(request):
+@cache_public_page(Elder, Volunteer, Donation, Testimonial)
+async def home(request):
     """Home page with overview and statistics"""
-    # Get statistics
-    total_elders = Elder.objects.count()
-    approved_elders = Elder.objects.filter(status='approved').count()
-    active_volunteers = Volunteer.objects.filter(status='approved').count()
-    total_donations = Donation.objects.count()
-    
-    # Get recent testimonials
-    testimonials = Testimonial.objects.filter(is_active=True)[:6]
-    
-    context = {
-        'total_elders': total_elders,
-        'approved_elders': approved_elders,
-        'active_volunteers': active_volunteers,
-        'total_donations': total_donations,
-        'testimonials': testimonials,
-    }
-    return render(request, 'app/home.html', context)
+    # Get statistics (cached until an elder, volunteer or donation changes)
+    context = dict(await sync_to_async(cached)('home_stats', [Elder, Volunteer, Donation], home_stats))
+    
+    # Get recent testimonials; the template calls this only when its
+    # testimonial fragment is not cached
+    def testimonials():
+        return cached('home_testimonials', [Testimonial], lambda: list(Testimonial.objects.filter(is_active=True)[:6]))
+    context['testimonials'] = testimonials
+    # Templates may touch the session and ORM, so render in a thread
+    return await sync_to_async(render)(request, 'app/home.html', context)
 
+@cache_public_page()
 def about(request):
     """About page with mission, vision, and team information"""
     return render(request, 'app/about.html')
 
-def testimonials_view(request):
+@cache_public_page(Testimonial)
+async def testimonials_view(request):
     """Testimonials page with all reviews"""
     testimonials = Testimonial.objects.filter(is_active=True).order_by('-created_at')
     
-    # Pagination
-    paginator = Paginator(testimonials, 12)  # Show 12 testimonials per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (12 testimonials per page); the page's rows are fetched up
+    # front so the template does no queries
+    paginator = Paginator(testimonials, 12)
+    paginator.count = await testimonials.acount()
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = [testimonial async for testimonial in page_obj.object_list]
     
     context = {
         'testimonials': page_obj,
     }
-    return render(request, 'app/testimonials.html', context)
+    return await sync_to_async(render)(request, 'app/testimonials.html', context)
 
 def donate(request):
     """Donation page with form"""
     if request.method == 'POST':
         form = DonationForm(request.POST)
         if form.is_valid():
-            form.save()
+            donation = form.save()
+            notify('donation_received', [donation])
             messages.success(request, 'Thank you for your donation! We will contact you soon.')
             return redirect('donate')
     else:
@@ -78,9 +89,11 @@ def donate(request):
 def volunteer_register(request):
     """Volunteer registration page"""
     if request.method == 'POST':
-        form = VolunteerRegistrationForm(request.POST)
+        form = VolunteerRegistrationForm(request.POST, request.FILES)
+        add_upload_errors(request, form)
         if form.is_valid():
             volunteer = form.save()
+            notify('volunteer_registered', [volunteer])
             messages.success(
                 request, 
                 f'Registration successful! Your Volunteer ID is {volunteer.volunteer_id}. '
@@ -95,26 +108,63 @@ def volunteer_register(request):
 def elder_register(request):
     """Elder registration page"""
     if request.method == 'POST':
-        form = ElderRegistrationForm(request.POST, request.FILES)
-        if form.is_valid():
-            elder = form.save()
-            messages.success(
-                request,
-                f'Registration successful! Registration ID: {elder.registration_id}. '
-                'Please save this ID for future reference. We will review the application and contact you soon.'
-            )
-            return redirect('elder_register')
+        # Files may arrive inline or as tokens of completed resumable uploads
+        with completed_uploads(request, ['photo', 'id_proof']) as (files, resumable_uploads):
+            form = ElderRegistrationForm(request.POST, files)
+            add_upload_errors(request, form)
+            if form.is_valid():
+                elder = form.save()
+                release_uploads(resumable_uploads)
+                messages.success(
+                    request,
+                    f'Registration successful! Registration ID: {elder.registration_id}. '
+                    'Please save this ID for future reference. We will review the application and contact you soon.'
+                )
+                return redirect('elder_register')
     else:
         form = ElderRegistrationForm()
     
     return render(request, 'app/elder_register.html', {'form': form})
 
+@require_http_methods(['POST'])
+def upload_create(request):
+    """Start a resumable (tus-style) upload for a registration file"""
+    try:
+        upload = create_upload(request.headers.get('Upload-Length'), request.headers.get('Upload-Metadata'))
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=error.status)
+    
+    response = JsonResponse({'token': str(upload.token), 'offset': 0}, status=201)
+    response['Location'] = reverse('upload_detail', args=[upload.token])
+    response['Upload-Offset'] = '0'
+    response['Tus-Resumable'] = TUS_VERSION
+    return response
+
+@require_http_methods(['HEAD', 'PATCH'])
+def upload_detail(request, token):
+    """Report the offset of a resumable upload (HEAD) or append a chunk (PATCH)"""
+    upload = get_object_or_404(ResumableUpload, token=token)
+    
+    if request.method == 'PATCH':
+        try:
+            append_chunk(upload, request)
+        except UploadError as error:
+            return JsonResponse({'error': str(error)}, status=error.status)
+    
+    response = HttpResponse(status=204 if request.method == 'PATCH' else 200)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Upload-Length'] = str(upload.length)
+    response['Tus-Resumable'] = TUS_VERSION
+    response['Cache-Control'] = 'no-store'
+    return response
+
 def contact(request):
     """Contact page with form and location"""
     if request.method == 'POST':
         form = ContactForm(request.POST)
         if form.is_valid():
-            form.save()
+            inquiry = form.save()
+            notify('inquiry_received', [inquiry])
             messages.success(request, 'Thank you for your message! We will get back to you soon.')
             return redirect('contact')
     else:
@@ -122,7 +172,7 @@ def contact(request):
     
     return render(request, 'app/contact.html', {'form': form})
 
-def check_registration_status(request):
+async def check_registration_status(request):
     """Check elder registration status by ID"""
     elder = None
     if request.method == 'POST':
@@ -130,15 +180,18 @@ def check_registration_status(request):
         if form.is_valid():
             registration_id = form.cleaned_data['registration_id']
             try:
-                elder = Elder.objects.get(registration_id__iexact=registration_id)
+                # Unknown or malformed IDs are answered without a query
+                if not await sync_to_async(might_exist)(Elder, registration_id):
+                    raise Elder.DoesNotExist
+                elder = await Elder.objects.aget(registration_id=registration_id)
             except Elder.DoesNotExist:
                 messages.error(request, 'Registration ID not found. Please check and try again.')
     else:
         form = RegistrationStatusForm()
     
-    return render(request, 'app/check_status.html', {'form': form, 'elder': elder})
+    return await sync_to_async(render)(request, 'app/check_status.html', {'form': form, 'elder': elder})
 
-def check_volunteer_status(request):
+async def check_volunteer_status(request):
     """Check volunteer registration status by ID"""
     volunteer = None
     if request.method == 'POST':
@@ -146,98 +199,65 @@ def check_volunteer_status(request):
         if form.is_valid():
             volunteer_id = form.cleaned_data['volunteer_id']
             try:
-                volunteer = Volunteer.objects.get(volunteer_id__iexact=volunteer_id)
+                # Unknown or malformed IDs are answered without a query
+                if not await sync_to_async(might_exist)(Volunteer, volunteer_id):
+                    raise Volunteer.DoesNotExist
+                volunteer = await Volunteer.objects.aget(volunteer_id=volunteer_id)
             except Volunteer.DoesNotExist:
                 messages.error(request, 'Volunteer ID not found. Please check and try again.')
     else:
         form = VolunteerStatusForm()
     
-    return render(request, 'app/check_volunteer_status.html', {'form': form, 'volunteer': volunteer})
+    return await sync_to_async(render)(request, 'app/check_volunteer_status.html', {'form': form, 'volunteer': volunteer})
 
 
 def volunteer_id_card(request, volunteer_id):
-    """Generate PDF ID card for approved volunteers with robust error handling"""
+    """Serve the pre-rendered PDF ID card of an approved volunteer"""
     volunteer = get_object_or_404(Volunteer, volunteer_id=volunteer_id)
     
     if volunteer.status != 'approved':
         messages.error(request, 'ID card can only be generated for approved volunteers.')
         return redirect('check_volunteer_status')
     
-    # Create PDF with ID card dimensions
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, 
-                          pagesize=(3.375*inch, 2.125*inch),
-                          leftMargin=0.2*inch,
-                          rightMargin=0.2*inch,
-                          topMargin=0.2*inch,
-                          bottomMargin=0.2*inch)
-    
-    # Define styles
-    styles = getSampleStyleSheet()
-    org_style = ParagraphStyle(
-        'OrgStyle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=1,
-        textColor=colors.darkblue,
-        spaceAfter=6,
+    # Cards are rendered at approval time; render here only for cards that
+    # predate that (or were removed from the media volume)
+    name = volunteer.id_card.name
+    if not name or not default_storage.exists(name):
+        name = refresh_volunteer_card(volunteer)
+    
+    fingerprint = os.path.splitext(os.path.basename(name))[0]
+    return serve_media_file(
+        request, name, 'application/pdf',
+        filename=f'volunteer_id_{volunteer_id}.pdf',
+        etag=fingerprint, immutable=True
     )
-    
-    # Build content
-    content = []
-    
-    # Organization header
-    content.append(Paragraph("VRUDHASHRAM KAMALBASANT", org_style))
-    content.append(Paragraph("VOLUNTEER ID CARD", org_style))
-    content.append(Spacer(1, 5))
-    
-    # Create a table for the ID card
-    id_data = []
-    
-    # Photo row
-    if volunteer.profile_photo:
-        try:
-            img = Image(volunteer.profile_photo.path, width=0.8*inch, height=1*inch)
-            id_data.append([img])
-        except Exception as e:
-            id_data.append([Paragraph("Photo Not Available", styles['Normal'])])
-    else:
-        id_data.append([Paragraph("Photo Not Available", styles['Normal'])])
-    
-    # Details rows
-    id_data.append([Paragraph(f"<b>{volunteer.full_name}</b>", styles['Normal'])])
-    id_data.append([Paragraph(f"ID: {volunteer.volunteer_id}", styles['Normal'])])
-    id_data.append([Paragraph(f"Phone: {volunteer.phone_number}", styles['Normal'])])
-    
-    if volunteer.approved_at:
-        id_data.append([Paragraph(f"Member Since: {volunteer.approved_at.strftime('%Y')}", styles['Normal'])])
-    
-    # Create ID card table
-    id_table = Table(id_data)
-    id_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    content.append(id_table)
-    content.append(Spacer(1, 10))
-    
-    # Footer
-    content.append(Paragraph("Authorized Signature", styles['Normal']))
-    content.append(Paragraph("Valid until further notice", styles['Normal']))
-    
-    # Build PDF
-    doc.build(content)
-    buffer.seek(0)
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="volunteer_id_{volunteer_id}.pdf"'
-    response.write(buffer.getvalue())
-    buffer.close()
-    
+
+@staff_member_required
+def protected_media(request, name):
+    """Serve an uploaded file to staff; with X-Accel-Redirect nginx sends the bytes"""
+    if not is_servable_media(name):
+        raise Http404
+    try:
+        stat = os.stat(default_storage.path(name))
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    
+    etag = file_etag(stat)
+    # Versioned rendition URLs (see images.rendition_url) never change content
+    immutable = name.startswith('renditions/') and request.GET.get('v') == etag
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response = serve_media_file(request, name, content_type, etag=etag, immutable=immutable)
+    if not immutable:
+        response['Cache-Control'] = 'private, no-cache'
     return response
 
+def list_page(request, queryset, search_query, per_page=20):
+    """Page of an admin list: best search matches, or the newest rows"""
+    if search_query:
+        results = search(queryset, search_query)
+        return CursorPage(results, False, False, request.GET.copy(), 'cursor'), len(results)
+    return paginate_by_cursor(request, queryset, per_page)
+
 @login_required
 def admin_dashboard(request):
     """Admin dashboard with statistics and quick actions"""
@@ -246,24 +266,7 @@ def admin_dashboard(request):
         return redirect('home')
     
     # Statistics
-    stats = {
-        'total_elders': Elder.objects.count(),
-        'pending_elders': Elder.objects.filter(status='pending').count(),
-        'approved_elders': Elder.objects.filter(status='approved').count(),
-        'rejected_elders': Elder.objects.filter(status='rejected').count(),
-        
-        'total_volunteers': Volunteer.objects.count(),
-        'pending_volunteers': Volunteer.objects.filter(status='pending').count(),
-        'approved_volunteers': Volunteer.objects.filter(status='approved').count(),
-        'rejected_volunteers': Volunteer.objects.filter(status='rejected').count(),
-        
-        'total_donations': Donation.objects.count(),
-        'pending_donations': Donation.objects.filter(status='pending').count(),
-        'fulfilled_donations': Donation.objects.filter(status='fulfilled').count(),
-        
-        'total_inquiries': ContactInquiry.objects.count(),
-        'unresolved_inquiries': ContactInquiry.objects.filter(is_resolved=False).count(),
-    }
+    stats = dashboard_stats()
     
     # Recent activities
     recent_elders = Elder.objects.filter(status='pending')[:5]
@@ -279,6 +282,32 @@ def admin_dashboard(request):
     
     return render(request, 'app/dashboard.html', context)
 
+@login_required
+def admin_cache_metrics(request):
+    """Page cache hit/miss counters for the public pages"""
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. Admin privileges required.')
+        return redirect('home')
+    
+    return JsonResponse({'page_cache': page_cache_metrics(page_cache_views)})
+
+# URL name -> model for the list exports
+EXPORT_MODELS = {'elders': Elder, 'volunteers': Volunteer, 'donations': Donation, 'inquiries': ContactInquiry}
+
+@login_required
+def admin_export(request, model_name):
+    """Stream an admin list as CSV or XLSX, with the list's filters and search"""
+    if not request.user.is_superuser:
+        messages.error(request, 'Access denied. Admin privileges required.')
+        return redirect('home')
+    
+    model = EXPORT_MODELS.get(model_name)
+    export_format = request.GET.get('format', 'csv')
+    if model is None or export_format not in EXPORT_FORMATS:
+        raise Http404
+    
+    return export_response(export_queryset(model, request.GET), export_format)
+
 @login_required
 def admin_elders(request):
     """Admin view for managing elder registrations"""
@@ -294,22 +323,14 @@ def admin_elders(request):
     if status_filter != 'all':
         elders = elders.filter(status=status_filter)
     
-    if search_query:
-        elders = elders.filter(
-            Q(registration_id__icontains=search_query) |
-            Q(full_name__icontains=search_query) |
-            Q(guardian_name__icontains=search_query)
-        )
-    
-    elders = elders.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(elders, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ranked search results, or keyset pagination on (created_at, id)
+    page_obj, estimated_total = list_page(request, elders, search_query)
     
     context = {
         'elders': page_obj,
+        'page': page_obj,
+        'export_name': 'elders',
+        'estimated_total': estimated_total,
         'status_filter': status_filter,
         'search_query': search_query,
     }
@@ -334,6 +355,7 @@ def admin_elder_detail(request, elder_id):
             elder.approved_by = request.user
             elder.rejection_reason = ''
             elder.save()
+            notify('elder_approved', [elder])
             messages.success(request, f'Elder registration {elder.registration_id} has been approved.')
         
         elif action == 'reject':
@@ -344,6 +366,7 @@ def admin_elder_detail(request, elder_id):
                 elder.approved_at = None
                 elder.approved_by = None
                 elder.save()
+                notify('elder_rejected', [elder])
                 messages.success(request, f'Elder registration {elder.registration_id} has been rejected.')
             else:
                 messages.error(request, 'Please provide a reason for rejection.')
@@ -367,22 +390,14 @@ def admin_volunteers(request):
     if status_filter != 'all':
         volunteers = volunteers.filter(status=status_filter)
     
-    if search_query:
-        volunteers = volunteers.filter(
-            Q(volunteer_id__icontains=search_query) |
-            Q(full_name__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
-    
-    volunteers = volunteers.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(volunteers, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ranked search results, or keyset pagination on (created_at, id)
+    page_obj, estimated_total = list_page(request, volunteers, search_query)
     
     context = {
         'volunteers': page_obj,
+        'page': page_obj,
+        'export_name': 'volunteers',
+        'estimated_total': estimated_total,
         'status_filter': status_filter,
         'search_query': search_query,
     }
@@ -407,6 +422,7 @@ def admin_volunteer_detail(request, volunteer_id):
             volunteer.approved_by = request.user
             volunteer.rejection_reason = ''
             volunteer.save()
+            notify('volunteer_approved', [volunteer])
             messages.success(request, f'Volunteer registration {volunteer.volunteer_id} has been approved.')
         
         elif action == 'reject':
@@ -417,6 +433,7 @@ def admin_volunteer_detail(request, volunteer_id):
                 volunteer.approved_at = None
                 volunteer.approved_by = None
                 volunteer.save()
+                notify('volunteer_rejected', [volunteer])
                 messages.success(request, f'Volunteer registration {volunteer.volunteer_id} has been rejected.')
             else:
                 messages.error(request, 'Please provide a reason for rejection.')
@@ -444,22 +461,14 @@ def admin_donations(request):
     if type_filter != 'all':
         donations = donations.filter(donation_type=type_filter)
     
-    if search_query:
-        donations = donations.filter(
-            Q(donor_name__icontains=search_query) |
-            Q(donor_email__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
-    
-    donations = donations.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(donations, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ranked search results, or keyset pagination on (created_at, id)
+    page_obj, estimated_total = list_page(request, donations, search_query)
     
     context = {
         'donations': page_obj,
+        'page': page_obj,
+        'export_name': 'donations',
+        'estimated_total': estimated_total,
         'status_filter': status_filter,
         'type_filter': type_filter,
         'search_query': search_query,
@@ -520,22 +529,14 @@ def admin_inquiries(request):
     elif resolved_filter == 'unresolved':
         inquiries = inquiries.filter(is_resolved=False)
     
-    if search_query:
-        inquiries = inquiries.filter(
-            Q(name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(subject__icontains=search_query)
-        )
-    
-    inquiries = inquiries.order_by('-created_at')
-    
-    # Pagination
-    paginator = Paginator(inquiries, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Ranked search results, or keyset pagination on (created_at, id)
+    page_obj, estimated_total = list_page(request, inquiries, search_query)
     
     context = {
         'inquiries': page_obj,
+        'page': page_obj,
+        'export_name': 'inquiries',
+        'estimated_total': estimated_total,
         'resolved_filter': resolved_filter,
         'search_query': search_query,
     }
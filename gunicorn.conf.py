@@ -0,0 +1,113 @@
+"""
+Gunicorn settings for the Django container (docker-compose and k8s).
+
+Run with `gunicorn -c gunicorn.conf.py`; command line options override
+anything here. Every value can also be set through the environment.
+"""
+
+import gc
+import math
+import os
+
+
+def cpu_quota():
+    """CPUs this container may use: the cgroup CPU limit, else the CPUs it may run on"""
+    quota = period = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: quota is -1 when unlimited
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            pass
+    if quota not in (None, 'max', '-1'):
+        return int(quota) / int(period)
+    return len(os.sched_getaffinity(0))
+
+
+cpus = cpu_quota()
+mode = os.getenv('GUNICORN_MODE', 'asgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if mode == 'asgi':
+    # One event loop per CPU; at least two so one can recycle while the other serves.
+    # Request bodies are read in full into the system temp dir before the
+    # upload handler runs, so nginx's client_max_body_size is the upload limit
+    wsgi_app = 'project.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    workers = max(2, math.ceil(cpus))
+elif cpus < 1:
+    # Under a fractional CPU limit extra processes only add memory and
+    # throttling; threads still overlap database and network waits
+    wsgi_app = 'project.wsgi:application'
+    worker_class = 'gthread'
+    workers = 2
+    threads = 4
+else:
+    wsgi_app = 'project.wsgi:application'
+    worker_class = 'sync'
+    workers = 2 * math.ceil(cpus) + 1
+
+workers = int(os.getenv('GUNICORN_WORKERS', workers))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', worker_class)
+
+# Import Django, ReportLab and Pillow once in the master; workers share
+# those pages copy-on-write instead of each loading their own copy
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+# Replace each worker after this many requests so heap fragmentation from
+# ID card and image rendering is handed back to the OS; the jitter keeps
+# the workers from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', str(max_requests // 10)))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+# Longer than nginx's idle upstream keepalive (60s), so nginx never reuses
+# a connection gunicorn has just closed
+keepalive = 75
+# Heartbeat files on tmpfs; the container's overlay filesystem can stall them
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def on_starting(server):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+    import django
+
+    django.setup()
+    from app.cache import cache_is_shared
+
+    # Each worker would cache pages and counters of its own that the other
+    # workers' (and run_jobs') changes never invalidate
+    if server.cfg.workers > 1 and not cache_is_shared():
+        raise RuntimeError(
+            f'{server.cfg.workers} workers on a process-local cache; set CACHE_BACKEND '
+            'and CACHE_LOCATION to a shared cache (redis) or GUNICORN_WORKERS=1'
+        )
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from importlib import import_module
+
+        from django.conf import settings
+        from django.db import connections
+
+        # Django loads the URLconf on the first request; import it (and with
+        # it the views, ReportLab and Pillow) before the workers are forked
+        import_module(settings.ROOT_URLCONF)
+        # Nothing opened by the preloaded app may be shared with the workers
+        connections.close_all()
+
+
+def pre_fork(server, worker):
+    # Keep the garbage collector from touching (and so copying) the objects
+    # the master imported
+    gc.freeze()
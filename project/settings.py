@@ -24,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.AsyncStreamingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,8 +40,15 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process; with DEBUG on, the
+            # autoreloader still resets it when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -104,6 +112,54 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/blobs and
+# hard-linked to their usual names (see app.storage)
+STORAGES = {
+    'default': {
+        'BACKEND': 'app.storage.ContentAddressedStorage',
+    },
+    # Hashed names plus .gz/.br siblings for nginx (see PrecompressedManifestStaticFilesStorage);
+    # run `manage.py build_assets` before collectstatic
+    'staticfiles': {
+        'BACKEND': 'app.storage.PrecompressedManifestStaticFilesStorage',
+    },
+}
+
+# When set (e.g. '/protected-media/'), media downloads served by Django views
+# only send headers and let nginx stream the file from this internal location
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+# Cache
+# LocMemCache, the development default, is per process. Deployments point
+# CACHE_BACKEND/CACHE_LOCATION at redis (docker-compose.yml, k8s/redis.yml)
+# so generation bumps reach every web worker and run_jobs; gunicorn refuses
+# to start several workers on a process-local cache, and `check --deploy`
+# reports it (app.E001). Entries expire after TIMEOUT even without a bump.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'vk-cache'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+    }
+}
+
+# Seconds a page cached by cache_public_page stays in the shared cache; a
+# change to one of its models invalidates it sooner
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '300'))
+
+# Seconds nginx may serve a public page from its microcache (see
+# nginx/default.conf) before Django is asked again; 0 turns it off
+PAGE_MICROCACHE_SECONDS = int(os.getenv('PAGE_MICROCACHE_SECONDS', '5'))
+
+# Seconds a {% fragment %} block (app/templatetags/fragments.py) stays cached.
+# Blocks keyed by models are invalidated sooner by their generation; 0 turns
+# fragment caching off
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', '3600'))
+
+# Age in seconds after which the issued-ID Bloom filters (app.idfilter) are
+# rebuilt in the background, in case a cache generation bump was missed
+ID_FILTER_MAX_AGE = int(os.getenv('ID_FILTER_MAX_AGE', '10'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -123,18 +179,40 @@ MESSAGE_TAGS = {
 }
 
 # File upload settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# Uploaded files are streamed to a temp dir on the media volume instead of
+# being buffered in worker memory (see app.uploads.StreamingUploadHandler).
+# That holds under WSGI only: Django's ASGI handler first reads the whole
+# body into a SpooledTemporaryFile in the system temp dir, so the early size
+# checks below cannot stop an oversized body. Under ASGI the limit that
+# counts is nginx's client_max_body_size, which must follow these sizes.
+FILE_UPLOAD_HANDLERS = ['app.uploads.StreamingUploadHandler']
+FILE_UPLOAD_TEMP_DIR = MEDIA_ROOT / 'tmp'
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024  # 256KB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 1 * 1024 * 1024  # 1MB of non-file form data
+UPLOAD_MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB per file
+UPLOAD_MAX_REQUEST_SIZE = 12 * 1024 * 1024  # 12MB per request
+IMPORT_MAX_FILE_SIZE = 64 * 1024 * 1024  # 64MB CSV for admin bulk imports
 
 # Security settings for production
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
-# Email configuration (for future use)
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
-# EMAIL_HOST = 'smtp.gmail.com'
-# EMAIL_PORT = 587
-# EMAIL_USE_TLS = True
-# EMAIL_HOST_USER = 'your-email@gmail.com'
-# EMAIL_HOST_PASSWORD = 'your-app-password'
\ No newline at end of file
+# Email configuration (mail is sent by the run_jobs worker, not in requests)
+# Console output by default; set EMAIL_BACKEND to
+# django.core.mail.backends.smtp.EmailBackend and EMAIL_HOST etc. to send
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '0') == '1'
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_TIMEOUT = 30
+
+# Notification outbox (see app.notifications)
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '50'))  # messages per SMTP connection
+NOTIFICATION_RATE_PER_MINUTE = int(os.getenv('NOTIFICATION_RATE_PER_MINUTE', '120'))  # 0 for no limit
+NOTIFICATION_MAX_ATTEMPTS = 6
+NOTIFICATION_FLUSH_DELAY = 10  # seconds to gather messages before sending
+NOTIFICATION_FLUSH_LIMIT = 500  # messages per flush job, keeps it within its timeout
\ No newline at end of file
@@ -1,13 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # First, so the staff pages under admin/ (admin/elders/, ...) are not
+    # swallowed by the Django admin's catch-all
     path('', include('app.urls')),
+    path('admin/', admin.site.urls),
 ]
 
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Media is not served publicly, not even in development: app.views.protected_media
+# checks access for every /media/ request
\ No newline at end of file